@@ -71,16 +71,24 @@ class VideoClipperTab:
         self.clipper_url_frame.pack(fill=tk.X, padx=20, pady=(0, 10))
         
         help_text = tk.Label(self.clipper_url_frame,
-                            text="Example: 'https://youtube.com/watch?v=...', 'https://tiktok.com/@user/video/...'",
+                            text="Example: 'https://youtube.com/watch?v=...' — one URL per line (or a playlist) for batch clipping",
                             font=("Segoe UI", 9),
                             fg="#8b949e", bg="#0d1117")
         help_text.pack(padx=5, pady=(0, 5), anchor="w")
         
-        self.clipper_url = tk.Text(self.clipper_url_frame, height=2, font=("Consolas", 10),
+        self.clipper_url = tk.Text(self.clipper_url_frame, height=4, font=("Consolas", 10),
                                    bg="#21262d", fg="#c9d1d9", insertbackground="#58a6ff",
                                    relief=tk.FLAT, wrap=tk.WORD, padx=10, pady=10)
         self.clipper_url.pack(fill=tk.X, pady=(0, 5))
         
+        self.audio_first = tk.BooleanVar(value=True)
+        tk.Checkbutton(self.clipper_url_frame,
+                      text="⚡ Audio-first: analyze audio only, download just the chosen clips",
+                      variable=self.audio_first,
+                      font=("Segoe UI", 9),
+                      bg="#0d1117", fg="#c9d1d9", selectcolor="#161b22",
+                      activebackground="#0d1117").pack(anchor="w", pady=(0, 5))
+        
         # File Browser
         self.clipper_file_frame = tk.Frame(scrollable, bg="#0d1117")
         
@@ -353,6 +361,7 @@ class VideoClipperTab:
         num_clips = self.num_clips.get()
         clip_duration = self.clip_duration.get()
         method = self.detection_method.get()
+        audio_first = self.audio_first.get()
         
         self.is_processing = True
         self.clipper_btn.config(state=tk.DISABLED, bg="#6e7681")
@@ -360,13 +369,14 @@ class VideoClipperTab:
         self.progress_var.set(0)
         
         Thread(target=self._clip_video_worker, 
-               args=(video_source, source_type, num_clips, clip_duration, method),
+               args=(video_source, source_type, num_clips, clip_duration, method, audio_first),
                daemon=True).start()
     
-    def _clip_video_worker(self, video_source, source_type, num_clips, clip_duration, method):
+    def _clip_video_worker(self, video_source, source_type, num_clips, clip_duration, method, audio_first=False):
         """Background worker for clipping"""
         try:
             from video.clipper import SmartClipper, VideoHighlightDetector
+            from video.clip_queue import ClipQueue
             
             start_time = time.time()
             
@@ -377,7 +387,33 @@ class VideoClipperTab:
             else:
                 format_str = 'long'
             
-            if source_type == 'url':
+            urls = [u.strip() for u in video_source.splitlines() if u.strip()] if source_type == 'url' else []
+            is_batch = len(urls) > 1 or (urls and ClipQueue.is_playlist_url(urls[0]))
+            
+            if is_batch:
+                self._ui(f"🚚 Batch clipping {len(urls)} URL(s)...", 10)
+                
+                clipper = SmartClipper()
+                results = clipper.clip_batch(
+                    urls,
+                    num_clips=num_clips,
+                    format=format_str,
+                    method=method,
+                    clip_duration=clip_duration,
+                    audio_first=audio_first,
+                    progress_callback=lambda i, stage, msg: self._ui(f"[{i+1}] {msg}", None)
+                )
+                
+                clips, highlights = [], []
+                for r in results:
+                    clips.extend(r['clips'])
+                    highlights.extend(r['highlights'])
+                failed = [r for r in results if r['error']]
+                if failed:
+                    logger.warning(f"⚠️ {len(failed)}/{len(results)} videos failed: "
+                                   + "; ".join(f"{r['url']} ({r['failed_stage']})" for r in failed))
+            
+            elif source_type == 'url':
                 self._ui("📥 Downloading video...", 20)
                 
                 clipper = SmartClipper()
@@ -387,7 +423,8 @@ class VideoClipperTab:
                     format=format_str,
                     method=method,
                     clip_duration=clip_duration,
-                    cleanup=True
+                    cleanup=True,
+                    audio_first=audio_first
                 )
                 
                 if result.get('error'):
@@ -407,12 +444,14 @@ class VideoClipperTab:
                     else:
                         self._ui("🔍 Analyzing audio...", 40)
                     
+                    detector.configure_durations(format_str, clip_duration)
                     highlights = detector.detect_highlights(video_source, num_clips, method=method)
                     
                     self._ui("✂️ Cutting clips...", 60)
                     output_dir = "output/clips"
                     clips = detector.auto_clip(video_source, output_dir, num_clips, format_str, 
-                                              method, clip_duration=clip_duration)
+                                              method, clip_duration=clip_duration,
+                                              highlights=highlights)
                 finally:
                     detector.cleanup()
             
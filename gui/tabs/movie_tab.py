@@ -455,8 +455,10 @@ class MovieReviewTab:
                 from video.scene_analyzer import SceneAnalyzer
                 
                 # Detect scenes
-                detector = SceneDetector()
-                scenes = detector.detect_scenes(video_file, max_scenes=num_scenes)
+                # Sharded scan across cores (long films only; short ones stay serial)
+                detector = SceneDetector(fast=True, workers=min(4, os.cpu_count() or 1))
+                # Over-detect, then keep the most relevant scenes after analysis
+                scenes = detector.detect_scenes(video_file, max_scenes=num_scenes * 2)
                 
                 if not scenes:
                     raise ValueError("No scenes detected in video")
@@ -467,8 +469,9 @@ class MovieReviewTab:
                 
                 # Analyze scenes with AI
                 self._ui("🧠 AI analyzing scenes...", 40)
-                analyzer = SceneAnalyzer()
+                analyzer = SceneAnalyzer(batch_size=5)  # ~5 round trips for 24 candidates
                 scenes = analyzer.analyze_scenes(scenes)
+                scenes = analyzer.select_best_scenes(scenes, num_scenes)
                 
                 # Generate review script from scenes
                 self._ui("📝 Generating review script...", 60)
@@ -558,10 +561,11 @@ class MovieReviewTab:
                 current_images = [] if actual_type == "story" else processed.get('image_urls', [])
                 if len(current_images) < len(script):
                     logger.info(f"🔍 Pre-downloading images: {len(current_images)} → {len(script)} scenes")
-                    from video.image_searcher import ImageSearcher, extract_keywords
+                    from video.image_searcher import IMAGE_OUTPUT_DIR, ImageSearcher, extract_keywords
                     searcher = ImageSearcher()
                     scraped_title = processed.get('title', '')
                     scraped_description = processed.get('description', '')
+                    scenes = []
                     for scene_idx in range(len(current_images) + 1, len(script) + 1):
                         scene_text = script[scene_idx - 1]
                         
@@ -575,22 +579,14 @@ class MovieReviewTab:
                         else:
                             query = " ".join(scene_text.split()[:15])
                         
-                        paths = searcher.search_google_images(query, num_images=1, output_dir="assets/temp/web_story_images", index=scene_idx)
-                        if not paths:
-                            # Fallback: keywords from scene + title/desc so image matches content
-                            keywords = extract_keywords(scraped_title, scraped_description or "", scene_text)
-                            keyword_str = " ".join(keywords[:3]) or query
-                            logger.info(f"🔎 Scene {scene_idx} fallback: keywords {keyword_str[:50]}...")
-                            paths = searcher.search_and_download(keyword_str, num_images=1, output_dir="assets/temp/web_story_images", start_index=scene_idx)
-                        if paths:
-                            current_images.extend(paths)
-                            logger.info(f"✅ Scene {scene_idx}: Downloaded image")
-                        else:
-                            # Last resort: placeholder (no reuse of old dataset folder)
-                            placeholder = [f"https://picsum.photos/1080/1920?random={scene_idx}"]
-                            paths = searcher._download_batch(placeholder, "assets/temp/web_story_images", scene_idx)
-                            if paths:
-                                current_images.extend(paths)
+                        # Fallback: keywords from scene + title/desc so image matches content
+                        keywords = extract_keywords(scraped_title, scraped_description or "", scene_text)
+                        scenes.append({'query': query, 'fallback_query': " ".join(keywords[:3]) or query})
+                    # All scenes searched in parallel, sources hedged per scene; scenes still
+                    # empty at the deadline get a placeholder (no reuse of old dataset folder)
+                    paths = searcher.acquire_scene_images(scenes, output_dir=IMAGE_OUTPUT_DIR,
+                                                          start_index=len(current_images) + 1)
+                    current_images.extend(p for p in paths if p)
                     processed['image_urls'] = current_images
                     # Lock images so renderer won't auto-download again (avoid mismatch)
                     processed['images_locked'] = True
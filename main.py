@@ -20,6 +20,9 @@ except ImportError as e:
     sys.exit(1)
 
 if __name__ == "__main__":
+    # Cần cho process pool (scene detection song song) khi đóng gói exe trên Windows
+    import multiprocessing
+    multiprocessing.freeze_support()
     app = NMH03VideoProV3()
     app.run()
 
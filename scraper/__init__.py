@@ -2,11 +2,11 @@
 Scraper module để lấy thông tin sản phẩm từ các platform
 """
 from .base import BaseScraper
-from .shopee import ShopeeScraper
+from .shopee import ShopeeScraper, ShopeeSession
 from .tiktok import TikTokScraper
 from .web_story import WebStoryCScraper
 
-__all__ = ['BaseScraper', 'ShopeeScraper', 'TikTokScraper', 'WebStoryCScraper']
+__all__ = ['BaseScraper', 'ShopeeScraper', 'ShopeeSession', 'TikTokScraper', 'WebStoryCScraper']
 
 
 
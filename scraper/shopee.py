@@ -1,128 +1,113 @@
 import re
+import os
 import time
-from typing import Dict, List
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
 from io import BytesIO
 import requests
-from PIL import Image
+from requests.adapters import HTTPAdapter
+from PIL import Image, ImageFile
 import numpy as np
 from playwright.sync_api import sync_playwright
 from scraper.base import BaseScraper
 from utils.logger import get_logger
+from utils.fetch_cache import fetched_image_path, store_fetched_image
 
 logger = get_logger()
 
+# Biến thể kích thước của CDN ảnh Shopee: (hậu tố, chiều rộng xấp xỉ px), nhỏ → lớn.
+# Hậu tố "" là ảnh gốc (kích thước tùy người bán upload, thường rất lớn).
+CDN_VARIANTS = [("_tn", 330), ("@resize_w450_nl", 450), ("@resize_w900_nl", 900)]
+PROBE_VARIANT = "_tn"     # Đủ để kiểm tra tỉ lệ / kích thước tối thiểu
+# Ảnh sản phẩm được vẽ tối đa 80% chiều rộng khung 1080 (xem SmartVideoRenderer.make_premium_scene)
+RENDER_IMAGE_WIDTH = 864
+CDN_IMAGE_BASE = "https://down-vn.img.susercontent.com/file/"
+CDP_URL = "http://localhost:9222"   # Chrome mở với --remote-debugging-port=9222
+BROWSER_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+
+# Tab scrape không cần tải những thứ này: dữ liệu đến từ API/DOM, ảnh tải riêng qua requests
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+BLOCKED_URL_PARTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "facebook.net",
+    "analytics.tiktok.com", "clarity.ms", "hotjar.com", "/__t__", "/tracking/", "/apm/",
+)
+
+
+IMAGE_POOL_WORKERS = 8   # Request ảnh song song của cả process (mọi scraper / tab dùng chung)
+
+_image_pool: Optional[ThreadPoolExecutor] = None
+_image_pool_lock = threading.Lock()
+
+
+def image_pool() -> ThreadPoolExecutor:
+    """
+    Module-wide executor for image probes / variant checks. get_scraper() makes
+    a ShopeeScraper per URL, so a per-instance pool would never be shut down.
+    """
+    global _image_pool
+    with _image_pool_lock:
+        if _image_pool is None:
+            _image_pool = ThreadPoolExecutor(max_workers=IMAGE_POOL_WORKERS, thread_name_prefix="shopee-img")
+        return _image_pool
+
+
+def shopee_image_base(url: str) -> str:
+    """Original-upload URL of a Shopee CDN image (size/format suffixes stripped)"""
+    clean = url.split('@')[0].split('_tn')[0].split('_v')[0]
+    return clean if clean.startswith('http') else 'https:' + clean
+
+
+def shopee_image_variant(url: str, suffix: str) -> str:
+    """URL of a CDN size variant ("" = original)"""
+    return shopee_image_base(url) + suffix
+
+
 class ShopeeScraper(BaseScraper):
     MAX_DESC_RETRIES = 8  # Tăng số lần thử cuộn
     SCROLL_STEP = 1000    # Cuộn mạnh hơn để kích hoạt lazy load
+    PROBE_BYTES = 32 * 1024   # Đủ cho header JPEG/PNG/WebP (kể cả EXIF lớn)
+    PROBE_WORKERS = IMAGE_POOL_WORKERS  # Số request ảnh song song (pool chung, xem image_pool)
+    PREFETCH_ACCEPTED = True  # Tải sẵn ảnh sẽ render (biến thể CDN đã chọn / ảnh gốc khi server bỏ qua Range) vào cache
+    API_PATHS = frozenset({"/api/v4/pdp/get_pc", "/api/v4/pdp/get", "/api/v4/item/get"})  # XHR chi tiết sản phẩm (so khớp đúng path)
+    API_TIMEOUT_MS = 15000
+
+    def __init__(self, image_width: int = RENDER_IMAGE_WIDTH, use_api: bool = True):
+        """
+        Args:
+            image_width: width images are rendered at; the smallest CDN variant
+                at least this wide is returned instead of the original upload
+            use_api: read title/price/images/description from the product-detail
+                XHR payload as soon as it arrives (DOM scraping stays as fallback)
+        """
+        self.image_width = image_width
+        self.use_api = use_api
+        # Session dùng chung (keep-alive tới CDN Shopee) cho các request ảnh
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+            'Referer': 'https://shopee.vn/',
+        })
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.PROBE_WORKERS * 2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def scrape(self, url: str) -> Dict:
         logger.info(f"🔗 Kết nối tới Chrome (9222) - URL: {url}")
         with sync_playwright() as p:
             try:
                 # Kết nối browser đang mở
-                browser = p.chromium.connect_over_cdp("http://localhost:9222")
+                browser = p.chromium.connect_over_cdp(CDP_URL)
                 context = browser.contexts[0]
                 
                 page = next((pg for pg in context.pages if "shopee.vn" in pg.url), None)
                 if not page:
                     page = context.new_page()
 
-                ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
-                page.set_extra_http_headers({"User-Agent": ua})
-
-                if url not in page.url:
-                    page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                
-                # Đợi trang ổn định một chút
-                page.wait_for_timeout(3000)
-
-                # Kiểm tra Shopee redirect sang captcha/xác minh — không scrape được
-                current_url = page.url or ""
-                if "/verify/captcha" in current_url or "/verify" in current_url:
-                    logger.error("❌ Shopee đang hiển thị trang captcha/xác minh. Hoàn thành captcha trong Chrome rồi thử lại.")
-                    out = self._empty_data(url)
-                    out["_scrape_failed"] = True
-                    out["_scrape_error"] = (
-                        "Shopee chuyển sang trang captcha/xác minh. "
-                        "Bạn cần: 1) Mở link sản phẩm trong Chrome, 2) Bấm 'Thử Lại' / hoàn thành captcha (nếu có), "
-                        "3) Đợi trang sản phẩm load xong, 4) Bấm Generate lại."
-                    )
-                    return out
-
-                # 1. Lấy Title, Ảnh và Giá
-                title = self._get_title(page)
-                images = self._get_images_advanced(page)
-                price = self._get_price(page)
-
-                # 2. CHIẾN THUẬT QUÉT MÔ TẢ TRIỆT ĐỂ
-                description = ""
-                
-                # Cố gắng tìm và bấm nút "Xem thêm" nếu có để Shopee bung full text
-                try:
-                    expand_button = page.locator('button:has-text("Xem thêm"), div:has-text("Xem thêm")').last
-                    if expand_button.is_visible():
-                        expand_button.click(timeout=3000)
-                        page.wait_for_timeout(1000)
-                except:
-                    pass
-
-                for attempt in range(self.MAX_DESC_RETRIES):
-                    # Cuộn chuột sâu xuống dưới
-                    page.mouse.wheel(0, self.SCROLL_STEP)
-                    page.wait_for_timeout(1000)
-                    
-                    description = self._get_description_logic(page)
-                    # Nếu lấy được trên 500 ký tự (mô tả thật thường dài) thì dừng
-                    if len(description) > 500:
-                        break
-                
-                # Fallback nếu vẫn rỗng hoặc quá ngắn
-                if len(description) < 100:
-                    logger.warning("⚠️ Selector chuyên sâu thất bại, lấy dữ liệu thô từ Meta hoặc Body...")
-                    description = self._get_fallback_description(page)
-
-                # 3. Làm sạch nhẹ nhàng (giữ nguyên cấu trúc xuống dòng để Renderer tách câu)
-                clean_desc = description.replace("MÔ TẢ SẢN PHẨM", "").strip()
-
-                # Fallback giá từ mô tả nếu DOM không lấy được
-                if (not price or price == "0") and clean_desc:
-                    price_match = re.search(r"(?:giá|Giá|GIÁ|₫|VNĐ|vnd)\s*[:\s]*([\d.,]+)\s*(?:₫|VNĐ|k)?", clean_desc, re.IGNORECASE)
-                    if not price_match:
-                        price_match = re.search(r"\b(\d{2,3}(?:\.\d{3})+(?:\.\d{3})?)\s*₫", clean_desc)
-                    if price_match:
-                        pstr = re.sub(r"[^\d]", "", price_match.group(1))
-                        if len(pstr) >= 4:
-                            price = pstr
-                            logger.info("📌 Lấy giá từ mô tả (fallback): %s", price)
-
-                # Nếu 0 ảnh + title generic → có thể đang trang captcha/lỗi tải
-                generic_titles = ("Sản phẩm Shopee", "Shopee", "Shopee Việt Nam")
-                if len(images) == 0 and (not title or title.strip() in generic_titles):
-                    logger.warning("⚠️ Không lấy được ảnh và title — có thể trang captcha hoặc 'Lỗi tải'. Hoàn thành xác minh trong Chrome rồi thử lại.")
-                    out = self._empty_data(url)
-                    out["_scrape_failed"] = True
-                    out["_scrape_error"] = (
-                        "Không lấy được ảnh sản phẩm (trang có thể đang captcha hoặc 'Lỗi tải'). "
-                        "Trong Chrome: bấm 'Thử Lại' / hoàn thành captcha, đợi trang sản phẩm load xong rồi Generate lại."
-                    )
-                    return out
-
-                # --- LOG KIỂM TRA ---
-                logger.info('[SCRAPER COMPLETED]')
-                logger.info('Title: %s', title[:60])
-                logger.info('Images: %d', len(images))
-                logger.info('Price: %s', price)
-                logger.info('Description length: %d chars', len(clean_desc))
-
-                return {
-                    "title": title,
-                    "image_urls": images,
-                    "description": clean_desc,
-                    "short_description": clean_desc,
-                    "price": price,
-                    "platform": "shopee",
-                    "original_url": url
-                }
+                page.set_extra_http_headers({"User-Agent": BROWSER_UA})
+                return self._scrape_page(page, url)
 
             except Exception as e:
                 logger.error(f"❌ Scraper Error: {e}")
@@ -131,6 +116,202 @@ class ShopeeScraper(BaseScraper):
                 out["_scrape_error"] = str(e)
                 return out
 
+    def _scrape_page(self, page, url: str) -> Dict:
+        """Scrape one product in an already-connected tab (API payload first, DOM fallback)"""
+        api_data = self._load_via_api(page, url) if self.use_api else None
+        if api_data is None:
+            if url not in page.url:
+                page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            
+            # Đợi trang ổn định một chút
+            page.wait_for_timeout(3000)
+
+        # Kiểm tra Shopee redirect sang captcha/xác minh — không scrape được
+        current_url = page.url or ""
+        if "/verify/captcha" in current_url or "/verify" in current_url:
+            logger.error("❌ Shopee đang hiển thị trang captcha/xác minh. Hoàn thành captcha trong Chrome rồi thử lại.")
+            out = self._empty_data(url)
+            out["_scrape_failed"] = True
+            out["_scrape_error"] = (
+                "Shopee chuyển sang trang captcha/xác minh. "
+                "Bạn cần: 1) Mở link sản phẩm trong Chrome, 2) Bấm 'Thử Lại' / hoàn thành captcha (nếu có), "
+                "3) Đợi trang sản phẩm load xong, 4) Bấm Generate lại."
+            )
+            return out
+
+        # 1. Lấy Title, Ảnh và Giá (từ payload API nếu có, thiếu gì lấy DOM)
+        if api_data:
+            title = api_data["title"] or self._get_title(page)
+            images = api_data["image_urls"] or self._get_images_advanced(page)
+            price = api_data["price"] or self._get_price(page)
+            description = api_data["description"]
+        else:
+            title = self._get_title(page)
+            images = self._get_images_advanced(page)
+            price = self._get_price(page)
+            description = ""
+
+        # 2. CHIẾN THUẬT QUÉT MÔ TẢ TRIỆT ĐỂ (chỉ khi API không có mô tả đủ dài)
+        if len(description) < 100:
+            description = self._get_description_dom(page)
+
+        # 3. Làm sạch nhẹ nhàng (giữ nguyên cấu trúc xuống dòng để Renderer tách câu)
+        clean_desc = description.replace("MÔ TẢ SẢN PHẨM", "").strip()
+
+        # Fallback giá từ mô tả nếu DOM không lấy được
+        if (not price or price == "0") and clean_desc:
+            price_match = re.search(r"(?:giá|Giá|GIÁ|₫|VNĐ|vnd)\s*[:\s]*([\d.,]+)\s*(?:₫|VNĐ|k)?", clean_desc, re.IGNORECASE)
+            if not price_match:
+                price_match = re.search(r"\b(\d{2,3}(?:\.\d{3})+(?:\.\d{3})?)\s*₫", clean_desc)
+            if price_match:
+                pstr = re.sub(r"[^\d]", "", price_match.group(1))
+                if len(pstr) >= 4:
+                    price = pstr
+                    logger.info("📌 Lấy giá từ mô tả (fallback): %s", price)
+
+        # Nếu 0 ảnh + title generic → có thể đang trang captcha/lỗi tải
+        generic_titles = ("Sản phẩm Shopee", "Shopee", "Shopee Việt Nam")
+        if len(images) == 0 and (not title or title.strip() in generic_titles):
+            logger.warning("⚠️ Không lấy được ảnh và title — có thể trang captcha hoặc 'Lỗi tải'. Hoàn thành xác minh trong Chrome rồi thử lại.")
+            out = self._empty_data(url)
+            out["_scrape_failed"] = True
+            out["_scrape_error"] = (
+                "Không lấy được ảnh sản phẩm (trang có thể đang captcha hoặc 'Lỗi tải'). "
+                "Trong Chrome: bấm 'Thử Lại' / hoàn thành captcha, đợi trang sản phẩm load xong rồi Generate lại."
+            )
+            return out
+
+        # --- LOG KIỂM TRA ---
+        logger.info('[SCRAPER COMPLETED]%s', ' (API)' if api_data else '')
+        logger.info('Title: %s', title[:60])
+        logger.info('Images: %d', len(images))
+        logger.info('Price: %s', price)
+        logger.info('Description length: %d chars', len(clean_desc))
+
+        return {
+            "title": title,
+            "image_urls": images,
+            "description": clean_desc,
+            "short_description": clean_desc,
+            "price": price,
+            "platform": "shopee",
+            "original_url": url
+        }
+
+    def _get_description_dom(self, page) -> str:
+        """Expand + scroll until the description block renders (slow path)"""
+        description = ""
+        
+        # Cố gắng tìm và bấm nút "Xem thêm" nếu có để Shopee bung full text
+        try:
+            expand_button = page.locator('button:has-text("Xem thêm"), div:has-text("Xem thêm")').last
+            if expand_button.is_visible():
+                expand_button.click(timeout=3000)
+                page.wait_for_timeout(1000)
+        except:
+            pass
+
+        for attempt in range(self.MAX_DESC_RETRIES):
+            # Cuộn chuột sâu xuống dưới
+            page.mouse.wheel(0, self.SCROLL_STEP)
+            page.wait_for_timeout(1000)
+            
+            description = self._get_description_logic(page)
+            # Nếu lấy được trên 500 ký tự (mô tả thật thường dài) thì dừng
+            if len(description) > 500:
+                break
+        
+        # Fallback nếu vẫn rỗng hoặc quá ngắn
+        if len(description) < 100:
+            logger.warning("⚠️ Selector chuyên sâu thất bại, lấy dữ liệu thô từ Meta hoặc Body...")
+            description = self._get_fallback_description(page)
+        return description
+
+    # =========================
+    # PRODUCT API (network intercept)
+    # =========================
+
+    @staticmethod
+    def _product_ids(url: str) -> Optional[Tuple[str, str]]:
+        """(shop_id, item_id) from a product URL (…-i.<shop>.<item> or /product/<shop>/<item>)"""
+        m = re.search(r"-i\.(\d+)\.(\d+)", url) or re.search(r"/product/(\d+)/(\d+)", url)
+        return (m.group(1), m.group(2)) if m else None
+
+    def _load_via_api(self, page, url: str) -> Optional[Dict]:
+        """
+        Navigate with a response listener armed for the product-detail XHR and
+        parse it as soon as it arrives (no fixed waits / scrolling).
+        Returns: parsed product dict, or None → caller uses the DOM path
+        """
+        ids = self._product_ids(url)
+        item_id = ids[1] if ids else None
+
+        def is_product_api(response) -> bool:
+            return response.status == 200 and self._is_product_api_url(response.url, item_id)
+
+        try:
+            with page.expect_response(is_product_api, timeout=self.API_TIMEOUT_MS) as info:
+                if url not in page.url:
+                    page.goto(url, wait_until="commit", timeout=60000)
+                else:
+                    # Tab đã mở sẵn sản phẩm: tải lại để bắt payload
+                    page.reload(wait_until="commit", timeout=60000)
+            payload = info.value.json()
+        except Exception as e:
+            logger.info(f"ℹ️ Không bắt được API sản phẩm ({type(e).__name__}), dùng DOM")
+            return None
+
+        data = self._parse_product_api(payload)
+        if data is None:
+            logger.info("ℹ️ Payload API không hợp lệ, dùng DOM")
+            return None
+        data["image_urls"] = self._resolve_image_urls(data["image_urls"][:10])
+        logger.info(f"⚡ API sản phẩm: {len(data['image_urls'])} ảnh, mô tả {len(data['description'])} ký tự")
+        return data
+
+    @classmethod
+    def _is_product_api_url(cls, url: str, item_id: Optional[str] = None) -> bool:
+        """Exact product-detail endpoint (get_pc_xxx, get_rw... do not match), for this item if known"""
+        parsed = urlparse(url)
+        if parsed.path.rstrip("/") not in cls.API_PATHS:
+            return False
+        return item_id is None or item_id in parsed.query
+
+    @staticmethod
+    def _parse_product_api(payload) -> Optional[Dict]:
+        """
+        Title / price / images / description from a product-detail payload
+        (/api/v4/pdp/get_pc → data.item…, /api/v4/item/get → data…).
+        Prices in the API are VND × 100000. Returns None if there is no product.
+        """
+        data = payload.get("data") if isinstance(payload, dict) else None
+        if not isinstance(data, dict):
+            return None
+        item = data.get("item") if isinstance(data.get("item"), dict) else data
+        title = (item.get("title") or item.get("name") or "").strip()
+        if not title:
+            return None
+
+        images = item.get("images") or (data.get("product_images") or {}).get("images") or []
+        image_urls = []
+        for img in images:
+            if isinstance(img, str) and img:
+                image_urls.append(img if img.startswith("http") else CDN_IMAGE_BASE + img)
+
+        raw_price = None
+        price_info = (data.get("product_price") or {}).get("price") or {}
+        for value in (price_info.get("single_value"), item.get("price"), item.get("price_min"),
+                      price_info.get("range_min")):
+            if isinstance(value, (int, float)) and value > 0:
+                raw_price = value
+                break
+        price = str(int(raw_price) // 100000) if raw_price else ""
+
+        description = item.get("description") or (data.get("product_detail") or {}).get("description") or ""
+        if not isinstance(description, str):
+            description = ""
+        return {"title": title, "price": price, "image_urls": image_urls, "description": description.strip()}
+
     def _get_description_logic(self, page) -> str:
         try:
             # Cuộn đến giữa trang để kích hoạt Lazy Load của phần mô tả
@@ -260,7 +441,7 @@ class ShopeeScraper(BaseScraper):
                 try:
                     og_img = page.evaluate("document.querySelector('meta[property=\"og:image\"]')?.content") or ""
                     if og_img and "shopee" in og_img.lower():
-                        raw_urls = [og_img]
+                        raw_urls = [shopee_image_base(og_img)]
                         logger.info("📷 Dùng og:image làm ảnh sản phẩm (fallback)")
                 except Exception:
                     pass
@@ -272,25 +453,28 @@ class ShopeeScraper(BaseScraper):
             if len(filtered) > 2:
                 filtered = filtered[:2] + filtered[3:]
                 logger.info("📷 Đã bỏ ảnh thứ 3 (video/banner) để tránh render trắng")
-            return filtered[:10]  # Trả về max 10 ảnh
+            # Chọn biến thể CDN nhỏ nhất đủ cho khung render thay vì ảnh gốc
+            return self._resolve_image_urls(filtered[:10])  # Trả về max 10 ảnh
         except Exception as e:
             logger.error(f"❌ Failed to get images: {e}")
             return []
     
     def _filter_product_images(self, image_urls: List[str]) -> List[str]:
         """Filter to keep only real product images, remove banners/vouchers/models"""
-        filtered = []
-        
-        for url in image_urls:
+        if not image_urls:
+            return []
+
+        def check(url):
             try:
-                if self._is_product_image(url):
-                    filtered.append(url)
+                return self._is_product_image(url)
             except Exception as e:
                 logger.debug(f"⚠️ Failed to check image {url}: {e}")
                 # If check fails, keep it (safe default)
-                filtered.append(url)
-        
-        return filtered
+                return True
+
+        # Probe song song trên pool chung (không vượt pool_maxsize của adapter), giữ nguyên thứ tự ảnh
+        keep = list(image_pool().map(check, image_urls))
+        return [url for url, ok in zip(image_urls, keep) if ok]
     
     def _is_product_image(self, url: str) -> bool:
         """
@@ -313,33 +497,131 @@ class ShopeeScraper(BaseScraper):
                 logger.debug(f"❌ Rejected: Not Shopee CDN")
                 return False
             
-            # Download image
-            response = requests.get(url, timeout=5, stream=True)
-            response.raise_for_status()
-            img = Image.open(BytesIO(response.content)).convert('RGB')
-            
-            # 1. Check aspect ratio (banners usually wide, products square-ish)
-            width, height = img.size
-            aspect_ratio = width / height
-            
-            # CHỈ loại bỏ banner CỰC KỲ rõ ràng (quá ngang)
-            if aspect_ratio > 8.0 or aspect_ratio < 0.12:
-                logger.debug(f"❌ Rejected: Extreme aspect ratio {aspect_ratio:.2f}")
-                return False
-            
-            # 2. Check size - chỉ loại ảnh icon cực nhỏ
-            if width < 100 or height < 100:
-                logger.debug(f"❌ Rejected: Too small {width}x{height}")
-                return False
-            
-            # TẮT text overlay check - quá nhiều false positive
-            # TẮT color distribution check - quá nhiều false positive
-            
-            return True  # Pass most images
+            # Chỉ đọc header ảnh (vài KB) của bản thumbnail để lấy kích thước.
+            # Thumbnail không phóng to ảnh nhỏ: tn < 100px ⇔ gốc < 100px, tỉ lệ giữ nguyên
+            try:
+                size = self._probe_image_size(shopee_image_variant(url, PROBE_VARIANT))
+            except requests.HTTPError:
+                size = self._probe_image_size(url, accept=self._acceptable_size)
+            if size is None:
+                logger.debug("⚠️ Image size unknown, keeping image")
+                return True
+            return self._acceptable_size(*size)
             
         except Exception as e:
             logger.debug(f"⚠️ Image check failed: {e}, keeping image")
             return True  # Safe default: keep if unable to check
+
+    @staticmethod
+    def _acceptable_size(width: int, height: int) -> bool:
+        """Aspect ratio + minimum size rules for product images"""
+        # 1. Check aspect ratio (banners usually wide, products square-ish)
+        aspect_ratio = width / height
+        
+        # CHỈ loại bỏ banner CỰC KỲ rõ ràng (quá ngang)
+        if aspect_ratio > 8.0 or aspect_ratio < 0.12:
+            logger.debug(f"❌ Rejected: Extreme aspect ratio {aspect_ratio:.2f}")
+            return False
+        
+        # 2. Check size - chỉ loại ảnh icon cực nhỏ
+        if width < 100 or height < 100:
+            logger.debug(f"❌ Rejected: Too small {width}x{height}")
+            return False
+        
+        # TẮT text overlay check - quá nhiều false positive
+        # TẮT color distribution check - quá nhiều false positive
+        return True  # Pass most images
+
+    def _probe_image_size(self, url: str, accept=None) -> Optional[Tuple[int, int]]:
+        """
+        Image (width, height) from the first PROBE_BYTES only (HTTP Range + streaming read).
+        Args:
+            accept: size rule of an image that will be rendered from this URL. If it
+                passes and the whole file arrived anyway (small image, or the server
+                ignored Range and PREFETCH_ACCEPTED), the bytes are handed to the
+                fetched-image cache so the renderer does not download them again.
+                None → probe only (e.g. thumbnail variants)
+        """
+        headers = {'Range': f'bytes=0-{self.PROBE_BYTES - 1}'}
+        with self.session.get(url, headers=headers, stream=True, timeout=5) as resp:
+            resp.raise_for_status()
+            parser = ImageFile.Parser()
+            chunks: List[bytes] = []
+            got = 0
+            size = None
+            for chunk in resp.iter_content(chunk_size=4096):
+                chunks.append(chunk)
+                got += len(chunk)
+                if size is None:
+                    parser.feed(chunk)
+                    if parser.image is not None:
+                        size = parser.image.size
+                if got >= self.PROBE_BYTES and (resp.status_code == 206 or size is not None):
+                    break
+            if size is None:
+                return None
+
+            total = self._content_length(resp)
+            complete = total is not None and got >= total
+            if accept is None or not accept(*size):
+                return size
+            if not complete and resp.status_code == 200 and self.PREFETCH_ACCEPTED:
+                # Range ignored: the rest is needed for rendering anyway
+                for chunk in resp.iter_content(chunk_size=64 * 1024):
+                    chunks.append(chunk)
+                complete = True
+            if complete:
+                store_fetched_image(url, b"".join(chunks))
+            return size
+
+    def _resolve_image_urls(self, urls: List[str]) -> List[str]:
+        """Smallest adequate CDN variant for each image (concurrent, order kept)"""
+        if not urls:
+            return []
+        return list(image_pool().map(self._resolve_image_variant, urls))
+
+    def _resolve_image_variant(self, url: str) -> str:
+        """
+        Smallest CDN size variant at least `image_width` wide that the CDN serves;
+        falls back to larger variants and finally the original on 404/errors.
+        With PREFETCH_ACCEPTED the chosen variant is downloaded right away into the
+        fetched-image cache under the exact URL returned, so the ranker and the
+        renderer read it from disk (otherwise a HEAD request only checks it exists).
+        """
+        base = shopee_image_base(url)
+        for suffix, width in CDN_VARIANTS:
+            if width < self.image_width:
+                continue
+            candidate = base + suffix
+            if os.path.exists(fetched_image_path(candidate)):
+                return candidate
+            try:
+                if self.PREFETCH_ACCEPTED:
+                    with self.session.get(candidate, stream=True, timeout=10) as resp:
+                        status = resp.status_code
+                        if status < 400:
+                            data = b"".join(resp.iter_content(chunk_size=64 * 1024))
+                            if store_fetched_image(candidate, data):
+                                return candidate
+                            status = "undecodable"
+                else:
+                    status = self.session.head(candidate, timeout=5, allow_redirects=True).status_code
+                    if status < 400:
+                        return candidate
+                logger.debug(f"CDN variant {suffix} → {status}, trying larger")
+            except requests.RequestException as e:
+                logger.debug(f"CDN variant {suffix} check failed: {e}")
+        return base
+
+    @staticmethod
+    def _content_length(resp) -> Optional[int]:
+        """Full file size from Content-Range (206) or Content-Length (200)"""
+        content_range = resp.headers.get('Content-Range', '')
+        if '/' in content_range:
+            total = content_range.rsplit('/', 1)[1].strip()
+            return int(total) if total.isdigit() else None
+        length = resp.headers.get('Content-Length', '')
+        return int(length) if resp.status_code == 200 and length.isdigit() else None
     
     def _has_heavy_text_overlay(self, img: Image.Image) -> bool:
         """Detect if image has heavy text overlay (banner characteristic)"""
@@ -449,4 +731,190 @@ class ShopeeScraper(BaseScraper):
             return str(price).strip() if price else '0'
         except Exception as e:
             logger.debug(f"⚠️ Failed to get price: {e}")
-            return '0'
\ No newline at end of file
+            return '0'
+
+
+def should_block_request(url: str, resource_type: str) -> bool:
+    """True for requests a scrape tab never needs (images/video/fonts, analytics beacons)"""
+    return resource_type in BLOCKED_RESOURCE_TYPES or any(part in url for part in BLOCKED_URL_PARTS)
+
+
+class ShopeeSession:
+    """
+    Long-lived scraping session on the CDP-connected Chrome.
+    Each worker thread keeps its own Playwright connection and one warm tab
+    (sync Playwright objects must stay on the thread that created them) with
+    page.route rules that abort images, media, fonts and analytics. Products
+    are pulled from a shared queue, so a batch runs `tabs` pages at a time.
+    A tab that cannot reach Chrome fails its jobs fast and reconnects on a
+    later job with exponential backoff (e.g. Chrome started after the session).
+
+    with ShopeeSession(tabs=4) as session:
+        results = session.scrape_many(urls)
+    """
+
+    CONNECT_RETRY_BASE = 2.0   # Giây chờ trước lần kết nối lại CDP đầu tiên
+    CONNECT_RETRY_MAX = 60.0   # Trần backoff
+
+    def __init__(self, tabs: int = 4, scraper: ShopeeScraper = None,
+                 cdp_url: str = CDP_URL, block_resources: bool = True):
+        """
+        Args:
+            tabs: number of tabs scraping concurrently
+            scraper: ShopeeScraper used for the per-page logic (shared image session)
+            block_resources: install the page.route blocking rules on each tab
+        """
+        self.tabs = max(1, tabs)
+        self.scraper = scraper or ShopeeScraper()
+        self.cdp_url = cdp_url
+        self.block_resources = block_resources
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _start(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ShopeeSession is closed")
+            while len(self._workers) < self.tabs:
+                t = threading.Thread(target=self._worker, name=f"shopee-tab-{len(self._workers)}", daemon=True)
+                t.start()
+                self._workers.append(t)
+
+    def submit(self, url: str) -> Future:
+        """Queue one product; the Future resolves to the scrape dict"""
+        self._start()
+        future: Future = Future()
+        self._jobs.put((url, future))
+        return future
+
+    def scrape(self, url: str) -> Dict:
+        return self.submit(url).result()
+
+    def scrape_many(self, urls: List[str], on_result=None) -> List[Dict]:
+        """
+        Scrape a batch across the tab pool.
+        Args:
+            on_result: optional callback(index, data) as each product finishes
+        Returns: one dict per URL, in input order (failures carry '_scrape_failed')
+        """
+        futures = [self.submit(url) for url in urls]
+        if on_result:
+            for i, f in enumerate(futures):
+                f.add_done_callback(lambda fut, i=i: on_result(i, fut.result()))
+        started = time.time()
+        results = [f.result() for f in futures]
+        failed = sum(1 for r in results if r.get("_scrape_failed"))
+        logger.info(f"🛒 Batch Shopee: {len(results) - failed}/{len(results)} sản phẩm "
+                    f"trong {time.time() - started:.1f}s ({self.tabs} tab)")
+        return results
+
+    def close(self):
+        """Stop the workers and close their tabs (Chrome itself keeps running)"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._jobs.put(None)
+        for t in workers:
+            t.join(timeout=30)
+
+    def _route(self, route):
+        request = route.request
+        if should_block_request(request.url, request.resource_type):
+            route.abort()
+        else:
+            route.continue_()
+
+    def _failed(self, url: str, error: str) -> Dict:
+        out = self.scraper._empty_data(url)
+        out["_scrape_failed"] = True
+        out["_scrape_error"] = error
+        return out
+
+    def _open_tab(self, p):
+        """
+        Connect to Chrome over CDP and open one tab with the blocking rules.
+        Returns: (browser, page) - close both with _close_tab
+        """
+        browser = p.chromium.connect_over_cdp(self.cdp_url)
+        try:
+            page = browser.contexts[0].new_page()
+            page.set_extra_http_headers({"User-Agent": BROWSER_UA})
+            if self.block_resources:
+                page.route("**/*", self._route)
+        except Exception:
+            self._close_tab(browser, None)
+            raise
+        return browser, page
+
+    @staticmethod
+    def _close_tab(browser, page):
+        """Close our tab and drop the CDP connection (Chrome itself keeps running)"""
+        for obj in (page, browser):
+            if obj is None:
+                continue
+            try:
+                obj.close()
+            except Exception:
+                pass
+
+    def _worker(self):
+        """One tab: connect (retrying with backoff), then scrape queued products until close()"""
+        browser = page = None
+        connect_error = None
+        retry_at = 0.0
+        delay = self.CONNECT_RETRY_BASE
+
+        with sync_playwright() as p:
+            def connect():
+                nonlocal browser, page, connect_error, retry_at, delay
+                # Kết nối cũ (nếu còn) phải đóng trước, không thì websocket CDP bị rò
+                self._close_tab(browser, page)
+                browser = page = None
+                try:
+                    browser, page = self._open_tab(p)
+                    if connect_error is not None:
+                        logger.info("✅ Đã kết nối lại tab scrape qua CDP")
+                    connect_error, delay = None, self.CONNECT_RETRY_BASE
+                except Exception as e:
+                    connect_error = str(e)
+                    retry_at = time.time() + delay
+                    logger.error(f"❌ Không mở được tab scrape qua CDP (thử lại sau {delay:.0f}s): {e}")
+                    delay = min(delay * 2, self.CONNECT_RETRY_MAX)
+
+            connect()
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                url, future = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if page is None and time.time() >= retry_at:
+                    connect()
+                if page is None:
+                    # Vẫn nhận job để batch không bị treo khi Chrome chưa mở port debug
+                    future.set_result(self._failed(url, connect_error))
+                    continue
+                try:
+                    future.set_result(self.scraper._scrape_page(page, url))
+                except Exception as e:
+                    logger.error(f"❌ Scraper Error ({url[:60]}): {e}")
+                    future.set_result(self._failed(url, str(e)))
+                    if page.is_closed():
+                        # Chrome/tab bị đóng giữa chừng → mở lại ở job sau
+                        self._close_tab(browser, page)
+                        browser = page = None
+                        connect_error = str(e)
+
+            self._close_tab(browser, page)
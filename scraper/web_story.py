@@ -177,7 +177,7 @@ class WebStoryCScraper:
             logger.info("🖼️ Searching for relevant images...")
             image_paths = []
             try:
-                from video.image_searcher import ImageSearcher, extract_keywords
+                from video.image_searcher import IMAGE_OUTPUT_DIR, ImageSearcher, extract_keywords
                 searcher = ImageSearcher()
                 
                 # Estimate number of images needed based on content length
@@ -189,7 +189,7 @@ class WebStoryCScraper:
                     logger.info(f"⬇️ Downloading {len(article_images[:estimated_scenes])} images from article...")
                     for idx, img_url in enumerate(article_images[:estimated_scenes], 1):
                         try:
-                            path = searcher._download_image(img_url, "assets/temp/web_story_images", idx, referer=url)
+                            path = searcher._download_image(img_url, IMAGE_OUTPUT_DIR, idx, referer=url)
                             if path:
                                 image_paths.append(path)
                                 logger.info(f"✅ Article image {idx} downloaded")
@@ -203,30 +203,25 @@ class WebStoryCScraper:
                     needed = estimated_scenes - len(image_paths)
                     logger.info(f"🔍 Need {needed} more images, searching Google Images by scene text...")
                     
-                    # Split content into chunks and search for each
+                    # Split content into chunks; all chunks are searched in parallel with
+                    # Bing on the chunk text, hedged with keyword search per scene
                     chunks = content.split('\n\n')[:needed]
+                    scenes = []
                     for scene_idx, chunk in enumerate(chunks, len(image_paths) + 1):
                         # Extract key phrase from chunk
                         words = chunk.split()[:15]  # First 15 words as search query
                         search_query = ' '.join(words)
-                        
                         logger.info(f"🔎 Scene {scene_idx}: Searching images for: {search_query[:50]}...")
-                        try:
-                            # Try Google Images search
-                            google_paths = searcher.search_google_images(search_query, num_images=1, output_dir="assets/temp/web_story_images", index=scene_idx)
-                            if google_paths:
-                                image_paths.extend(google_paths)
-                                logger.info(f"✅ Scene {scene_idx} image found via Google Images")
-                            else:
-                                # Fallback: use generic keyword search with correct index
-                                logger.info(f"⚠️ Google Images failed for scene {scene_idx}, trying keyword fallback...")
-                                keywords = extract_keywords(search_query, '', '')
-                                keyword_str = ' '.join(keywords[:2])
-                                fallback_paths = searcher.search_and_download(keyword_str, num_images=1, output_dir="assets/temp/web_story_images", start_index=scene_idx)
-                                if fallback_paths:
-                                    image_paths.extend(fallback_paths)
-                        except Exception as e:
-                            logger.warning(f"Failed to find image for scene {scene_idx}: {e}")
+                        keywords = extract_keywords(search_query, '', '')
+                        scenes.append({'query': search_query, 'fallback_query': ' '.join(keywords[:2])})
+                    try:
+                        # Start after every index the article downloads used (even failed ones)
+                        first_free = len(article_images[:estimated_scenes]) + 1
+                        found = searcher.acquire_scene_images(scenes, output_dir=IMAGE_OUTPUT_DIR,
+                                                              start_index=first_free)
+                        image_paths.extend(p for p in found if p)
+                    except Exception as e:
+                        logger.warning(f"Failed to find images for scenes: {e}")
                 
                 # Filter out None/invalid values
                 image_paths = [p for p in image_paths if p and isinstance(p, str) and os.path.exists(p)]
@@ -0,0 +1,68 @@
+import shutil
+import subprocess
+import tempfile
+
+import pytest
+
+from utils.helpers import get_ffmpeg_exe
+
+# Distinct flat colors so every cut is a hard brightness change
+_COLORS = ["black", "white", "gray", "navy", "yellow", "darkred", "lime", "purple"]
+
+_session_images = None
+
+
+def pytest_configure(config):
+    """run_renderer_test.py renders at import time (collection): keep its job folders out of assets/ too"""
+    global _session_images
+    import video.image_searcher as image_searcher
+    _session_images = tempfile.mkdtemp(prefix="test_images_")
+    image_searcher.IMAGE_OUTPUT_DIR = _session_images
+
+
+def pytest_unconfigure(config):
+    if _session_images:
+        shutil.rmtree(_session_images, ignore_errors=True)
+
+
+@pytest.fixture
+def make_clip(tmp_path):
+    """
+    Build a synthetic H.264 clip of solid-color shots.
+    make_clip([3, 3], tone_from=4) → 6s clip with a cut at 3s and a loud tone from 4s.
+    """
+    def _make(shot_lengths, fps=25, size="160x90", tone_from=None, name="clip.mp4", gop=None):
+        path = tmp_path / name
+        cmd = [get_ffmpeg_exe(), "-y", "-loglevel", "error"]
+        for i, length in enumerate(shot_lengths):
+            cmd += ["-f", "lavfi", "-i", f"color=c={_COLORS[i % len(_COLORS)]}:s={size}:r={fps}:d={length}"]
+        total = sum(shot_lengths)
+        expr = f"if(gte(t,{tone_from}),0.8*sin(2*PI*440*t),0)" if tone_from is not None else "0"
+        cmd += ["-f", "lavfi", "-i", f"aevalsrc='{expr}':s=44100:d={total}"]
+        n = len(shot_lengths)
+        streams = "".join(f"[{i}:v]" for i in range(n))
+        cmd += ["-filter_complex", f"{streams}concat=n={n}:v=1:a=0[v]",
+                "-map", "[v]", "-map", f"{n}:a", "-c:v", "libx264", "-pix_fmt", "yuv420p"]
+        if gop:
+            cmd += ["-g", str(gop)]
+        cmd += ["-c:a", "aac", "-shortest", str(path)]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, timeout=120)
+        except (OSError, subprocess.CalledProcessError):
+            pytest.skip("ffmpeg not available")
+        return str(path)
+    return _make
+
+
+@pytest.fixture(autouse=True)
+def _isolated_scene_cache(tmp_path, monkeypatch):
+    """Keep scene detection / vision / image caches and image job folders out of assets/ during tests"""
+    import utils.fetch_cache as fetch_cache
+    import video.image_searcher as image_searcher
+    import video.scene_analyzer as scene_analyzer
+    import video.scene_detector as scene_detector
+    monkeypatch.setattr(image_searcher, "IMAGE_CACHE_DIR", str(tmp_path / "image_cache"))
+    monkeypatch.setattr(image_searcher, "IMAGE_OUTPUT_DIR", str(tmp_path / "images"))
+    monkeypatch.setattr(fetch_cache, "IMAGE_FETCH_DIR", str(tmp_path / "fetched_images"))
+    monkeypatch.setattr(scene_detector, "SCENE_CACHE_DIR", str(tmp_path / "scene_cache"))
+    monkeypatch.setattr(scene_analyzer, "VISION_CACHE_PATH", str(tmp_path / "vision_cache.json"))
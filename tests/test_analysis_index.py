@@ -0,0 +1,71 @@
+import numpy as np
+
+from utils.helpers import file_content_hash
+from video.analysis_index import AnalysisIndex
+from video.clipper import VideoHighlightDetector
+
+
+def test_file_content_hash_tracks_content(tmp_path):
+    a = tmp_path / "a.bin"
+    b = tmp_path / "b.bin"
+    a.write_bytes(b"x" * 5000)
+    b.write_bytes(b"x" * 5000)
+    assert file_content_hash(str(a)) == file_content_hash(str(b))
+    b.write_bytes(b"x" * 4999 + b"y")
+    assert file_content_hash(str(a)) != file_content_hash(str(b))
+
+
+def test_index_roundtrip_merges_columns(tmp_path):
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"fake video bytes")
+    idx = AnalysisIndex(index_dir=str(tmp_path / "idx"))
+    idx.update(str(video), {"duration": 12.5, "rms": np.arange(12, dtype=np.float32)})
+    idx.update(str(video), {"transcript_text": np.array(["xin chào", "bàn thắng"])})
+
+    fresh = AnalysisIndex(index_dir=str(tmp_path / "idx"))
+    cols = fresh.load(str(video))
+    assert float(cols["duration"]) == 12.5
+    assert cols["rms"].dtype == np.float32 and len(cols["rms"]) == 12
+    assert list(cols["transcript_text"]) == ["xin chào", "bàn thắng"]
+
+
+def test_index_sidecars_pruned_by_age_then_size(tmp_path, monkeypatch):
+    import os
+    import time
+    import utils.disk_cache as disk_cache
+    import video.analysis_index as analysis_index
+    monkeypatch.setattr(disk_cache, "_pruned_roots", set())
+    monkeypatch.setattr(analysis_index, "INDEX_MAX_BYTES", 1000)
+    idx_dir = tmp_path / "idx"
+    idx_dir.mkdir()
+    now = time.time()
+    for name, age in [("stale.npz", 60 * 86400), ("old.npz", 3600), ("recent.npz", 60)]:
+        (idx_dir / name).write_bytes(b"x" * 600)
+        os.utime(idx_dir / name, (now - age, now - age))
+
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"fake video bytes")
+    AnalysisIndex(index_dir=str(idx_dir)).update(str(video), {"duration": 3.0})
+    left = sorted(os.listdir(idx_dir))
+    assert "stale.npz" not in left and "old.npz" not in left and "recent.npz" in left
+    assert len(left) == 2
+
+
+def test_detector_requery_reads_index_not_media(tmp_path):
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"fake video bytes")
+    det = VideoHighlightDetector()
+    det.index = AnalysisIndex(index_dir=str(tmp_path / "idx"))
+    rms = np.full(120, 0.1, dtype=np.float32)
+    rms[[15, 60, 100]] = 1.0
+    det.index.update(str(video), {"duration": 120.0, "rms": rms, "shots": np.zeros(0)})
+
+    def no_decode(path):
+        raise AssertionError("media should not be decoded on index hit")
+    det._get_video = no_decode
+
+    three = det.detect_highlights(str(video), num_clips=3)
+    one = det.detect_highlights(str(video), num_clips=1)
+    assert 1 <= len(three) <= 3
+    assert len(one) == 1
+    assert all(0.0 <= h["start"] < h["end"] <= 120.0 for h in three + one)
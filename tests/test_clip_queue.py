@@ -0,0 +1,106 @@
+import threading
+import time
+
+import video.clip_queue as clip_queue
+from video.clip_queue import ClipQueue
+
+
+class FakeDownloader:
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+
+    def download(self, url):
+        time.sleep(0.05)
+        if "broken" in url:
+            return None
+        path = self.tmp_path / f"{url.rsplit('/', 1)[-1]}.mp4"
+        path.write_bytes(b"video")
+        return str(path)
+
+
+class FakeDetector:
+    active = {"analyze": 0}
+    overlap = []
+    lock = threading.Lock()
+
+    def __init__(self, **kwargs):
+        self.index = None
+
+    def configure_durations(self, format, clip_duration):
+        pass
+
+    def detect_highlights(self, path, num_clips, method="audio"):
+        with self.lock:
+            self.active["analyze"] += 1
+        time.sleep(0.1)
+        with self.lock:
+            self.active["analyze"] -= 1
+        return [{"start": 0.0, "end": 10.0, "score": 1.0}]
+
+    def cut_clip(self, path, start, end, output_path, use_cache=True):
+        # another item should be analyzing while this one is cut
+        with self.lock:
+            self.overlap.append(self.active["analyze"])
+        time.sleep(0.1)
+        return True
+
+    def cleanup(self):
+        pass
+
+    clip_filename = staticmethod(clip_queue.VideoHighlightDetector.clip_filename)
+
+
+def test_pipeline_isolates_failures_and_overlaps_stages(tmp_path, monkeypatch):
+    monkeypatch.setattr(clip_queue, "VideoHighlightDetector", FakeDetector)
+    q = ClipQueue(output_dir=str(tmp_path / "clips"), num_clips=1)
+    q.downloader = FakeDownloader(tmp_path)
+
+    urls = [f"https://example.com/v{i}" for i in range(4)]
+    urls.insert(2, "https://example.com/broken")
+    results = q.run(urls)
+
+    assert [r["url"] for r in results] == urls
+    assert results[2]["error"] and results[2]["failed_stage"] == "download"
+    assert all(len(r["clips"]) == 1 and not r["error"] for i, r in enumerate(results) if i != 2)
+    assert any(n > 0 for n in FakeDetector.overlap)
+    # per-item output folders avoid clip name collisions
+    assert len({r["clips"][0] for r in results if r["clips"]}) == 4
+
+
+def test_downloads_do_not_wait_for_busy_analyzer(tmp_path, monkeypatch):
+    analyzed = []
+
+    class SlowAnalyzer(FakeDetector):
+        def detect_highlights(self, path, num_clips, method="audio"):
+            time.sleep(0.1)
+            analyzed.append(time.monotonic())
+            return [{"start": 0.0, "end": 10.0, "score": 1.0}]
+
+    downloaded = []
+
+    class TimedDownloader(FakeDownloader):
+        def download(self, url):
+            path = super().download(url)
+            downloaded.append(time.monotonic())
+            return path
+
+    monkeypatch.setattr(clip_queue, "VideoHighlightDetector", SlowAnalyzer)
+    q = ClipQueue(output_dir=str(tmp_path / "clips"), num_clips=1, download_workers=2)
+    q.downloader = TimedDownloader(tmp_path)
+    results = q.run([f"https://example.com/v{i}" for i in range(8)])
+
+    assert all(r["clips"] for r in results)
+    # 8 downloads on 2 download threads finish long before the single analyzer drains
+    assert max(downloaded) < sorted(analyzed)[3]
+
+
+def test_audio_first_queue_does_not_snap_by_default(tmp_path):
+    assert ClipQueue(output_dir=str(tmp_path), audio_first=True).snap_to_shots is False
+    assert ClipQueue(output_dir=str(tmp_path)).snap_to_shots is True
+
+
+def test_is_playlist_url():
+    assert ClipQueue.is_playlist_url("https://www.youtube.com/playlist?list=PL123")
+    assert ClipQueue.is_playlist_url("https://www.tiktok.com/@someone")
+    assert not ClipQueue.is_playlist_url("https://www.youtube.com/watch?v=abc&list=PL123")
+    assert not ClipQueue.is_playlist_url("https://www.tiktok.com/@someone/video/123")
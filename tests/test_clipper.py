@@ -0,0 +1,67 @@
+import numpy as np
+
+from video.analysis_index import AnalysisIndex
+from video.clipper import SmartClipper
+
+
+class FakeDownloader:
+    def __init__(self, analysis_path):
+        self.analysis_path = analysis_path
+        self.sections = None
+        self.with_video = None
+
+    def download_analysis_media(self, url, with_video=False):
+        self.with_video = with_video
+        return self.analysis_path
+
+    def download_sections(self, url, ranges, output_paths, max_workers=3):
+        self.sections = list(ranges)
+        # second range fails
+        return [p if i != 1 else None for i, p in enumerate(output_paths)]
+
+
+def test_audio_first_fetches_only_highlight_ranges(tmp_path):
+    audio = tmp_path / "abc.analysis.m4a"
+    audio.write_bytes(b"fake audio")
+    clipper = SmartClipper()
+    clipper.detector.index = AnalysisIndex(index_dir=str(tmp_path / "idx"))
+    rms = np.full(600, 0.1, dtype=np.float32)
+    rms[[100, 300, 500]] = 1.0
+    clipper.detector.index.update(str(audio), {"duration": 600.0, "rms": rms, "shots": np.zeros(0)})
+
+    dl = FakeDownloader(str(audio))
+    result = clipper._clip_audio_first(dl, "https://example.com/v", 3, "short", True,
+                                       "audio", None, str(tmp_path / "clips"))
+
+    assert dl.with_video is False  # no video proxy unless snapping is requested
+    assert dl.sections and all(end - start <= 30 for start, end in dl.sections)
+    assert len(result["clips"]) == len(dl.sections) - 1
+    assert len(result["highlights"]) == len(result["clips"])
+    assert not audio.exists()
+
+
+def test_snap_to_shots_moves_edges_to_cuts():
+    det = SmartClipper().detector
+    det.configure_durations('short')  # 15-30s
+    features = {
+        "duration": 100.0,
+        "shots": np.array([19.2, 41.0, 80.0]),
+        "shot_sample_fps": np.array(4.0),
+        "keyframes": np.array([0.0, 19.0, 40.0]),
+    }
+    out = det._snap_to_shots([{"start": 20.0, "end": 40.0, "score": 1.0},
+                              {"start": 60.0, "end": 75.0, "score": 0.5}], features)
+    # start snaps to keyframe inside the cut interval, end to the sample before the cut
+    assert out[0]["start"] == 19.0
+    assert out[0]["end"] == 40.75
+    # nothing within tolerance: unchanged
+    assert (out[1]["start"], out[1]["end"]) == (60.0, 75.0)
+
+
+def test_section_download_only_accepts_final_merged_file():
+    from video.downloader import VideoDownloader
+    final = VideoDownloader._final_filepath
+    assert final({'requested_downloads': [{'filepath': '/t/clip_01.mp4'}]}) == '/t/clip_01.mp4'
+    assert final({'requested_downloads': [{'filepath': '/t/clip_01.f137.mp4'}]}) is None
+    assert final({'filepath': '/t/clip_01.webm.part'}) is None
+    assert final(None) is None
@@ -0,0 +1,50 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from utils.image_ingest import normalize_image_bytes, open_scaled
+
+
+def _encode(size, fmt="JPEG", mode="RGB"):
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 255, (size[1] // 40 + 1, size[0] // 40 + 1, 4 if mode == "RGBA" else 3),
+                          dtype=np.uint8)
+    img = Image.fromarray(pixels, mode).resize(size, Image.NEAREST)
+    buf = io.BytesIO()
+    img.save(buf, fmt)
+    return buf.getvalue()
+
+
+def test_conforming_jpeg_passes_through_byte_for_byte():
+    data = _encode((1080, 1440))
+    out, preview = normalize_image_bytes(data, max_side=1920)
+    assert out is data
+    assert max(preview.size) <= 256 * 2  # decoded at reduced DCT scale
+
+
+def test_oversized_and_non_jpeg_are_normalized_once():
+    big, _ = normalize_image_bytes(_encode((4000, 3000)), max_side=1920)
+    assert Image.open(io.BytesIO(big)).size == (1920, 1440)
+
+    png, _ = normalize_image_bytes(_encode((600, 800), "PNG", "RGBA"), max_side=1920)
+    img = Image.open(io.BytesIO(png))
+    assert img.format == "JPEG" and img.mode == "RGB" and img.size == (600, 800)
+
+
+def test_open_scaled_uses_draft_for_large_jpeg(tmp_path):
+    path = tmp_path / "big.jpg"
+    path.write_bytes(_encode((4320, 7680)))
+    img = open_scaled(str(path), (1080, 1920))
+    # 1/4 DCT scale already covers the render box
+    assert img.size == (1080, 1920) and img.mode == "RGB"
+
+
+def test_open_scaled_returns_decoded_image_with_file_closed(tmp_path):
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(_encode((800, 600)))
+    img = open_scaled(str(path), (1080, 1920))
+    # RGB JPEG: trả về đúng object đã mở, nhưng đã decode và đóng file
+    assert img.mode == "RGB" and getattr(img, "fp", None) is None
+    path.unlink()
+    assert img.getpixel((10, 10)) is not None
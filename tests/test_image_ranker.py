@@ -0,0 +1,96 @@
+import io
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from utils.fetch_cache import fetched_image_path, prune_fetched_images
+from video.image_ranker import ImageQualityRanker
+
+
+def _photo(seed, size=800):
+    rng = np.random.default_rng(seed)
+    detail = rng.integers(40, 220, (size // 8, size // 8, 3), dtype=np.uint8)
+    return Image.fromarray(detail).resize((size, size), Image.NEAREST)
+
+
+def test_select_prefers_clean_sharp_distinct_images(tmp_path):
+    def save(img, name):
+        path = tmp_path / name
+        img.save(path, "JPEG", quality=92)
+        return str(path)
+
+    good = save(_photo(1), "good.jpg")
+    blurry = save(_photo(2).filter(ImageFilter.GaussianBlur(12)), "blurry.jpg")
+    dark = save(Image.fromarray((np.asarray(_photo(3)) * 0.1).astype(np.uint8)), "dark.jpg")
+    banner = _photo(4)
+    draw = ImageDraw.Draw(banner)
+    font = ImageFont.load_default(size=70)
+    for y in range(0, 800, 160):
+        draw.rectangle((0, y, 800, y + 90), fill="red")
+        draw.text((10, y), "SALE 50% FREESHIP", font=font, fill="white")
+    banner = save(banner, "banner.jpg")
+    duplicate = save(_photo(1).resize((700, 700)), "duplicate.jpg")
+    other = save(_photo(5), "other.jpg")
+    missing = str(tmp_path / "missing.jpg")
+
+    sources = [dark, good, banner, blurry, duplicate, missing, other]
+    ranked = ImageQualityRanker().score(sources)
+    assert ranked[4]["duplicate_of"] == 1
+    assert ranked[5]["path"] is None
+    assert ranked[2]["text_density"] > ranked[1]["text_density"]
+
+    # best two, scraped order kept
+    assert ImageQualityRanker().select(sources, 2) == [good, other]
+
+
+def test_remote_candidates_are_fetched_once_and_localized(tmp_path):
+    buf = io.BytesIO()
+    _photo(7).save(buf, "JPEG")
+
+    class Session:
+        calls = 0
+
+        def get(self, url, timeout=None):
+            Session.calls += 1
+            resp = type("R", (), {})()
+            resp.content = buf.getvalue()
+            resp.raise_for_status = lambda: None
+            return resp
+
+    url = "https://img.example.com/abc.jpg"
+    picked = ImageQualityRanker(session=Session()).select([url], 1)
+    assert picked == [fetched_image_path(url)]
+    ImageQualityRanker(session=Session()).select([url], 1)
+    assert Session.calls == 1
+
+
+def test_cdn_candidates_are_scored_from_thumbnails(tmp_path):
+    buf = io.BytesIO()
+    _photo(8, size=330).save(buf, "JPEG")
+    requested = []
+
+    class Session:
+        def get(self, url, timeout=None):
+            requested.append(url)
+            resp = type("R", (), {})()
+            resp.content = buf.getvalue()
+            resp.raise_for_status = lambda: None
+            return resp
+
+    url = "https://down-vn.img.susercontent.com/file/abc@resize_w900_nl"
+    picked = ImageQualityRanker(session=Session()).select([url], 1)
+    assert requested == ["https://down-vn.img.susercontent.com/file/abc_tn"]
+    # the renderer gets the full-size URL back, not the 330px thumbnail
+    assert picked == [url]
+
+
+def test_fetch_dir_pruned_by_age_then_size(tmp_path):
+    import os
+    import time
+    now = time.time()
+    for name, age, size in [("old.jpg", 10_000, 10), ("a.jpg", 300, 400), ("b.jpg", 200, 400), ("c.jpg", 100, 400)]:
+        path = tmp_path / name
+        path.write_bytes(b"x" * size)
+        os.utime(path, (now - age, now - age))
+    prune_fetched_images(str(tmp_path), max_age=1000, max_bytes=900)
+    assert sorted(os.listdir(tmp_path)) == ["b.jpg", "c.jpg"]
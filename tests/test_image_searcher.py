@@ -0,0 +1,205 @@
+import io
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from video.image_searcher import ImageQueryCache, ImageSearcher
+
+
+def _jpeg(size=(400, 300), color=(200, 30, 30), seed=0):
+    """Blocky random texture tinted by `color` (distinct seeds → distinct pHashes)"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 255, (6, 8), dtype=np.uint8)
+    texture = np.asarray(Image.fromarray(blocks).resize(size, Image.NEAREST), dtype=np.float32) / 255.0
+    pixels = (texture[..., None] * np.array(color, dtype=np.float32)).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, content=b"", content_type="image/jpeg", text=""):
+        self.content = content
+        self.text = text
+        self.headers = {"content-type": content_type}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Bing results page + image hosts; records per-host concurrency"""
+
+    def __init__(self, images):
+        self.images = images
+        self.active = {}
+        self.peak = {}
+        self.total_active = 0
+        self.total_peak = 0
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, timeout=None, allow_redirects=True):
+        with self.lock:
+            self.fetched.append(url)
+        if "bing.com" in url:
+            page = "".join(f'<a m="{{&quot;murl&quot;:&quot;{u}&quot;}}">' for u in self.images)
+            return FakeResponse(text=page, content_type="text/html")
+        host = url.split("/")[2]
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+            self.total_active += 1
+            self.total_peak = max(self.total_peak, self.total_active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active[host] -= 1
+            self.total_active -= 1
+        content, ctype = self.images[url]
+        return FakeResponse(content, ctype)
+
+
+def test_bing_search_validates_in_memory_and_writes_per_job(tmp_path):
+    images = {
+        "https://a.example/broken.jpg": (b"not an image", "image/jpeg"),
+        "https://a.example/icon.png": (_jpeg((64, 64)), "image/png"),
+        "https://a.example/logo.svg": (b"<svg/>", "image/svg+xml"),
+        "https://a.example/one.jpg": (_jpeg(seed=1), "image/jpeg"),
+        "https://b.example/two.jpg": (_jpeg(color=(10, 10, 200), seed=2), "image/jpeg"),
+        "https://a.example/three.jpg": (_jpeg(seed=3), "image/jpeg"),
+    }
+    out = str(tmp_path / "images")
+    first, second = ImageSearcher(per_host=2), ImageSearcher(per_host=2)
+    first.session = FakeSession(images)
+    second.session = FakeSession(images)
+
+    paths = first.search_google_images("cat on a sofa", num_images=2, output_dir=out, index=3)
+    other = second.search_google_images("cat on a sofa", num_images=1, output_dir=out, index=3)
+
+    assert [p.rsplit("image_", 1)[1] for p in paths] == ["3.jpg", "4.jpg"]
+    # rank order kept: the first two valid results, invalid candidates skipped
+    r, g, b = np.asarray(Image.open(paths[1]), dtype=np.float32).mean(axis=(0, 1))
+    assert b > r
+    # parallel jobs never share files
+    assert other[0] != paths[0] and first.job_dir(out) != second.job_dir(out)
+    assert all(n <= 2 for n in first.session.peak.values())
+    assert not (tmp_path / "dataset").exists()
+
+
+def test_repeat_queries_hit_cache_and_skip_duplicates(tmp_path):
+    same = _jpeg(seed=7)
+    images = {
+        "https://a.example/stock.jpg": (same, "image/jpeg"),
+        "https://b.example/stock-resized.jpg": (_jpeg((800, 600), seed=7), "image/jpeg"),
+        "https://c.example/other.jpg": (_jpeg(seed=8), "image/jpeg"),
+    }
+    out = str(tmp_path / "images")
+    searcher = ImageSearcher(use_cache=False)
+    searcher.session = FakeSession(images)
+    first = searcher.search_google_images("money tips", num_images=1, output_dir=out, index=1)
+    second = searcher.search_google_images("money tips", num_images=1, output_dir=out, index=2)
+    # the rescaled copy of scene 1's stock image is skipped for the next candidate
+    assert Image.open(second[0]).getpixel((5, 5)) != Image.open(first[0]).getpixel((5, 5))
+
+    cache = ImageQueryCache(str(tmp_path / "cache"))
+    warm = ImageSearcher(cache=cache)
+    warm.session = FakeSession(images)
+    warm.search_google_images("Money tips!", num_images=2, output_dir=out, index=1)
+
+    repeat = ImageSearcher(cache=ImageQueryCache(str(tmp_path / "cache")))
+    repeat.session = FakeSession(images)
+    paths = repeat.search_google_images("money   TIPS", num_images=2, output_dir=out, index=1)
+    assert len(paths) == 2 and repeat.session.fetched == []
+
+
+def test_image_cache_ttl_and_byte_quota(tmp_path, monkeypatch):
+    cache = ImageQueryCache(str(tmp_path / "cache"), ttl=100, max_bytes=2500)
+    cache.put("bing", "a", [(b"x" * 1000, 1)])
+    cache.put("bing", "b", [(b"y" * 1000, 2)])
+    cache.put("bing", "c", [(b"z" * 1000, 3)])
+    assert cache.get("bing", "a") is None  # oldest evicted over quota
+    assert cache.get("bing", "c")[0]["phash"] == 3
+
+    import video.image_searcher as image_searcher
+    later = time.time() + 101
+    monkeypatch.setattr(image_searcher.time, "time", lambda: later)
+    assert cache.get("bing", "c") is None
+
+
+class RoutedSession(FakeSession):
+    """Per-query Bing results; hosts named slow.* hang for `hang` seconds"""
+
+    def __init__(self, images, results, hang=3.0):
+        super().__init__(images)
+        self.results = results
+        self.hang = hang
+
+    def get(self, url, params=None, headers=None, timeout=None, allow_redirects=True):
+        if "bing.com" in url:
+            page = "".join(f'<a m="{{&quot;murl&quot;:&quot;{u}&quot;}}">'
+                           for u in self.results.get(params["q"], []))
+            return FakeResponse(text=page, content_type="text/html")
+        if "slow." in url or "picsum" in url:
+            time.sleep(self.hang)
+        return FakeResponse(*self.images.get(url, (_jpeg(seed=99), "image/jpeg")))
+
+
+def test_acquire_hedges_sources_and_bounds_time(tmp_path, monkeypatch):
+    import video.image_searcher as image_searcher
+    monkeypatch.setattr(image_searcher, "PLACEHOLDER_TIMEOUT", 0.3)
+    images = {
+        "https://fast.example/a.jpg": (_jpeg(seed=11), "image/jpeg"),
+        "https://slow.example/b.jpg": (_jpeg(seed=12), "image/jpeg"),
+        "https://fast.example/c.jpg": (_jpeg(color=(10, 200, 10), seed=13), "image/jpeg"),
+    }
+    results = {
+        "scene one": ["https://fast.example/a.jpg"],
+        "scene two": ["https://slow.example/b.jpg"],
+        "two keywords": ["https://fast.example/c.jpg"],
+        "scene three": ["https://slow.example/b.jpg"],
+    }
+    searcher = ImageSearcher(use_cache=False)
+    searcher.session = RoutedSession(images, results)
+    scenes = [{"query": "scene one"},
+              {"query": "scene two", "fallback_query": "two keywords"},
+              {"query": "scene three"}]
+
+    started = time.monotonic()
+    paths = searcher.acquire_scene_images(scenes, output_dir=str(tmp_path), start_index=4,
+                                          deadline=1.0, hedge_delay=0.1)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < 2.0  # one deadline + placeholder budget, stragglers not awaited
+    assert [p.rsplit("image_", 1)[1] for p in paths] == ["4.jpg", "5.jpg", "6.jpg"]
+    # scene two won via the hedged fallback query (green image)
+    r, g, b = np.asarray(Image.open(paths[1]), dtype=np.float32).mean(axis=(0, 1))
+    assert g > r and g > b
+    # scene three fell back to a local placeholder of the render size
+    assert Image.open(paths[2]).size == (1080, 1920)
+
+
+def test_downloads_are_bounded_across_concurrent_calls(tmp_path):
+    images = {f"https://h{i}.example/{i}.jpg": (_jpeg(seed=i), "image/jpeg") for i in range(12)}
+    searcher = ImageSearcher(max_workers=3, per_host=2, use_cache=False)
+    searcher.session = FakeSession(images)
+    urls = list(images)
+    threads = [threading.Thread(target=searcher._fetch_candidates, args=(urls[k::3], 4)) for k in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert 0 < searcher.session.total_peak <= 3
+
+
+def test_late_result_never_overwrites_placeholder(tmp_path):
+    searcher = ImageSearcher(use_cache=False)
+    out = str(tmp_path)
+    searcher._finalized.add(searcher._slot(out, 2))
+    placeholder = searcher._local_placeholder(out, 2)
+    before = open(placeholder, "rb").read()
+    # a straggler's candidate for the finalized slot is dropped, other slots still save
+    assert searcher._take([(_jpeg(seed=21), 21)], 1, out, 2) == []
+    assert open(placeholder, "rb").read() == before
+    assert searcher._take([(_jpeg(seed=22), 22)], 1, out, 3)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from video.media_analysis import MediaAnalysisPass
+
+
+@pytest.fixture
+def two_shot_clip(make_clip):
+    """6s clip: cut at 3s, silence then a loud tone from 4s"""
+    return make_clip([3, 3], tone_from=4)
+
+
+def test_single_pass_emits_rms_and_shots(two_shot_clip):
+    result = MediaAnalysisPass(sample_fps=4.0).run(two_shot_clip, rms=True, shots=True)
+    assert result["duration"] == pytest.approx(6.0, abs=0.1)
+    assert [round(t) for t in result["shots"]] == [3]
+    rms = result["rms"]
+    assert len(rms) in (5, 6)
+    assert np.all(rms[:4] < 0.01) and rms[4] > 0.3
+
+
+def test_skips_frames_when_shots_not_requested(two_shot_clip):
+    result = MediaAnalysisPass().run(two_shot_clip, rms=True, shots=False)
+    assert "shots" not in result
+    assert len(result["rms"]) >= 5
+
+
+def test_tcp_audio_transport_streams_pcm(two_shot_clip, monkeypatch):
+    import video.media_analysis as media_analysis
+    monkeypatch.setattr(media_analysis, "AUDIO_TRANSPORT", "tcp")  # Windows path
+    result = MediaAnalysisPass(sample_fps=4.0).run(two_shot_clip, rms=True, shots=True)
+    assert [round(t) for t in result["shots"]] == [3]
+    assert len(result["rms"]) in (5, 6) and result["rms"][4] > 0.3
+
+
+def test_cover_art_is_not_a_video_stream(monkeypatch):
+    import subprocess
+    import video.media_analysis as media_analysis
+    banner = (
+        "Input #0, mp3, from 'song.mp3':\n"
+        "  Duration: 00:03:10.00, start: 0.025057, bitrate: 320 kb/s\n"
+        "  Stream #0:0: Audio: mp3, 44100 Hz, stereo, fltp, 320 kb/s\n"
+        "  Stream #0:1: Video: mjpeg (Baseline), yuvj420p, 500x500, 90k tbr (attached pic)\n"
+    )
+    monkeypatch.setattr(subprocess, "run", lambda *a, **k: subprocess.CompletedProcess(a, 1, "", banner))
+    assert media_analysis.probe_media("song.mp3")["has_video"] is False
+    with_video = banner + "  Stream #0:2: Video: h264 (High), yuv420p, 1920x1080, 25 fps\n"
+    monkeypatch.setattr(subprocess, "run", lambda *a, **k: subprocess.CompletedProcess(a, 1, "", with_video))
+    assert media_analysis.probe_media("mv.mkv")["has_video"] is True
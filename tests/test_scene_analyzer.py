@@ -0,0 +1,194 @@
+import base64
+import io
+import numpy as np
+import threading
+import time
+
+from PIL import Image
+
+from video.scene_analyzer import SceneAnalyzer, VisionCache
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeMessages:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.calls = 0
+        self.sizes = []
+
+    def create(self, model, max_tokens, messages):
+        content = messages[0]["content"]
+        data = base64.b64decode(content[0]["source"]["data"])
+        self.sizes.append(Image.open(io.BytesIO(data)).size)
+        scene = content[1]["text"].split("#", 1)[1].split(".", 1)[0]
+        with self.lock:
+            self.calls += 1
+            first_call = self.calls == 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(0.05)
+            if first_call:
+                raise RateLimitError("slow down")
+            text = '{"review_script": "scene %s", "relevance_score": 0.9}' % scene
+            return type("R", (), {"content": [type("C", (), {"text": text})()]})()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_analyze_scenes_concurrent_ordered_with_retry(tmp_path, monkeypatch):
+    # no real backoff waits (the fake's own latency still uses the real time module)
+    monkeypatch.setattr("video.scene_analyzer.time", type("NoWait", (), {"sleep": staticmethod(lambda s: None)}))
+    scenes = []
+    for i in range(6):
+        path = tmp_path / f"scene_{i}.jpg"
+        Image.new("RGB", (1920, 1080), (i * 40, 0, 0)).save(path)
+        scenes.append({"frame_path": str(path)})
+
+    analyzer = SceneAnalyzer(api_key=None, max_concurrency=3, max_image_side=512, dedupe=False)
+    fake = FakeMessages()
+    analyzer.client = type("Client", (), {"messages": fake})()
+    out = analyzer.analyze_scenes(scenes, movie_title="Test")
+
+    assert [s["analysis"]["review_script"] for s in out] == [f"scene {i}" for i in range(6)]
+    assert fake.calls == 7  # one rate-limited call was retried
+    assert 1 < fake.peak <= 3
+    assert all(max(size) <= 512 for size in fake.sizes)
+
+
+def _noise_frame(path, seed, shift=0):
+    pixels = (np.random.RandomState(seed).rand(90, 160, 3) * 255).astype("uint8")
+    Image.fromarray(np.clip(pixels.astype(int) + shift, 0, 255).astype("uint8")).resize((640, 360)).save(path)
+
+
+def test_near_duplicates_analyzed_once_and_cached(tmp_path):
+    scenes = []
+    # scenes 0 and 2 are the same shot (slightly brighter), 1 is different
+    for i, (seed, shift) in enumerate([(1, 0), (2, 0), (1, 6)]):
+        path = tmp_path / f"f{i}.jpg"
+        _noise_frame(path, seed, shift)
+        scenes.append({"frame_path": str(path)})
+
+    cache = VisionCache(path=str(tmp_path / "cache.json"))
+    fake = FakeMessages()
+    fake.calls = 1  # no simulated rate limit
+    analyzer = SceneAnalyzer(api_key=None, cache=cache)
+    analyzer.client = type("Client", (), {"messages": fake})()
+    out = analyzer.analyze_scenes([dict(s) for s in scenes], movie_title="Film")
+
+    assert fake.calls == 3  # 2 unique frames
+    assert out[2]["duplicate_of"] == 0
+    assert out[2]["analysis"] == out[0]["analysis"]
+
+    # second run of the same film: everything from the persistent cache
+    again = SceneAnalyzer(api_key=None, cache=VisionCache(path=str(tmp_path / "cache.json")))
+    again.client = type("Client", (), {"messages": fake})()
+    again.analyze_scenes([dict(s) for s in scenes], movie_title="Film")
+    assert fake.calls == 3
+
+
+class FakeBatchMessages:
+    """Answers batch prompts with a JSON array; tile 2 of the first batch is invalid"""
+
+    def __init__(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def create(self, model, max_tokens, messages):
+        content = messages[0]["content"]
+        images = [b for b in content if b["type"] == "image"]
+        prompt = content[-1]["text"]
+        with self.lock:
+            self.requests.append(len(images))
+            first_batch = len(self.requests) == 1
+        if "JSON array" in prompt:
+            count = int(prompt.split("exactly ")[1].split(" ")[0])
+            items = [{"frame": n, "review_script": f"tile {n}", "relevance_score": 2}
+                     for n in range(1, count + 1)]
+            if first_batch:
+                items[1]["review_script"] = ""
+            text = "Here you go: " + __import__("json").dumps(items)
+        else:
+            text = '{"review_script": "single", "relevance_score": 0.4}'
+        return type("R", (), {"content": [type("C", (), {"text": text})()]})()
+
+
+def _scenes(tmp_path, n):
+    scenes = []
+    for i in range(n):
+        path = tmp_path / f"b{i}.jpg"
+        _noise_frame(path, 100 + i)
+        scenes.append({"frame_path": str(path)})
+    return scenes
+
+
+def test_batched_mode_one_request_per_group_with_single_fallback(tmp_path):
+    analyzer = SceneAnalyzer(api_key=None, dedupe=False, batch_size=3, max_concurrency=1)
+    fake = FakeBatchMessages()
+    analyzer.client = type("Client", (), {"messages": fake})()
+    out = analyzer.analyze_scenes(_scenes(tmp_path, 5))
+
+    assert sorted(fake.requests) == [1, 2, 3]  # two batches + one single-frame retry
+    scripts = [s["analysis"]["review_script"] for s in out]
+    assert scripts == ["tile 1", "single", "tile 3", "tile 1", "tile 2"]
+    assert out[0]["analysis"]["relevance_score"] == 1.0  # clamped
+
+
+def test_collage_layout_sends_one_grid_image(tmp_path):
+    analyzer = SceneAnalyzer(api_key=None, dedupe=False, batch_size=4, batch_layout="collage")
+    fake = FakeBatchMessages()
+    analyzer.client = type("Client", (), {"messages": fake})()
+    analyzer.analyze_scenes(_scenes(tmp_path, 4))
+    assert fake.requests[0] == 1
+
+
+def test_offline_local_scoring_ranks_scenes(tmp_path):
+    import cv2
+    sharp = tmp_path / "sharp.jpg"
+    dull = tmp_path / "dull.jpg"
+    _noise_frame(sharp, 7)
+    gray = np.full((360, 640, 3), 20, dtype=np.uint8)
+    cv2.imwrite(str(dull), cv2.GaussianBlur(gray, (21, 21), 0))
+    scenes = [{"frame_path": str(dull), "motion_energy": 0.5},
+              {"frame_path": str(sharp), "motion_energy": 20.0}]
+
+    out = SceneAnalyzer(api_key=None).analyze_scenes(scenes)
+
+    dull_a, sharp_a = out[0]["analysis"], out[1]["analysis"]
+    assert sharp_a["relevance_score"] > dull_a["relevance_score"]
+    assert "action" in sharp_a["key_elements"] and "colorful" in sharp_a["key_elements"]
+    assert {"dark", "still"} <= set(dull_a["key_elements"])
+    assert dull_a["fallback"] and sharp_a["review_script"] != dull_a["review_script"]
+
+
+def test_single_scene_fallback_keeps_detector_signals(tmp_path):
+    frame = tmp_path / "frame.jpg"
+    _noise_frame(frame, 3)
+    analyzer = SceneAnalyzer(api_key=None)
+    still = analyzer.analyze_scene(str(frame), 0, scene={"motion_energy": 0.5})
+    busy = analyzer.analyze_scene(str(frame), 0, scene={"motion_energy": 20.0})
+    assert still["fallback"] and busy["fallback"]
+    assert busy["relevance_score"] > still["relevance_score"]
+    assert "still" in still["key_elements"] and "action" in busy["key_elements"]
+
+    # Lỗi API → fallback cũng nhận scene
+    class Broken:
+        def __getattr__(self, name):
+            raise RuntimeError("boom")
+    analyzer.client = Broken()
+    assert analyzer.analyze_scene(str(frame), 0, scene={"motion_energy": 20.0})["relevance_score"] == \
+        busy["relevance_score"]
+
+
+def test_select_best_scenes_ranks_by_relevance_and_keeps_time_order():
+    scores = [0.2, 0.9, 0.5, 0.95, 0.1]
+    scenes = [{'start': float(i * 10), 'analysis': {'relevance_score': s}} for i, s in enumerate(scores)]
+    scenes[3]['duplicate_of'] = 1  # near-duplicate ranks after distinct scenes
+    best = SceneAnalyzer.select_best_scenes(scenes, 3)
+    assert [s['start'] for s in best] == [0.0, 10.0, 20.0]
@@ -0,0 +1,191 @@
+from video.scene_detector import SceneDetector, decode_thumbnail
+
+
+def test_fast_mode_finds_same_scenes_as_full_decode(make_clip):
+    clip = make_clip([2, 3, 2])
+    full = SceneDetector().detect_scenes(clip, max_scenes=12)
+    fast = SceneDetector(fast=True, sample_fps=5).detect_scenes(clip, max_scenes=12)
+
+    assert len(full) == len(fast) == 3
+    for a, b in zip(full, fast):
+        # sampled cuts land within one sample step of the exact cut
+        assert abs(a["start"] - b["start"]) <= 0.2
+        assert abs(a["end"] - b["end"]) <= 0.2
+    # thumbnails are compact JPEG bytes, not full frames
+    for scene in (full[0], fast[0]):
+        assert isinstance(scene["thumbnail"], bytes) and len(scene["thumbnail"]) < 50_000
+        assert decode_thumbnail(scene["thumbnail"]).shape[2] == 3
+
+
+def _scene_key(scenes):
+    return [(s["start"], s["end"], s["frame_idx"]) for s in scenes]
+
+
+def test_sharded_scan_matches_serial_including_seam_cuts(make_clip, monkeypatch):
+    import video.scene_detector as sd
+    monkeypatch.setattr(sd, "MIN_SHARD_SECONDS", 1)
+    # 4 equal shots: shard targets land exactly on the cuts (keyframes at cuts)
+    clip = make_clip([4, 4, 4, 4], gop=20)
+    serial = SceneDetector(fast=True, sample_fps=5, use_cache=False).detect_scenes(clip, max_scenes=20)
+
+    detector = SceneDetector(fast=True, sample_fps=5, workers=4, use_cache=False)
+    shards = []
+    original = sd.stitch_shards
+    monkeypatch.setattr(sd, "stitch_shards", lambda results, t: shards.append(len(results)) or original(results, t))
+    sharded = detector.detect_scenes(clip, max_scenes=20)
+
+    assert shards and shards[0] > 1
+    assert _scene_key(sharded) == _scene_key(serial)
+    assert len(sharded) == 4
+
+
+def test_shard_bounds_snap_to_keyframes():
+    from video.scene_detector import shard_bounds
+    assert shard_bounds(1000, [0, 230, 260, 510, 760], 4) == [0, 260, 510, 760]
+    assert shard_bounds(1000, [0], 4) == [0]
+
+
+def test_representatives_tracked_by_index_and_extracted_in_one_pass(make_clip, tmp_path, monkeypatch):
+    import cv2
+    import video.scene_detector as sd
+    monkeypatch.setattr(sd, "MIN_SHARD_SECONDS", 1)
+    clip = make_clip([3, 3, 3, 3], gop=20)
+    serial = SceneDetector(fast=True, sample_fps=5, use_cache=False).detect_scenes(clip, max_scenes=20)
+    sharded = SceneDetector(fast=True, sample_fps=5, workers=3, use_cache=False).detect_scenes(clip, max_scenes=20)
+    assert [s["representative_idx"] for s in sharded] == [s["representative_idx"] for s in serial]
+    assert [s["motion_energy"] for s in sharded] == [s["motion_energy"] for s in serial]
+    assert all(s["start"] * 25 <= s["representative_idx"] < s["end"] * 25 for s in serial)
+    # Không giữ pixel nào của frame đại diện trong lúc detect
+    assert all("representative" not in s for s in serial)
+
+    real_capture = sd.cv2.VideoCapture
+    opened = []
+
+    def tracking_capture(*args):
+        opened.append(args)
+        return real_capture(*args)
+    monkeypatch.setattr(sd.cv2, "VideoCapture", tracking_capture)
+    chosen = serial[1:3]
+    out = SceneDetector(fast=True).extract_scene_frames(clip, chosen, output_dir=str(tmp_path / "frames"))
+    assert len(opened) == 1
+    frames = [cv2.imread(s["frame_path"]) for s in out]
+    assert all(f is not None for f in frames)
+    # Frame của cảnh 2 (trắng) và cảnh 3 (xám) lấy đúng cảnh
+    assert frames[0].mean() > frames[1].mean() > 60
+
+
+def test_coarse_backend_matches_per_frame_cuts(make_clip):
+    clip = make_clip([2, 3, 2, 3], gop=50)
+    full = SceneDetector().detect_scenes(clip, max_scenes=20)
+    coarse = SceneDetector(backend="coarse").detect_scenes(clip, max_scenes=20)
+    assert _scene_key(coarse) == _scene_key(full)
+    assert all(s["thumbnail"] for s in coarse[:-1])
+
+
+def test_cache_skips_decode_on_resubmit_and_other_max_scenes(make_clip, tmp_path, monkeypatch):
+    import cv2
+    import video.scene_detector as sd
+    clip = make_clip([2, 2, 2, 2])
+    first = SceneDetector(fast=True, sample_fps=5)
+    scenes = first.detect_scenes(clip, max_scenes=4)
+    first.extract_scene_frames(clip, scenes, output_dir=str(tmp_path / "run1"))
+
+    real_capture = sd.cv2.VideoCapture
+    opened = []
+
+    def tracking_capture(*args):
+        opened.append(args)
+        return real_capture(*args)
+    monkeypatch.setattr(sd.cv2, "VideoCapture", tracking_capture)
+
+    again = SceneDetector(fast=True, sample_fps=5)
+    fewer = again.detect_scenes(clip, max_scenes=2)
+    out = again.extract_scene_frames(clip, fewer, output_dir=str(tmp_path / "run2"))
+    assert not opened
+    assert len(fewer) == 2 and fewer[0]["thumbnail"]
+    assert all(cv2.imread(s["frame_path"]) is not None for s in out)
+
+    # different settings → new entry → decodes again
+    SceneDetector(fast=True, sample_fps=5, threshold=40).detect_scenes(clip, max_scenes=4)
+    assert opened
+
+
+def test_seek_exact_verifies_landing_frame_and_falls_back(make_clip):
+    import cv2
+    import numpy as np
+    from video.scene_detector import seek_exact
+
+    path = make_clip([1, 1, 1], gop=25)
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, f = cap.read()
+        if not ok:
+            break
+        frames.append(f.astype(np.int16))
+    cap.release()
+
+    class DriftingCapture:
+        """Backend that reports a landing time far from the requested frame"""
+        def __init__(self, inner):
+            self.inner = inner
+            self.released = False
+
+        def __getattr__(self, name):
+            return getattr(self.inner, name)
+
+        def get(self, prop):
+            return 99999.0 if prop == cv2.CAP_PROP_POS_MSEC else self.inner.get(prop)
+
+        def release(self):
+            self.released = True
+            self.inner.release()
+
+    for wrap in (lambda c: c, DriftingCapture):
+        for idx in (24, 25, 50):
+            original = wrap(cv2.VideoCapture(path))
+            cap = seek_exact(original, path, idx)
+            ok, f = cap.read()
+            cap.release()
+            assert ok and np.abs(f.astype(np.int16) - frames[idx]).mean() < 3
+            if wrap is DriftingCapture:
+                assert original.released and cap is not original
+
+
+def test_keyframes_and_coarse_windows_ignore_stream_start_offset(make_clip, tmp_path):
+    import subprocess
+    from utils.helpers import get_ffmpeg_exe
+    from video.scene_detector import list_keyframe_times, probe_video_start
+    clip = make_clip([2, 3, 2, 3], gop=50)
+    shifted = str(tmp_path / "shifted.mp4")
+    # Như file tải theo đoạn của yt-dlp: audio bắt đầu ở 0, video trễ 1.5s
+    subprocess.run([get_ffmpeg_exe(), "-y", "-loglevel", "error", "-i", clip, "-itsoffset", "1.5", "-i", clip,
+                    "-map", "1:v", "-map", "0:a", "-c", "copy", shifted], check=True, capture_output=True)
+    assert probe_video_start(shifted) > 1.0
+    assert list_keyframe_times(shifted)[:2] == list_keyframe_times(clip)[:2] == [0.0, 2.0]
+
+    full = SceneDetector(use_cache=False).detect_scenes(clip, max_scenes=20)
+    coarse = SceneDetector(backend="coarse", use_cache=False).detect_scenes(shifted, max_scenes=20)
+    assert _scene_key(coarse) == _scene_key(full)
+
+
+def test_scene_cache_pruned_by_age_then_size(make_clip, tmp_path, monkeypatch):
+    import os
+    import time
+    import video.scene_detector as sd
+    import utils.disk_cache as disk_cache
+    monkeypatch.setattr(disk_cache, "_pruned_roots", set())
+    cache = tmp_path / "scenes"
+    now = time.time()
+    for name, age, size in [("stale_a", 30 * 86400, 10), ("old_b", 3600, 600), ("new_c", 60, 600)]:
+        (cache / name / "thumbs").mkdir(parents=True)
+        (cache / name / "thumbs" / "0.jpg").write_bytes(b"x" * size)
+        os.utime(cache / name, (now - age, now - age))
+    monkeypatch.setattr(sd, "SCENE_CACHE_MAX_BYTES", 1000)
+
+    clip = make_clip([2, 2])
+    SceneDetector(fast=True, sample_fps=5, cache_dir=str(cache)).detect_scenes(clip, max_scenes=4)
+    left = sorted(os.listdir(cache))
+    # Quá TTL bị xóa, rồi entry cũ nhất tới khi vừa dung lượng; entry mới ghi vẫn còn
+    assert "stale_a" not in left and "old_b" not in left and "new_c" in left
+    assert len(left) == 2
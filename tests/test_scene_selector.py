@@ -37,3 +37,22 @@ def test_no_immediate_repeat_until_all_used():
     for i in range(0, 6, 3):
         window = [p[1] for p in pairs[i:i+3]]
         assert len(set(window)) == 3  # all assets used once per window
+
+
+def test_global_assignment_beats_greedy_and_folds_diacritics():
+    assets = ["https://cdn.example.com/giay_do.jpg", "https://cdn.example.com/giay_trang.jpg"]
+    # greedy would give sentence 0 the red shoe (tie, first) and leave sentence 1 the white one
+    sentences = ["Đôi giày này rất êm", "Màu đỏ của giày nổi bật"]
+    pairs = SceneSelector().match(assets, sentences)
+    assert pairs[1][1] == assets[0]
+    assert pairs[0][1] == assets[1]
+
+
+def test_many_assets_and_sentences_are_matched_one_to_one():
+    colors = ["red", "blue", "green", "black", "white", "pink", "gray", "gold"]
+    assets = [f"https://cdn.example.com/{c}_{i}.jpg" for i in range(40) for c in colors]
+    sentences = [f"look at this {colors[i % len(colors)]} shirt number {i}" for i in range(200)]
+    pairs = SceneSelector().match(assets, sentences)
+    assigned = [p[1] for p in pairs]
+    assert len(set(assigned)) == len(sentences)
+    assert all(colors[i % len(colors)] in a for i, a in enumerate(assigned))
@@ -1,3 +1,5 @@
+import requests
+
 from scraper.shopee import ShopeeScraper
 
 
@@ -30,4 +32,277 @@ def test_extract_description_from_body_text_none():
     s = ShopeeScraper()
     body = "No description here, just random text."
     res = s._extract_description_from_body_text(body)
-    assert res == ""
\ No newline at end of file
+    assert res == ""
+
+class _FakeStream:
+    """Streaming response over in-memory bytes; honours Range unless told not to"""
+
+    def __init__(self, data, range_header, honour_range, log):
+        self.log = log
+        if honour_range and range_header:
+            start, end = map(int, range_header.split("=")[1].split("-"))
+            self.body = data[start:end + 1]
+            self.status_code = 206
+            self.headers = {"Content-Range": f"bytes {start}-{start + len(self.body) - 1}/{len(data)}"}
+        else:
+            self.body = data
+            self.status_code = 200
+            self.headers = {"Content-Length": str(len(data))}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}")
+
+    def iter_content(self, chunk_size=1):
+        pos = getattr(self, "_pos", 0)
+        while pos < len(self.body):
+            chunk = self.body[pos:pos + chunk_size]
+            pos += len(chunk)
+            self._pos = pos
+            self.log.append(len(chunk))
+            yield chunk
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    def __init__(self, images, honour_range=True):
+        self.images = images
+        self.honour_range = honour_range
+        self.read = {}
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        log = self.read.setdefault(url, [])
+        if url not in self.images:
+            missing = _FakeStream(b"", None, False, log)
+            missing.status_code = 404
+            return missing
+        return _FakeStream(self.images[url], (headers or {}).get("Range"), self.honour_range, log)
+
+    def head(self, url, timeout=None, allow_redirects=True):
+        return type("Head", (), {"status_code": 200 if url in self.images else 404})()
+
+
+def _big_jpeg(size):
+    import io
+    import numpy as np
+    from PIL import Image
+    rng = np.random.default_rng(0)
+    buf = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)).save(buf, "JPEG", quality=95)
+    return buf.getvalue()
+
+
+def test_image_filter_probes_thumbnail_headers_only():
+    cdn = "https://down-vn.img.susercontent.com/file/"
+    originals = {cdn + "product": _big_jpeg((1600, 1600)),
+                 cdn + "banner": _big_jpeg((1600, 120)),
+                 cdn + "icon": _big_jpeg((64, 64))}
+    images = dict(originals)
+    images.update({cdn + "product_tn": _big_jpeg((330, 330)),
+                   cdn + "banner_tn": _big_jpeg((330, 25)),
+                   cdn + "icon_tn": _big_jpeg((64, 64))})
+    s = ShopeeScraper()
+    s.session = _FakeSession(images)
+    kept = s._filter_product_images(list(originals))
+    assert kept == [cdn + "product"]
+    assert all(url not in s.session.read for url in originals)
+    assert sum(s.session.read[cdn + "product_tn"]) <= ShopeeScraper.PROBE_BYTES
+
+
+def test_resolver_picks_smallest_adequate_variant_with_fallback():
+    cdn = "https://down-vn.img.susercontent.com/file/"
+    s = ShopeeScraper(image_width=864)
+    s.session = _FakeSession({cdn + "a@resize_w900_nl": _big_jpeg((900, 900)), cdn + "b": _big_jpeg((1200, 1200))})
+    resolved = s._resolve_image_urls([cdn + "a", cdn + "b_tn"])
+    # a: w900 covers 864px; b: w900 missing (404) → original upload
+    assert resolved == [cdn + "a@resize_w900_nl", cdn + "b"]
+
+
+def test_probe_prefetches_accepted_image_when_range_is_ignored():
+    import os
+    from utils.fetch_cache import fetched_image_path
+    url = "https://down-vn.img.susercontent.com/file/full"
+    s = ShopeeScraper()
+    s.session = _FakeSession({url: _big_jpeg((800, 1000))}, honour_range=False)
+    assert s._is_product_image(url)
+    assert os.path.exists(fetched_image_path(url))
+
+
+def test_gallery_images_are_cached_under_the_urls_handed_to_the_renderer():
+    import os
+    from utils.fetch_cache import fetched_image_path
+    cdn = "https://down-vn.img.susercontent.com/file/"
+
+    class _Page:
+        def evaluate(self, script):
+            return None if "scrollTo" in script else [cdn + "p1", cdn + "p2"]
+
+        def wait_for_timeout(self, ms):
+            pass
+
+    images = {}
+    for name in ("p1", "p2"):
+        images[cdn + name] = _big_jpeg((1200, 1200))
+        images[cdn + name + "_tn"] = _big_jpeg((330, 330))
+        images[cdn + name + "@resize_w900_nl"] = _big_jpeg((900, 900))
+    s = ShopeeScraper(image_width=864)
+    s.session = _FakeSession(images)
+    urls = s._get_images_advanced(_Page())
+    assert urls == [cdn + "p1@resize_w900_nl", cdn + "p2@resize_w900_nl"]
+    assert all(os.path.exists(fetched_image_path(u)) for u in urls)
+    # Ảnh gốc không bao giờ bị tải
+    assert cdn + "p1" not in s.session.read
+
+
+def test_product_api_matches_exact_endpoint_paths():
+    base = "https://shopee.vn/api/v4/pdp/"
+    assert ShopeeScraper._is_product_api_url(base + "get_pc?itemid=123&shopid=9", "123")
+    assert ShopeeScraper._is_product_api_url(base + "get?itemid=123&shopid=9", "123")
+    assert ShopeeScraper._is_product_api_url("https://shopee.vn/api/v4/item/get?itemid=5", None)
+    # Cùng tiền tố nhưng là endpoint khác
+    assert not ShopeeScraper._is_product_api_url(base + "get_rw?itemid=123", "123")
+    assert not ShopeeScraper._is_product_api_url(base + "get_pc_extra?itemid=123", "123")
+    assert not ShopeeScraper._is_product_api_url(base + "get_pc?itemid=456", "123")
+
+
+def test_parse_product_api_pdp_payload():
+    payload = {"data": {
+        "item": {"title": " Áo thun nam ", "price": 15000000000, "images": ["abc", "def"],
+                 "description": "Mô tả từ API"},
+    }}
+    data = ShopeeScraper._parse_product_api(payload)
+    assert data["title"] == "Áo thun nam"
+    assert data["price"] == "150000"
+    assert data["image_urls"] == ["https://down-vn.img.susercontent.com/file/abc",
+                                  "https://down-vn.img.susercontent.com/file/def"]
+    assert data["description"] == "Mô tả từ API"
+
+
+def test_parse_product_api_flat_payload_and_invalid():
+    data = ShopeeScraper._parse_product_api({"data": {"name": "Tai nghe", "price_min": 9900000000}})
+    assert data["title"] == "Tai nghe" and data["price"] == "99000"
+    assert data["image_urls"] == [] and data["description"] == ""
+    assert ShopeeScraper._parse_product_api({"error": 90309999, "data": None}) is None
+    assert ShopeeScraper._product_ids("https://shopee.vn/Ao-thun-i.123.456?sp_atk=x") == ("123", "456")
+    assert ShopeeScraper._product_ids("https://shopee.vn/product/123/456") == ("123", "456")
+
+
+def test_scrape_tabs_block_heavy_and_tracking_requests():
+    from scraper.shopee import should_block_request
+    assert should_block_request("https://cf.shopee.vn/file/x", "image")
+    assert should_block_request("https://shopee.vn/video.mp4", "media")
+    assert should_block_request("https://www.googletagmanager.com/gtm.js", "script")
+    assert not should_block_request("https://shopee.vn/api/v4/pdp/get_pc?item_id=1", "xhr")
+    assert not should_block_request("https://shopee.vn/Ao-i.1.2", "document")
+
+
+def test_session_batch_fails_fast_without_chrome():
+    from scraper.shopee import ShopeeSession
+    urls = ["https://shopee.vn/a-i.1.2", "https://shopee.vn/b-i.1.3", "https://shopee.vn/c-i.1.4"]
+    with ShopeeSession(tabs=2, cdp_url="http://127.0.0.1:9") as session:
+        results = session.scrape_many(urls)
+    assert [r["original_url"] for r in results] == urls
+    assert all(r["_scrape_failed"] for r in results)
+
+
+class _Closable:
+    def __init__(self, closed_after=None):
+        self.closed = False
+        self.calls = 0
+        self.closed_after = closed_after
+
+    def close(self):
+        self.closed = True
+
+    def is_closed(self):
+        return self.closed or (self.closed_after is not None and self.calls >= self.closed_after)
+
+
+def test_session_reconnects_to_chrome_with_backoff(monkeypatch):
+    from scraper.shopee import ShopeeSession
+    attempts = []
+
+    def open_tab(self, p):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("connect ECONNREFUSED 127.0.0.1:9222")
+        return _Closable(), _Closable()
+
+    monkeypatch.setattr(ShopeeSession, "_open_tab", open_tab)
+    scraper = ShopeeScraper()
+    monkeypatch.setattr(scraper, "_scrape_page", lambda page, url: {"original_url": url})
+    urls = ["https://shopee.vn/a-i.1.2", "https://shopee.vn/b-i.1.3", "https://shopee.vn/c-i.1.4"]
+
+    # Backoff chưa hết hạn → không thử lại, job lỗi ngay
+    with ShopeeSession(tabs=1, scraper=scraper) as session:
+        session.CONNECT_RETRY_BASE = 60.0
+        session.CONNECT_RETRY_MAX = 60.0
+        assert all(r.get("_scrape_failed") for r in session.scrape_many(urls))
+    assert len(attempts) == 1
+
+    # Chrome lên sau: job sau kết nối lại và chạy bình thường
+    attempts.clear()
+    with ShopeeSession(tabs=1, scraper=scraper) as session:
+        session.CONNECT_RETRY_BASE = 0.0
+        results = session.scrape_many(urls)
+    assert [bool(r.get("_scrape_failed")) for r in results] == [True, False, False]
+    assert len(attempts) == 3
+
+
+def test_image_requests_share_one_bounded_pool(monkeypatch):
+    import threading
+    import time
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def probe(url):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return True
+
+    monkeypatch.setattr(ShopeeScraper, "_is_product_image", lambda self, url: probe(url))
+    urls = [f"https://down-vn.img.susercontent.com/file/{i}" for i in range(8)]
+    # get_scraper() tạo scraper mới mỗi URL: mọi instance vẫn chung một pool
+    tabs = [threading.Thread(target=ShopeeScraper()._filter_product_images, args=(urls,)) for _ in range(4)]
+    for t in tabs:
+        t.start()
+    for t in tabs:
+        t.join()
+    assert peak[0] <= ShopeeScraper.PROBE_WORKERS
+
+
+def test_session_closes_browser_before_reconnect_and_at_exit(monkeypatch):
+    from scraper.shopee import ShopeeSession
+    opened = []
+
+    def open_tab(self, p):
+        # Tab đầu tiên "chết" sau job đầu (Chrome khởi động lại)
+        tab = (_Closable(), _Closable(closed_after=1 if not opened else None))
+        opened.append(tab)
+        return tab
+
+    def scrape_page(page, url):
+        page.calls += 1
+        if page.is_closed():
+            raise RuntimeError("Target page, context or browser has been closed")
+        return {"original_url": url}
+
+    monkeypatch.setattr(ShopeeSession, "_open_tab", open_tab)
+    scraper = ShopeeScraper()
+    monkeypatch.setattr(scraper, "_scrape_page", scrape_page)
+    with ShopeeSession(tabs=1, scraper=scraper) as session:
+        session.CONNECT_RETRY_BASE = 0.0
+        results = session.scrape_many(["https://shopee.vn/a-i.1.2", "https://shopee.vn/b-i.1.3"])
+    assert [bool(r.get("_scrape_failed")) for r in results] == [True, False]
+    assert len(opened) == 2
+    # Mỗi browser CDP đều được đóng: cái cũ khi kết nối lại, cái mới khi worker dừng
+    assert all(browser.closed and page.closed for browser, page in opened)
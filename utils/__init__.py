@@ -1,11 +1,23 @@
-from .helpers import get_scraper, ensure_directory
+from .helpers import get_scraper, ensure_directory, file_content_hash, get_ffmpeg_exe
 from .downloader import download_image
+from .image_hash import dhash, phash, hamming_distance
+from .image_ingest import normalize_image_bytes, open_scaled
+from .fetch_cache import fetched_image_path, store_fetched_image
 from .logger import get_logger, setup_logger
 
 __all__ = [
     "get_scraper",
     "ensure_directory",
+    "file_content_hash",
+    "get_ffmpeg_exe",
     "download_image",
+    "dhash",
+    "phash",
+    "hamming_distance",
+    "normalize_image_bytes",
+    "open_scaled",
+    "fetched_image_path",
+    "store_fetched_image",
     "get_logger",
     "setup_logger",
 ]
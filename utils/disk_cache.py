@@ -0,0 +1,89 @@
+"""
+Disk cache pruning - giới hạn các thư mục cache trong assets/temp.
+Mỗi entry (file hoặc thư mục con) cũ hơn max_age bị xóa, sau đó xóa tiếp
+các entry cũ nhất (theo mtime) cho tới khi tổng dung lượng <= max_bytes.
+"""
+import os
+import time
+import shutil
+import threading
+from typing import List, Tuple
+
+_pruned_roots = set()
+_prune_lock = threading.Lock()
+
+
+def _entry_size(entry: os.DirEntry) -> int:
+    """Bytes of a file, or of every file under a folder"""
+    if not entry.is_dir(follow_symlinks=False):
+        return entry.stat().st_size
+    total = 0
+    for folder, _, files in os.walk(entry.path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(folder, name))
+            except OSError:
+                pass
+    return total
+
+
+def _remove(path: str, is_dir: bool):
+    if is_dir:
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        os.remove(path)
+
+
+def prune_cache_dir(root: str, max_age: float, max_bytes: int) -> int:
+    """
+    Remove cache entries (direct children of root) older than max_age,
+    then the oldest ones until the rest fit in max_bytes.
+    Returns: number of entries removed
+    """
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    kept: List[Tuple[float, int, str, bool]] = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            mtime = entry.stat(follow_symlinks=False).st_mtime
+            if mtime < cutoff:
+                _remove(entry.path, is_dir)
+                removed += 1
+            else:
+                kept.append((mtime, _entry_size(entry), entry.path, is_dir))
+        except OSError:
+            pass
+    total = sum(size for _, size, _, _ in kept)
+    for _, size, path, is_dir in sorted(kept):
+        if total <= max_bytes:
+            break
+        try:
+            _remove(path, is_dir)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def prune_cache_dir_once(root: str, max_age: float, max_bytes: int) -> int:
+    """prune_cache_dir on the first call for this root in the process (later calls: no-op)"""
+    key = os.path.abspath(root)
+    with _prune_lock:
+        if key in _pruned_roots:
+            return 0
+        _pruned_roots.add(key)
+    return prune_cache_dir(root, max_age, max_bytes)
+
+
+def touch(path: str):
+    """Mark a cache entry as recently used (pruning is oldest-mtime first)"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
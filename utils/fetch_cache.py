@@ -0,0 +1,49 @@
+"""
+Fetched-image cache - ảnh tải về một lần, dùng chung giữa scraper, ranker và renderer.
+Mỗi URL được chuẩn hóa (image_ingest) và lưu dưới tên sha1 của URL; thư mục
+được dọn theo tuổi và tổng dung lượng ở lần ghi đầu tiên của mỗi process.
+"""
+import os
+import hashlib
+import threading
+from typing import Optional
+from utils.disk_cache import prune_cache_dir, prune_cache_dir_once
+from utils.image_ingest import normalize_image_bytes
+from utils.logger import get_logger
+
+logger = get_logger()
+
+IMAGE_FETCH_DIR = os.getenv("IMAGE_FETCH_DIR", "assets/temp/fetched_images")
+IMAGE_FETCH_TTL = 3 * 24 * 3600             # Fetched files older than this are removed
+IMAGE_FETCH_MAX_BYTES = 512 * 1024 * 1024   # ...and the oldest ones beyond this total
+
+
+def prune_fetched_images(fetch_dir: str = None, max_age: float = IMAGE_FETCH_TTL,
+                         max_bytes: int = IMAGE_FETCH_MAX_BYTES):
+    """Remove fetched images older than max_age, then the oldest ones until under max_bytes"""
+    prune_cache_dir(fetch_dir or IMAGE_FETCH_DIR, max_age, max_bytes)
+
+
+def fetched_image_path(url: str) -> str:
+    """Local file a remote image is (or will be) stored at"""
+    return os.path.join(IMAGE_FETCH_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest()[:20] + ".jpg")
+
+
+def store_fetched_image(url: str, data: bytes) -> Optional[str]:
+    """Normalize + write downloaded bytes for a URL once; returns the local path (None if not an image)"""
+    path = fetched_image_path(url)
+    if os.path.exists(path):
+        return path
+    # Lần ghi đầu tiên trong process dọn thư mục
+    prune_cache_dir_once(IMAGE_FETCH_DIR, IMAGE_FETCH_TTL, IMAGE_FETCH_MAX_BYTES)
+    try:
+        out, _ = normalize_image_bytes(data)
+        os.makedirs(IMAGE_FETCH_DIR, exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.part"
+        with open(tmp, 'wb') as f:
+            f.write(out)
+        os.replace(tmp, path)
+        return path
+    except Exception as e:
+        logger.debug(f"Cannot store fetched image {url[:80]}: {e}")
+        return None
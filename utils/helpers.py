@@ -1,4 +1,6 @@
 import os
+import hashlib
+import shutil
 from scraper.shopee import ShopeeScraper
 from scraper.tiktok import TikTokScraper
 from scraper.movie import MovieScraper
@@ -27,6 +29,34 @@ def ensure_directory(path: str):
     os.makedirs(path, exist_ok=True)
 
 
-
-
-
+def file_content_hash(path: str, block_size: int = 1024 * 1024, num_blocks: int = 8) -> str:
+    """
+    Hash nội dung file bằng cách lấy mẫu các block đều nhau (đầu, giữa, cuối).
+    File 4 GB chỉ cần đọc ~8 MB thay vì toàn bộ file.
+    File nhỏ hơn num_blocks * block_size được hash toàn bộ.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha1()
+    h.update(str(size).encode("ascii"))
+    with open(path, "rb") as f:
+        if size <= block_size * num_blocks:
+            for chunk in iter(lambda: f.read(block_size), b""):
+                h.update(chunk)
+        else:
+            step = (size - block_size) // (num_blocks - 1)
+            for i in range(num_blocks):
+                f.seek(i * step)
+                h.update(f.read(block_size))
+    return h.hexdigest()
+
+
+def get_ffmpeg_exe() -> str:
+    """ffmpeg trên PATH nếu có, nếu không dùng binary đi kèm imageio-ffmpeg (MoviePy cũng dùng)"""
+    exe = shutil.which("ffmpeg")
+    if exe:
+        return exe
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
@@ -0,0 +1,86 @@
+"""
+Perceptual image hashes (dHash / pHash) in NumPy.
+Dùng để gom các ảnh gần giống nhau (cùng bối cảnh, cùng góc máy, ảnh trùng
+từ nhiều nguồn) mà không cần so sánh từng pixel.
+"""
+from typing import List, Sequence, Union
+import numpy as np
+from PIL import Image
+
+ImageLike = Union[str, Image.Image, np.ndarray]
+
+
+def _to_gray(image: ImageLike, size) -> np.ndarray:
+    """Load/convert to grayscale and resize to `size` (w, h) as float32"""
+    if isinstance(image, np.ndarray):
+        if image.ndim == 3:
+            # OpenCV frames are BGR; luminance weights applied on reversed channels
+            image = Image.fromarray(image[..., ::-1].astype(np.uint8)).convert("L")
+        else:
+            image = Image.fromarray(image.astype(np.uint8))
+    elif isinstance(image, str):
+        with Image.open(image) as img:
+            img.draft("L", (size[0] * 4, size[1] * 4))  # JPEG: decode at reduced scale
+            return np.asarray(img.convert("L").resize(size, Image.BOX), dtype=np.float32)
+    return np.asarray(image.convert("L").resize(size, Image.BOX), dtype=np.float32)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def dhash(image: ImageLike, hash_size: int = 8) -> int:
+    """Difference hash: sign of horizontal gradient on a (hash_size+1)×hash_size thumbnail"""
+    pixels = _to_gray(image, (hash_size + 1, hash_size))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+
+def phash(image: ImageLike, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """DCT hash: low-frequency DCT coefficients vs. their median (robust to rescale/recompress)"""
+    n = hash_size * highfreq_factor
+    pixels = _to_gray(image, (n, n))
+    d = _dct_matrix(n)
+    low = (d @ pixels @ d.T)[:hash_size, :hash_size]
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def hamming_matrix(hashes: Sequence[int]) -> np.ndarray:
+    """Pairwise Hamming distances of 64-bit hashes (vectorized popcount)"""
+    h = np.array([x & 0xFFFFFFFFFFFFFFFF for x in hashes], dtype=np.uint64)
+    xor = h[:, None] ^ h[None, :]
+    return np.unpackbits(xor.view(np.uint8).reshape(len(h), len(h), 8), axis=2).sum(axis=2)
+
+
+def cluster_by_hash(hashes: Sequence[int], max_distance: int = 6) -> List[int]:
+    """
+    Greedy near-duplicate clustering in input order.
+    Returns: for each item, the index of its cluster representative
+        (the first item of the cluster; representatives map to themselves)
+    """
+    if not hashes:
+        return []
+    dist = hamming_matrix(hashes)
+    reps: List[int] = []
+    owner: List[int] = []
+    for i in range(len(hashes)):
+        match = next((r for r in reps if dist[i, r] <= max_distance), None)
+        if match is None:
+            reps.append(i)
+            match = i
+        owner.append(match)
+    return owner
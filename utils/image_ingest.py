@@ -0,0 +1,86 @@
+"""
+Image ingest - decode-time downscaling and re-encode avoidance.
+Ảnh tải về được chuẩn hóa một lần về cạnh dài tối đa (INGEST_MAX_SIDE):
+JPEG đã đạt chuẩn được giữ nguyên từng byte; các ảnh khác được decode ở độ
+phân giải giảm (JPEG draft() - scale ngay trong miền DCT) rồi mới encode lại.
+"""
+from io import BytesIO
+from typing import BinaryIO, Tuple, Union
+from PIL import Image
+
+INGEST_MAX_SIDE = 1920     # Canonical max dimension (render template is 1080x1920)
+INGEST_JPEG_QUALITY = 90
+PREVIEW_SIZE = (256, 256)  # Enough for perceptual hashes / quick checks
+
+ImageSource = Union[str, bytes, BinaryIO]
+
+
+def fit_within(size: Tuple[int, int], box: Tuple[int, int]) -> Tuple[int, int]:
+    """Largest size with the aspect of `size` that fits in `box` (never upscales)"""
+    w, h = size
+    scale = min(1.0, box[0] / float(w), box[1] / float(h))
+    return max(1, round(w * scale)), max(1, round(h * scale))
+
+
+def flatten_to_rgb(img: Image.Image) -> Image.Image:
+    """RGB copy of an image; transparency (WebP, PNG, GIF...) is composited onto white"""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        return background
+    return img if img.mode == 'RGB' else img.convert('RGB')
+
+
+def open_scaled(source: ImageSource, box: Tuple[int, int]) -> Image.Image:
+    """
+    Open an image for display inside `box` (w, h), decoding JPEGs at the
+    smallest DCT scale (1/2, 1/4, 1/8) that still covers the fitted size.
+    Returns a decoded RGB image (at least the fitted size, not resized further);
+    the source file is closed before returning
+    """
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    img = Image.open(source)
+    if img.format == 'JPEG':
+        img.draft('RGB', fit_within(img.size, box))
+    # Image.open lười: decode ngay để không giữ file handle tới lần dùng đầu
+    img.load()
+    return flatten_to_rgb(img)
+
+
+def is_conforming_jpeg(img: Image.Image, max_side: int = INGEST_MAX_SIDE) -> bool:
+    """Baseline-decodable JPEG that needs no conversion or downscale"""
+    return img.format == 'JPEG' and img.mode in ('RGB', 'L') and max(img.size) <= max_side
+
+
+def normalize_image_bytes(data: bytes, max_side: int = INGEST_MAX_SIDE,
+                          quality: int = INGEST_JPEG_QUALITY) -> Tuple[bytes, Image.Image]:
+    """
+    Canonical stored form of a downloaded image.
+    Args:
+        data: encoded image (any format Pillow reads)
+        max_side: longest side of the stored image
+    Returns: (JPEG bytes to write, small decoded preview for hashing/validation)
+        Conforming JPEGs are returned byte-for-byte; the rest are decoded at a
+        reduced DCT scale where possible, flattened to RGB, fitted to max_side
+        and encoded once. Raises if the data cannot be fully decoded.
+    """
+    img = Image.open(BytesIO(data))
+    if is_conforming_jpeg(img, max_side):
+        preview = Image.open(BytesIO(data))
+        preview.draft('RGB', fit_within(preview.size, PREVIEW_SIZE))
+        preview.load()  # Full entropy decode at 1/8 scale: truncated files still fail here
+        return data, preview
+
+    target = fit_within(img.size, (max_side, max_side))
+    if img.format == 'JPEG':
+        img.draft('RGB', target)
+    img = flatten_to_rgb(img)
+    if img.size != target:
+        img = img.resize(target, Image.LANCZOS)
+    buf = BytesIO()
+    img.save(buf, 'JPEG', quality=quality)
+    img.thumbnail(PREVIEW_SIZE, Image.BILINEAR)
+    return buf.getvalue(), img
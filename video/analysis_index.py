@@ -0,0 +1,119 @@
+"""
+Analysis Index - Persistent per-video analysis sidecar
+Stores audio feature series, shot boundaries and Whisper transcript as
+columnar NumPy arrays (.npz), keyed by video content hash, so re-running
+highlight detection with different parameters never re-decodes the media.
+Sidecars unused for INDEX_TTL are dropped, then the oldest beyond INDEX_MAX_BYTES.
+"""
+import os
+import threading
+from typing import Dict, Optional
+import numpy as np
+from utils.disk_cache import prune_cache_dir_once, touch
+from utils.helpers import file_content_hash
+from utils.logger import get_logger
+
+logger = get_logger()
+
+INDEX_DIR = os.getenv("ANALYSIS_INDEX_DIR", "assets/temp/analysis_index")
+INDEX_VERSION = 1
+INDEX_TTL = 30 * 24 * 3600            # Sidecars unused for this long are removed
+INDEX_MAX_BYTES = 256 * 1024 * 1024   # ...and the oldest ones beyond this total
+
+
+class AnalysisIndex:
+    """
+    Sidecar store: one .npz per video content hash.
+    Known columns:
+      - duration: scalar, video duration (s)
+      - rms: float32[n], audio RMS per 1-second chunk (not normalized)
+      - shots: float32[k], shot boundary times (s)
+      - transcript_start / transcript_end / transcript_logprob: float32[m]
+      - transcript_text: str[m]
+      - transcript_model: scalar str, Whisper model that produced the transcript
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR):
+        self.index_dir = index_dir
+        self._hash_memo: Dict[tuple, str] = {}
+        self._loaded: Dict[str, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def key_for(self, video_path: str) -> str:
+        """Content hash of the video (memoized by path + size + mtime)"""
+        st = os.stat(video_path)
+        memo_key = (os.path.abspath(video_path), st.st_size, st.st_mtime_ns)
+        key = self._hash_memo.get(memo_key)
+        if key is None:
+            key = file_content_hash(video_path)
+            self._hash_memo[memo_key] = key
+        return key
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.index_dir, f"{key}.npz")
+
+    def load(self, video_path: str) -> Dict[str, np.ndarray]:
+        """Return stored columns for this video (empty dict if not indexed)"""
+        try:
+            key = self.key_for(video_path)
+        except OSError as e:
+            logger.warning(f"Cannot hash video for index: {e}")
+            return {}
+
+        with self._lock:
+            if key in self._loaded:
+                return dict(self._loaded[key])
+
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return {}
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                columns = {name: data[name] for name in data.files}
+        except Exception as e:
+            logger.warning(f"Analysis index unreadable, ignoring: {e}")
+            return {}
+
+        if int(columns.pop("_version", -1)) != INDEX_VERSION:
+            logger.info("Analysis index version changed, re-analyzing")
+            return {}
+
+        with self._lock:
+            self._loaded[key] = columns
+        touch(path)  # Vừa dùng → được dọn sau cùng
+        logger.info(f"📇 Analysis index hit: {os.path.basename(path)}")
+        return dict(columns)
+
+    def update(self, video_path: str, columns: Dict[str, object]) -> Optional[str]:
+        """Merge columns into the video's index and persist atomically"""
+        try:
+            key = self.key_for(video_path)
+        except OSError as e:
+            logger.warning(f"Cannot hash video for index: {e}")
+            return None
+
+        merged = dict(self.load(video_path))
+        merged.update({name: np.asarray(value) for name, value in columns.items()})
+
+        path = self.path_for(key)
+        # Lần ghi đầu tiên trong process dọn các sidecar cũ / vượt dung lượng
+        prune_cache_dir_once(self.index_dir, INDEX_TTL, INDEX_MAX_BYTES)
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, _version=np.asarray(INDEX_VERSION), **merged)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write analysis index: {e}")
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return None
+
+        with self._lock:
+            self._loaded[key] = merged
+        return path
@@ -0,0 +1,235 @@
+"""
+Batch Clipping Queue - Pipelined multi-URL clipping
+Stages overlap across items: item N+1 downloads while item N is analyzed
+and item N-1 is cut. Each stage has its own concurrency limit and a failing
+item never stops the rest of the batch.
+"""
+import os
+import re
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+from utils.logger import get_logger
+from video.analysis_index import AnalysisIndex
+from video.clipper import VideoHighlightDetector
+from video.downloader import VideoDownloader
+
+logger = get_logger()
+
+STAGES = ("download", "analyze", "cut")
+
+
+class ClipQueue:
+    """Download → Analyze → Cut pipeline over a list (or playlist) of URLs"""
+
+    def __init__(self, num_clips: int = 5, format: str = 'short', method: str = "audio",
+                 clip_duration: int = None, output_dir: str = "output/clips",
+                 audio_first: bool = False, cleanup: bool = True, snap_to_shots: Optional[bool] = None,
+                 download_workers: int = 2, analyze_workers: int = 1, cut_workers: int = 1,
+                 progress_callback: Optional[Callable[[int, str, str], None]] = None):
+        """
+        Args:
+            download_workers / analyze_workers / cut_workers: per-stage concurrency limits
+            audio_first: download audio only, then fetch just the highlight ranges
+            snap_to_shots: snap clip edges to shot cuts (default: on for full downloads,
+                off for audio-first, where it would mean fetching a low-res video proxy)
+            progress_callback: fn(item_index, stage, message)
+        """
+        self.num_clips = num_clips
+        self.format = format
+        self.method = method
+        self.clip_duration = clip_duration
+        self.output_dir = output_dir
+        self.audio_first = audio_first
+        self.cleanup = cleanup
+        self.snap_to_shots = (not audio_first) if snap_to_shots is None else snap_to_shots
+        self.progress_callback = progress_callback
+        self.limits = {
+            "download": max(1, download_workers),
+            "analyze": max(1, analyze_workers),
+            "cut": max(1, cut_workers),
+        }
+        self.downloader = VideoDownloader()
+        # Shared across items: index writes are per-video, reads are memoized
+        self.index = AnalysisIndex()
+
+    @staticmethod
+    def is_playlist_url(url: str) -> bool:
+        """Playlist / channel URL (expanded to its videos by expand_urls)"""
+        return (("list=" in url and "watch?v=" not in url)
+                or "/playlist" in url
+                or ("/@" in url and "/video/" not in url))
+
+    def expand_urls(self, urls: List[str]) -> List[str]:
+        """Flatten playlist/channel URLs into individual video URLs"""
+        expanded: List[str] = []
+        for url in urls:
+            url = url.strip()
+            if not url:
+                continue
+            if not self.is_playlist_url(url):
+                expanded.append(url)
+                continue
+            entries = self._playlist_entries(url)
+            if entries:
+                logger.info(f"📃 Playlist expanded: {len(entries)} videos")
+                expanded.extend(entries)
+            else:
+                expanded.append(url)
+        return expanded
+
+    def run(self, urls: List[str]) -> List[Dict]:
+        """
+        Process all URLs through the pipeline.
+        Returns: one result per video, in input order:
+            {'url', 'clips', 'highlights', 'error', 'failed_stage'}
+        """
+        items = self.expand_urls(urls)
+        if not items:
+            return []
+
+        logger.info(f"🚚 Batch clipping {len(items)} videos "
+                    f"(download={self.limits['download']}, analyze={self.limits['analyze']}, cut={self.limits['cut']})")
+
+        # One executor per stage, sized to its limit: an item waiting for the
+        # analyzer never holds a download thread. Items are handed stage to stage.
+        pools = {stage: ThreadPoolExecutor(max_workers=n, thread_name_prefix=f"clipq-{stage}")
+                 for stage, n in self.limits.items()}
+        jobs = [{'index': i, 'url': url, 'media_path': None, 'detector': None, 'highlights': None,
+                 'result': {'url': url, 'clips': [], 'highlights': [], 'error': None, 'failed_stage': None},
+                 'done': Future()}
+                for i, url in enumerate(items)]
+        try:
+            for job in jobs:
+                pools["download"].submit(self._run_stage, pools, "download", job)
+            results = [job['done'].result() for job in jobs]
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+
+        ok = sum(1 for r in results if not r['error'])
+        logger.info(f"🎬 Batch done: {ok}/{len(results)} videos clipped")
+        return results
+
+    def _run_stage(self, pools: Dict[str, ThreadPoolExecutor], stage: str, job: Dict):
+        """Run one stage of one item, then hand it to the next stage's executor"""
+        try:
+            getattr(self, f"_{stage}")(job)
+        except Exception as e:
+            job['result']['error'] = str(e)
+            job['result']['failed_stage'] = stage
+            logger.error(f"❌ Batch item {job['index']+1} failed at {stage}: {e}")
+            self._notify(job['index'], "failed", f"❌ {stage}: {e}")
+            self._finish(job)
+            return
+        next_stage = STAGES[STAGES.index(stage) + 1] if stage != STAGES[-1] else None
+        if next_stage:
+            pools[next_stage].submit(self._run_stage, pools, next_stage, job)
+        else:
+            self._notify(job['index'], "done", f"✅ {len(job['result']['clips'])} clips")
+            self._finish(job)
+
+    def _download(self, job: Dict):
+        self._notify(job['index'], "download", "📥 Downloading...")
+        if self.audio_first:
+            media_path = self.downloader.download_analysis_media(job['url'], with_video=self.snap_to_shots)
+        else:
+            media_path = self.downloader.download(job['url'])
+        if not media_path:
+            raise RuntimeError("Download failed")
+        job['media_path'] = media_path
+
+    def _analyze(self, job: Dict):
+        detector = VideoHighlightDetector(snap_to_shots=self.snap_to_shots)
+        detector.index = self.index
+        detector.configure_durations(self.format, self.clip_duration)
+        job['detector'] = detector
+        self._notify(job['index'], "analyze", "🔍 Detecting highlights...")
+        highlights = detector.detect_highlights(job['media_path'], self.num_clips, method=self.method)
+        if not highlights:
+            raise RuntimeError("No highlights detected")
+        job['highlights'] = highlights
+
+    def _cut(self, job: Dict):
+        highlights = job['highlights']
+        media_path = job['media_path']
+        item_dir = os.path.join(self.output_dir, self._item_dirname(job['index'], media_path))
+        self._notify(job['index'], "cut", f"✂️ Cutting {len(highlights)} clips...")
+        if self.audio_first:
+            paths = [
+                os.path.join(item_dir, VideoHighlightDetector.clip_filename(i, self.format, h['start']))
+                for i, h in enumerate(highlights)
+            ]
+            fetched = self.downloader.download_sections(
+                job['url'], [(h['start'], h['end']) for h in highlights], paths
+            )
+            kept = [(p, h) for p, h in zip(fetched, highlights) if p]
+        else:
+            kept = []
+            os.makedirs(item_dir, exist_ok=True)
+            for i, h in enumerate(highlights):
+                path = os.path.join(item_dir, VideoHighlightDetector.clip_filename(i, self.format, h['start']))
+                if job['detector'].cut_clip(media_path, h['start'], h['end'], path, use_cache=True):
+                    kept.append((path, h))
+        job['result']['clips'] = [p for p, _ in kept]
+        job['result']['highlights'] = [h for _, h in kept]
+        if not kept:
+            raise RuntimeError("No clips produced")
+
+    def _finish(self, job: Dict):
+        """Release the item's resources and publish its result"""
+        try:
+            # Release the cached clip before deleting its source file
+            if job['detector']:
+                job['detector'].cleanup()
+            media_path = job['media_path']
+            if self.cleanup and media_path and os.path.exists(media_path):
+                try:
+                    os.remove(media_path)
+                except Exception as e:
+                    logger.warning(f"Cleanup failed: {e}")
+        finally:
+            job['done'].set_result(job['result'])
+
+    def _item_dirname(self, index: int, media_path: str) -> str:
+        stem = os.path.splitext(os.path.basename(media_path))[0]
+        stem = stem.replace(".analysis", "")
+        stem = re.sub(r'[<>:"/\\|?*\s]+', '_', stem)[:60]
+        return f"{index+1:03d}_{stem}"
+
+    def _notify(self, index: int, stage: str, message: str):
+        if self.progress_callback:
+            try:
+                self.progress_callback(index, stage, message)
+            except Exception:
+                pass
+
+    def _playlist_entries(self, url: str) -> List[str]:
+        try:
+            import yt_dlp
+            ydl_opts = {'quiet': True, 'no_warnings': True, 'extract_flat': 'in_playlist'}
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False)
+            entries = (info or {}).get('entries') or []
+            return [e.get('url') or e.get('webpage_url') for e in entries
+                    if e and (e.get('url') or e.get('webpage_url'))]
+        except Exception as e:
+            logger.warning(f"Playlist expansion failed: {e}")
+            return []
+
+
+if __name__ == "__main__":
+    # Usage: python -m video.clip_queue urls.txt [num_clips] [clip_duration]
+    if len(sys.argv) < 2:
+        print("Usage: python -m video.clip_queue urls.txt [num_clips] [clip_duration]")
+        sys.exit(1)
+    with open(sys.argv[1], encoding="utf-8") as f:
+        url_list = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    queue = ClipQueue(
+        num_clips=int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+        clip_duration=int(sys.argv[3]) if len(sys.argv) > 3 else None,
+        audio_first=True,
+    )
+    for r in queue.run(url_list):
+        status = f"{len(r['clips'])} clips" if not r['error'] else f"FAILED ({r['failed_stage']}): {r['error']}"
+        print(f"{r['url']}: {status}")
@@ -5,13 +5,20 @@ Performance improvements:
 - Video object caching
 - Memory-efficient operations
 - Parallel-ready structure
+- Persistent analysis index (re-query without re-decoding)
+- Shot-boundary snapping (clean clip edges, stream-copy cuts on keyframes)
+- Single ffmpeg decode pass for audio RMS + shots + ASR
 """
 import os
-import tempfile
+import subprocess
 from typing import List, Dict, Optional
 from moviepy.editor import VideoFileClip
 import numpy as np
+from utils.helpers import get_ffmpeg_exe
 from utils.logger import get_logger
+from video.analysis_index import AnalysisIndex
+from video.media_analysis import MediaAnalysisPass
+from video.scene_detector import SHOT_SAMPLE_FPS, list_keyframe_times
 
 logger = get_logger()
 
@@ -21,11 +28,17 @@ class VideoHighlightDetector:
     Optimized highlight detection using audio analysis
     """
     
-    def __init__(self, min_clip_duration=10, max_clip_duration=60):
+    def __init__(self, min_clip_duration=10, max_clip_duration=60, use_index: bool = True,
+                 snap_to_shots: bool = True, snap_tolerance: float = 2.0):
         self.min_clip_duration = min_clip_duration
         self.max_clip_duration = max_clip_duration
         self._video_cache = None
         self._video_path_cache = None
+        # Persistent analysis index: re-queries with new params skip decoding
+        self.index = AnalysisIndex() if use_index else None
+        # Move clip edges onto the nearest shot cut (within tolerance seconds)
+        self.snap_to_shots = snap_to_shots
+        self.snap_tolerance = snap_tolerance
     
     def _get_video(self, video_path: str) -> VideoFileClip:
         """Cache video object to avoid reloading"""
@@ -53,15 +66,15 @@ class VideoHighlightDetector:
         logger.info(f"🔍 Detecting {num_clips} highlights")
         
         try:
-            video = self._get_video(video_path)
-            duration = video.duration
+            features = self._load_features(video_path, need_transcript=(method == "semantic"))
+            duration = float(features['duration'])
             
             logger.info(f"📹 Video: {duration:.1f}s")
             
             # Choose detection path
             highlights: List[Dict] = []
             if method == "semantic":
-                highlights = self._detect_semantic(video_path, video, num_clips)
+                highlights = self._detect_semantic(features, num_clips)
                 if highlights:
                     logger.info(f"🧠 Semantic highlights selected: {len(highlights)}")
                 else:
@@ -70,7 +83,10 @@ class VideoHighlightDetector:
                 highlights = self._uniform_segments(duration, num_clips)
             else:
                 # Default audio peaks (also for 'scene' placeholder)
-                highlights = self._detect_audio_peaks_optimized(video, num_clips)
+                highlights = self._detect_audio_peaks_optimized(features, num_clips)
+            
+            if self.snap_to_shots:
+                highlights = self._snap_to_shots(highlights, features)
             
             # Remove overlaps
             highlights = self._remove_overlaps(highlights)
@@ -82,45 +98,85 @@ class VideoHighlightDetector:
             logger.error(f"Detection failed: {e}")
             return []
 
-    def _detect_semantic(self, video_path: str, video: VideoFileClip, num_clips: int) -> List[Dict]:
+    def _load_features(self, video_path: str, need_transcript: bool = False) -> Dict:
+        """
+        Read analysis features from the persistent index; decode the media
+        only for columns that are missing, then write them back.
+        """
+        features = self.index.load(video_path) if self.index else {}
+        has_transcript = (
+            'transcript_start' in features
+            and str(features.get('transcript_model', '')) == self._whisper_model_name()
+        )
+        need_shots = self.snap_to_shots and 'shots' not in features
+        if 'duration' in features and 'rms' in features and not need_shots \
+                and (has_transcript or not need_transcript):
+            return features
+        
+        # One ffmpeg decode feeds every missing signal (RMS, shots, ASR) at once
+        want_transcript = need_transcript and not has_transcript
+        signals = MediaAnalysisPass(sample_fps=SHOT_SAMPLE_FPS).run(
+            video_path,
+            rms='rms' not in features,
+            shots=need_shots,
+            transcribe_model=self._whisper_model_name() if want_transcript else None,
+        )
+        computed: Dict = {}
+        if 'duration' not in features:
+            computed['duration'] = float(signals['duration'] or 0.0)
+        if 'rms' not in features:
+            computed['rms'] = signals['rms']
+        if want_transcript and signals.get('transcript_segments') is not None:
+            computed.update(self._transcript_columns(signals['transcript_segments']))
+        if need_shots:
+            shots = signals['shots']
+            computed.update({
+                'shots': np.array(shots, dtype=np.float64),
+                'shot_sample_fps': np.array(SHOT_SAMPLE_FPS),
+                # Keyframe listing reads packets only (no full decode)
+                'keyframes': np.array(list_keyframe_times(video_path) if shots else [], dtype=np.float64),
+            })
+        
+        features.update(computed)
+        if self.index and computed:
+            self.index.update(video_path, computed)
+        return features
+
+    def _whisper_model_name(self) -> str:
+        return os.getenv("WHISPER_MODEL", "small")
+
+    def _transcript_columns(self, segments: List[Dict]) -> Dict:
+        """Whisper segments → transcript columns for the index"""
+        return {
+            'transcript_start': np.array([float(seg.get("start", 0.0)) for seg in segments], dtype=np.float32),
+            'transcript_end': np.array([float(seg.get("end", seg.get("start", 0.0))) for seg in segments], dtype=np.float32),
+            'transcript_logprob': np.array([float(seg.get("avg_logprob", -1.0)) for seg in segments], dtype=np.float32),
+            'transcript_text': np.array([(seg.get("text", "") or "").strip() for seg in segments], dtype=str),
+            'transcript_model': np.array(self._whisper_model_name()),
+        }
+
+    def _detect_semantic(self, features: Dict, num_clips: int) -> List[Dict]:
         """Semantic highlight detection using Whisper transcript (optional)"""
-        try:
-            import whisper  # Optional dependency
-        except ImportError:
-            logger.warning("whisper not installed; run: pip install openai-whisper")
+        if 'transcript_start' not in features:
             return []
         
-        temp_audio = None
         try:
-            # Dump audio to temp WAV (mono, 16k) for ASR
-            fd, temp_audio = tempfile.mkstemp(suffix=".wav", prefix="clipper_semantic_")
-            os.close(fd)
-            video.audio.write_audiofile(
-                temp_audio,
-                fps=16000,
-                nbytes=2,
-                codec="pcm_s16le",
-                verbose=False,
-                logger=None
-            )
-            
-            model_name = os.getenv("WHISPER_MODEL", "small")
-            logger.info(f"🧠 Running Whisper ({model_name}) for transcript...")
-            model = whisper.load_model(model_name)
-            result = model.transcribe(temp_audio, language="vi", word_timestamps=False)
-            segments = result.get("segments", []) or []
-            if not segments:
+            video_duration = float(features['duration'])
+            starts = features['transcript_start']
+            if len(starts) == 0:
                 logger.warning("No transcript segments found")
                 return []
             
             # Score segments: density of words per second + avg_logprob as a signal
             scored = []
-            for seg in segments:
-                start = float(seg.get("start", 0.0))
-                end = float(seg.get("end", start))
+            for start, end, avg_logprob, text in zip(starts, features['transcript_end'],
+                                                     features['transcript_logprob'],
+                                                     features['transcript_text']):
+                start = float(start)
+                end = float(end)
                 duration = max(end - start, 1e-3)
-                text = seg.get("text", "") or ""
-                avg_logprob = float(seg.get("avg_logprob", -1.0))
+                text = str(text)
+                avg_logprob = float(avg_logprob)
                 
                 # Detect exciting keywords for sports/action (bóng đá, review, etc.)
                 text_lower = text.lower()
@@ -149,10 +205,10 @@ class VideoHighlightDetector:
             for seg in scored:
                 # Expand slightly to include context
                 start = max(0.0, seg["start"] - 1.5)
-                end = min(video.duration, seg["end"] + 1.5)
+                end = min(video_duration, seg["end"] + 1.5)
                 clip_duration = end - start
                 if clip_duration < self.min_clip_duration:
-                    end = min(video.duration, start + self.min_clip_duration)
+                    end = min(video_duration, start + self.min_clip_duration)
                 if clip_duration > self.max_clip_duration:
                     end = start + self.max_clip_duration
                 highlights.append({
@@ -165,49 +221,16 @@ class VideoHighlightDetector:
         except Exception as e:
             logger.error(f"Semantic detection error: {e}")
             return []
-        finally:
-            if temp_audio and os.path.exists(temp_audio):
-                try:
-                    os.remove(temp_audio)
-                except:
-                    pass
     
-    def _detect_audio_peaks_optimized(self, video: VideoFileClip, num_clips: int) -> List[Dict]:
-        """Optimized: Extract all audio at once, batch process"""
+    def _detect_audio_peaks_optimized(self, features: Dict, num_clips: int) -> List[Dict]:
+        """Pick loudest 1-second windows from the precomputed RMS series"""
+        duration = float(features['duration'])
         try:
-            if not video.audio:
+            rms_values = np.asarray(features.get('rms', []), dtype=np.float64)
+            if rms_values.size == 0:
                 logger.warning("No audio - using uniform segments")
-                return self._uniform_segments(video.duration, num_clips)
-            
-            duration = video.duration
-            
-            # Extract entire audio array once (much faster than frame-by-frame)
-            logger.info("📊 Analyzing audio...")
-            audio_array = video.audio.to_soundarray(fps=22050)
-            
-            # Convert stereo to mono if needed - FIX: handle empty/single-channel properly
-            if len(audio_array.shape) > 1 and audio_array.shape[1] > 1:
-                audio_array = np.mean(audio_array, axis=1)
-            elif len(audio_array.shape) > 1:
-                audio_array = audio_array.flatten()
-            
-            # Calculate RMS in 1-second chunks
-            chunk_size = 22050  # 1 second at 22050 Hz
-            num_chunks = max(1, len(audio_array) // chunk_size)
-            
-            rms_values = []
-            for i in range(num_chunks):
-                chunk = audio_array[i*chunk_size:(i+1)*chunk_size]
-                if len(chunk) > 0:
-                    rms = np.sqrt(np.mean(chunk ** 2))
-                    rms_values.append(rms)
-            
-            if not rms_values:
-                logger.warning("No audio chunks - using uniform segments")
                 return self._uniform_segments(duration, num_clips)
             
-            rms_values = np.array(rms_values)
-            
             # Normalize
             rms_values = rms_values / (rms_values.max() + 1e-8)
             
@@ -240,7 +263,61 @@ class VideoHighlightDetector:
             
         except Exception as e:
             logger.error(f"Audio detection error: {e}")
-            return self._uniform_segments(video.duration, num_clips)
+            return self._uniform_segments(duration, num_clips)
+    
+    def _snap_to_shots(self, highlights: List[Dict], features: Dict) -> List[Dict]:
+        """
+        Move each highlight's start/end onto the nearest shot cut within
+        snap_tolerance, as long as the clip stays within min/max duration.
+        A keyframe inside the sampled cut interval gives the exact cut time.
+        """
+        shots = np.asarray(features.get('shots', []), dtype=np.float64)
+        if shots.size == 0 or not highlights:
+            return highlights
+        
+        interval = 1.0 / float(features.get('shot_sample_fps', SHOT_SAMPLE_FPS))
+        keyframes = np.asarray(features.get('keyframes', []), dtype=np.float64)
+        duration = float(features['duration'])
+        
+        def cut_near(t: float):
+            """Exact-as-possible cut near t: (first time of new shot, last time of old shot)"""
+            i = int(np.searchsorted(shots, t))
+            best = None
+            for j in (i - 1, i):
+                if 0 <= j < len(shots) and abs(shots[j] - t) <= self.snap_tolerance:
+                    if best is None or abs(shots[j] - t) < abs(best - t):
+                        best = float(shots[j])
+            if best is None:
+                return None
+            # Cut lies in (best - interval, best]; an encoder keyframe there marks it exactly
+            k = keyframes[(keyframes > best - interval) & (keyframes <= best)]
+            if k.size:
+                return float(k[0]), float(k[0])
+            return best, best - interval
+        
+        snapped = []
+        moved = 0
+        for h in highlights:
+            start, end = h['start'], h['end']
+            start_cut = cut_near(start)
+            end_cut = cut_near(end)
+            new_start = start_cut[0] if start_cut else start
+            new_end = min(end_cut[1], duration) if end_cut else end
+            
+            # Try both edges, then each edge alone, keeping duration limits
+            for cand_start, cand_end in ((new_start, new_end), (new_start, end), (start, new_end)):
+                length = cand_end - cand_start
+                if self.min_clip_duration <= length <= self.max_clip_duration and cand_start >= 0:
+                    if (cand_start, cand_end) != (start, end):
+                        moved += 1
+                    start, end = cand_start, cand_end
+                    break
+            
+            snapped.append({**h, 'start': float(start), 'end': float(end)})
+        
+        if moved:
+            logger.info(f"🎞️ Snapped {moved}/{len(highlights)} clips to shot boundaries")
+        return snapped
     
     def _find_top_peaks(self, values: np.ndarray, n: int, min_distance: int = 10) -> List[int]:
         """Find top N peaks ensuring minimum distance"""
@@ -296,6 +373,12 @@ class VideoHighlightDetector:
         try:
             logger.info(f"✂️ Cutting: {start:.1f}s - {end:.1f}s")
             
+            # Clean keyframe start → remux without re-encoding
+            if self._starts_on_keyframe(video_path, start) and \
+                    self._cut_stream_copy(video_path, start, end, output_path):
+                logger.info(f"✅ Saved (stream copy): {os.path.basename(output_path)}")
+                return True
+            
             # Use cached video if available
             if use_cache:
                 video = self._get_video(video_path)
@@ -329,15 +412,34 @@ class VideoHighlightDetector:
             logger.error(f"Cut failed: {e}")
             return False
     
-    def auto_clip(self, video_path: str, output_dir: str, 
-                  num_clips: int = 5, format: str = 'short', method: str = "audio", clip_duration: int = None) -> List[str]:
-        """
-        Complete workflow: detect + cut
-        Args:
-            clip_duration: Custom clip duration in seconds (overrides format)
-        """
-        os.makedirs(output_dir, exist_ok=True)
-        
+    def _starts_on_keyframe(self, video_path: str, start: float) -> bool:
+        if not self.index:
+            return False
+        keyframes = self.index.load(video_path).get('keyframes')
+        if keyframes is None or len(keyframes) == 0:
+            return False
+        return bool(np.min(np.abs(np.asarray(keyframes, dtype=np.float64) - start)) < 0.01)
+    
+    def _cut_stream_copy(self, video_path: str, start: float, end: float, output_path: str) -> bool:
+        """Cut by remuxing packets (no decode/encode); only exact when start is a keyframe"""
+        cmd = [
+            get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+            "-ss", f"{start:.3f}", "-i", video_path, "-t", f"{end - start:.3f}",
+            "-map", "0:v:0", "-map", "0:a:0?", "-c", "copy",
+            "-avoid_negative_ts", "make_zero", "-movflags", "+faststart",
+            output_path,
+        ]
+        try:
+            proc = subprocess.run(cmd, capture_output=True, text=True, errors="ignore", timeout=600)
+            if proc.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 1024:
+                return True
+            logger.warning(f"Stream copy failed, re-encoding: {proc.stderr.strip()[:200]}")
+        except Exception as e:
+            logger.warning(f"Stream copy failed, re-encoding: {e}")
+        return False
+    
+    def configure_durations(self, format: str = 'short', clip_duration: int = None):
+        """Set min/max clip length from a custom duration or a format preset"""
         # Use custom duration if provided, otherwise use format
         if clip_duration is not None:
             self.max_clip_duration = clip_duration
@@ -353,9 +455,28 @@ class VideoHighlightDetector:
             else:  # long
                 self.max_clip_duration = 180
                 self.min_clip_duration = 60
+    
+    @staticmethod
+    def clip_filename(index: int, format: str, start: float) -> str:
+        """Output filename for the index-th (0-based) clip"""
+        return f"clip_{index+1:03d}_{format}_{int(start)}s.mp4"
+    
+    def auto_clip(self, video_path: str, output_dir: str, 
+                  num_clips: int = 5, format: str = 'short', method: str = "audio", clip_duration: int = None,
+                  highlights: List[Dict] = None) -> List[str]:
+        """
+        Complete workflow: detect + cut
+        Args:
+            clip_duration: Custom clip duration in seconds (overrides format)
+            highlights: Already-detected highlights (skip detection)
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        
+        self.configure_durations(format, clip_duration)
         
         # Detect once
-        highlights = self.detect_highlights(video_path, num_clips, method=method)
+        if highlights is None:
+            highlights = self.detect_highlights(video_path, num_clips, method=method)
         
         if not highlights:
             logger.warning("No highlights detected")
@@ -364,8 +485,7 @@ class VideoHighlightDetector:
         # Cut all clips (reuse cached video)
         output_paths = []
         for i, highlight in enumerate(highlights):
-            filename = f"clip_{i+1:03d}_{format}_{int(highlight['start'])}s.mp4"
-            output_path = os.path.join(output_dir, filename)
+            output_path = os.path.join(output_dir, self.clip_filename(i, format, highlight['start']))
             
             if self.cut_clip(video_path, highlight['start'], highlight['end'], 
                            output_path, use_cache=True):
@@ -447,28 +567,42 @@ class SmartClipper:
         return results
 
     def clip_from_url(self, url: str, num_clips: int = 5, 
-                     format: str = 'short', cleanup: bool = True, method: str = "audio", clip_duration: int = None) -> Dict:
+                     format: str = 'short', cleanup: bool = True, method: str = "audio", clip_duration: int = None,
+                     audio_first: bool = False, snap_to_shots: Optional[bool] = None) -> Dict:
         """
         Download → Detect → Clip → Cleanup
         Args:
             clip_duration: Custom clip duration in seconds (overrides format)
+            audio_first: Two-phase mode - fetch only the audio track for detection,
+                then download only the chosen ranges at full quality
+            snap_to_shots: audio-first only - True also fetches a low-res video proxy
+                so clip edges can snap to shot cuts (default off: audio only)
         """
         from video.downloader import VideoDownloader
         import os
         
         downloader = VideoDownloader()
+        output_dir = "output/clips"
+        
+        if audio_first:
+            result = self._clip_audio_first(downloader, url, num_clips, format, cleanup,
+                                            method, clip_duration, output_dir,
+                                            snap_to_shots=bool(snap_to_shots))
+            if result is not None:
+                return result
+            logger.warning("Audio-first clipping failed, falling back to full download")
+        
         video_path = downloader.download(url)
         
         if not video_path:
             return {'clips': [], 'highlights': [], 'error': 'Download failed'}
         
         try:
-            # Detect
+            # Detect once with the requested durations, then cut those highlights
+            self.detector.configure_durations(format, clip_duration)
             highlights = self.detector.detect_highlights(video_path, num_clips, method=method)
-            
-            # Cut with custom duration
-            output_dir = "output/clips"
-            clips = self.detector.auto_clip(video_path, output_dir, num_clips, format, method, clip_duration=clip_duration)
+            clips = self.detector.auto_clip(video_path, output_dir, num_clips, format, method,
+                                            clip_duration=clip_duration, highlights=highlights)
             
             result = {
                 'clips': clips,
@@ -499,3 +633,68 @@ class SmartClipper:
         finally:
             # Always cleanup detector cache
             self.detector.cleanup()
+
+    def clip_batch(self, urls: List[str], num_clips: int = 5, format: str = 'short',
+                   method: str = "audio", clip_duration: int = None, audio_first: bool = False,
+                   progress_callback=None, **stage_limits) -> List[Dict]:
+        """
+        Clip many URLs (or playlists) with download/analysis/cutting pipelined across items.
+        Args:
+            stage_limits: download_workers / analyze_workers / cut_workers
+        Returns: per-video results in input order (see ClipQueue.run)
+        """
+        from video.clip_queue import ClipQueue
+        queue = ClipQueue(num_clips=num_clips, format=format, method=method,
+                          clip_duration=clip_duration, audio_first=audio_first,
+                          progress_callback=progress_callback, **stage_limits)
+        return queue.run(urls)
+
+    def _clip_audio_first(self, downloader, url: str, num_clips: int, format: str, cleanup: bool,
+                          method: str, clip_duration: int, output_dir: str,
+                          snap_to_shots: bool = False) -> Optional[Dict]:
+        """
+        Phase 1: audio-only download → detect highlights.
+        Phase 2: ranged full-quality download of each highlight.
+        Returns None if phase 1 fails (caller falls back to full download).
+        Args:
+            snap_to_shots: fetch a low-res video proxy instead of audio only so
+                edges can snap to shot cuts (costs the bandwidth audio-first saves)
+        """
+        # Audio-only media has no frames: snapping is then a no-op
+        analysis_path = downloader.download_analysis_media(url, with_video=snap_to_shots)
+        if not analysis_path:
+            return None
+        
+        try:
+            self.detector.configure_durations(format, clip_duration)
+            highlights = self.detector.detect_highlights(analysis_path, num_clips, method=method)
+            if not highlights:
+                logger.warning("No highlights detected")
+                return {'clips': [], 'highlights': [], 'source_video': None, 'temp_deleted': cleanup}
+            
+            output_paths = [
+                os.path.join(output_dir, VideoHighlightDetector.clip_filename(i, format, h['start']))
+                for i, h in enumerate(highlights)
+            ]
+            fetched = downloader.download_sections(
+                url, [(h['start'], h['end']) for h in highlights], output_paths
+            )
+            # Keep clips and highlights aligned (drop ranges that failed)
+            kept = [(path, h) for path, h in zip(fetched, highlights) if path]
+            logger.info(f"🎬 Created {len(kept)} clips (audio-first)")
+            
+            return {
+                'clips': [path for path, _ in kept],
+                'highlights': [h for _, h in kept],
+                'source_video': None,
+                'temp_deleted': cleanup
+            }
+        finally:
+            self.detector.cleanup()
+            # Analysis media is never needed after phase 1
+            if cleanup and os.path.exists(analysis_path):
+                try:
+                    os.remove(analysis_path)
+                    logger.info(f"🗑️ Cleaned up: {os.path.basename(analysis_path)}")
+                except Exception as e:
+                    logger.warning(f"Cleanup failed: {e}")
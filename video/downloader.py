@@ -3,8 +3,11 @@ Video Downloader & Processor
 Download videos from YouTube, TikTok, Instagram
 """
 import os
+import re
 import subprocess
-from typing import Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple
+from utils.helpers import get_ffmpeg_exe
 from utils.logger import get_logger
 
 logger = get_logger()
@@ -100,6 +103,136 @@ class VideoDownloader:
         logger.error(f"All download attempts failed after {max_retries} retries")
         return None
     
+    def download_analysis_media(self, url: str, with_video: bool = False,
+                                max_retries: int = 2) -> Optional[str]:
+        """
+        Phase 1 of audio-first clipping: fetch only what highlight detection needs.
+        Audio-only by default; with_video=True fetches a low-res muxed proxy instead
+        (for visual passes such as shot detection).
+        Returns: path to downloaded analysis file
+        """
+        try:
+            import yt_dlp
+        except ImportError:
+            logger.error("yt-dlp not installed. Install: pip install yt-dlp")
+            return None
+        
+        if with_video:
+            format_options = [
+                'worst[height>=240][ext=mp4]/worst[height>=240]',
+                'worst[ext=mp4]/worst',
+            ]
+            kind = "low-res proxy"
+        else:
+            format_options = [
+                'bestaudio[ext=m4a]/bestaudio',
+                'worstaudio/worst',
+            ]
+            kind = "audio"
+        
+        logger.info(f"🎧 Downloading {kind} for analysis: {url}")
+        output_template = os.path.join(self.output_dir, "%(id)s.analysis.%(ext)s")
+        
+        for attempt in range(max_retries):
+            for fmt in format_options:
+                try:
+                    ydl_opts = {
+                        'format': fmt,
+                        'outtmpl': output_template,
+                        'noplaylist': True,
+                        'quiet': True,
+                        'no_warnings': True,
+                        'nocheckcertificate': True,
+                        'retries': 3,
+                        'fragment_retries': 3,
+                    }
+                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                        info = ydl.extract_info(url, download=True)
+                        if not info:
+                            continue
+                        path = ydl.prepare_filename(info)
+                    
+                    if os.path.exists(path) and os.path.getsize(path) > 1024:
+                        logger.info(f"✅ Analysis media: {path} ({os.path.getsize(path)/1024/1024:.1f}MB)")
+                        return path
+                except yt_dlp.utils.DownloadError as e:
+                    logger.warning(f"Format '{fmt}' failed: {e}")
+                except Exception as e:
+                    logger.warning(f"Attempt {attempt+1} with format '{fmt}' failed: {e}")
+        
+        logger.error("Analysis media download failed")
+        return None
+    
+    def download_sections(self, url: str, ranges: List[Tuple[float, float]],
+                          output_paths: List[str], max_workers: int = 3) -> List[Optional[str]]:
+        """
+        Phase 2 of audio-first clipping: download only the chosen time ranges
+        at full quality (yt-dlp section download, cut on forced keyframes).
+        Returns: list aligned with ranges - output path or None per failed range
+        """
+        try:
+            import yt_dlp
+            from yt_dlp.utils import download_range_func
+        except ImportError:
+            logger.error("yt-dlp not installed. Install: pip install yt-dlp")
+            return [None] * len(ranges)
+        
+        ffmpeg = get_ffmpeg_exe()
+        
+        def fetch(item):
+            (start, end), output_path = item
+            base, _ = os.path.splitext(output_path)
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            ydl_opts = {
+                'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+                'outtmpl': base + ".%(ext)s",
+                'merge_output_format': 'mp4',
+                'download_ranges': download_range_func(None, [(float(start), float(end))]),
+                'force_keyframes_at_cuts': True,
+                'ffmpeg_location': ffmpeg,
+                'noplaylist': True,
+                'quiet': True,
+                'no_warnings': True,
+                'nocheckcertificate': True,
+                'retries': 3,
+                'fragment_retries': 3,
+                # Single-file fallbacks (webm...) are remuxed so the reported file is always .mp4
+                'postprocessors': [{'key': 'FFmpegVideoRemuxer', 'preferedformat': 'mp4'}],
+            }
+            try:
+                logger.info(f"✂️ Fetching range {start:.1f}s - {end:.1f}s")
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    info = ydl.extract_info(url, download=True)
+                
+                path = self._final_filepath(info)
+                if path and os.path.exists(path) and os.path.getsize(path) > 1024:
+                    if path != output_path:
+                        os.replace(path, output_path)
+                    logger.info(f"✅ Saved: {os.path.basename(output_path)}")
+                    return output_path
+                logger.warning(f"Range {start:.1f}s - {end:.1f}s produced no file")
+            except Exception as e:
+                logger.error(f"Range download failed ({start:.1f}s - {end:.1f}s): {e}")
+            return None
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            return list(pool.map(fetch, zip(ranges, output_paths)))
+    
+    @staticmethod
+    def _final_filepath(info: Optional[Dict]) -> Optional[str]:
+        """
+        Path of the finished (merged / remuxed) file yt-dlp reports for a download.
+        Intermediate streams (.fNNN.*, .part) are never returned, so leftovers
+        of a failed merge are not mistaken for the clip.
+        """
+        if not info:
+            return None
+        downloads = info.get('requested_downloads') or []
+        path = (downloads[-1].get('filepath') if downloads else None) or info.get('filepath')
+        if not path or path.endswith('.part') or re.search(r"\.f\d+\.\w+$", path):
+            return None
+        return path
+    
     def get_video_info(self, url: str) -> Optional[Dict]:
         """Get video metadata without downloading"""
         try:
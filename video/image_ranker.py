@@ -0,0 +1,188 @@
+"""
+Image Quality Ranker - fast pre-pass that picks the best candidate images
+Every candidate is decoded once at thumbnail scale (JPEG draft) and all of
+them are scored together as one NumPy stack: sharpness (Laplacian variance),
+exposure, text-overlay density (dense edge bands = banners / price stickers)
+and a near-duplicate penalty (dHash). Remote images are fetched concurrently
+(a small CDN variant when the host has one) and kept on disk, so the renderer
+does not download them a second time (utils.fetch_cache).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+from utils.fetch_cache import fetched_image_path, store_fetched_image
+from utils.image_hash import cluster_by_hash, dhash
+from utils.image_ingest import open_scaled
+from utils.logger import get_logger
+
+logger = get_logger()
+
+RANK_SIZE = 128           # Square analysis thumbnail side
+# Hosts with a small thumbnail variant (URL suffix) that is enough for scoring
+THUMBNAIL_VARIANTS = {
+    "susercontent.com": "_tn",   # Shopee CDN (~330 px)
+    "cf.shopee.": "_tn",
+}
+DUPLICATE_MAX_DISTANCE = 6  # dHash bits (of 64) for "same picture"
+TEXT_EDGE_THRESHOLD = 48    # Gray-level step counted as a hard edge (glyph stroke)
+
+# Weights of the normalized signals; text and duplicates are penalties
+WEIGHTS = {
+    'sharpness': 0.45,
+    'exposure': 0.35,
+    'resolution': 0.20,
+}
+TEXT_PENALTY = 0.5
+DUPLICATE_PENALTY = 1.0   # Duplicates rank after every distinct image
+
+def thumbnail_url(url: str) -> Optional[str]:
+    """Small variant of a CDN image good enough for scoring (None if the host has none)"""
+    for host, suffix in THUMBNAIL_VARIANTS.items():
+        if host in url:
+            base = url.split('@')[0].split('_tn')[0]
+            return base + suffix
+    return None
+
+
+class ImageQualityRanker:
+    """Score candidate images (paths or URLs) and select the best N"""
+
+    def __init__(self, max_workers: int = 8, session: requests.Session = None):
+        self.max_workers = max(1, max_workers)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=self.max_workers * 2)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def _localize(self, source: str) -> Optional[str]:
+        """
+        Local file to score a candidate from. Remote images are downloaded once
+        and kept; hosts with a thumbnail variant are scored from that instead of
+        the full-size image (a full copy already on disk is still preferred).
+        """
+        if not source:
+            return None
+        if source.startswith(("http://", "https://")):
+            path = fetched_image_path(source)
+            if os.path.exists(path):
+                return path
+            url = thumbnail_url(source) or source
+            path = fetched_image_path(url)
+            if os.path.exists(path):
+                return path
+            try:
+                resp = self.session.get(url, timeout=15)
+                resp.raise_for_status()
+                return store_fetched_image(url, resp.content)
+            except Exception as e:
+                logger.debug(f"Ranker fetch failed {url[:80]}: {type(e).__name__}")
+                return None
+        return source if os.path.exists(source) else None
+
+    @staticmethod
+    def _thumbnail(path: str):
+        """(gray RANK_SIZE² float32, original (w, h)) decoded at reduced scale"""
+        with Image.open(path) as probe:
+            size = probe.size
+        img = open_scaled(path, (RANK_SIZE * 2, RANK_SIZE * 2)).convert("L")
+        gray = np.asarray(img.resize((RANK_SIZE, RANK_SIZE), Image.BOX), dtype=np.float32)
+        return gray, size
+
+    def score(self, sources: List[str]) -> List[Dict]:
+        """
+        Quality signals for every candidate (same order as `sources`).
+        Returns: dicts with 'source', 'path' (local file or None), 'score'
+            (-inf if unreadable), the raw signals and 'duplicate_of' (index or None)
+        """
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, max(1, len(sources)))) as pool:
+            paths = list(pool.map(self._localize, sources))
+
+            def load(path):
+                if not path:
+                    return None
+                try:
+                    return self._thumbnail(path)
+                except Exception as e:
+                    logger.debug(f"Ranker cannot decode {path}: {e}")
+                    return None
+            thumbs = list(pool.map(load, paths))
+
+        results = [{'source': s, 'path': p, 'score': float('-inf'), 'duplicate_of': None}
+                   for s, p in zip(sources, paths)]
+        ok = [i for i, t in enumerate(thumbs) if t is not None]
+        if not ok:
+            return results
+
+        stack = np.stack([thumbs[i][0] for i in ok])                # (N, S, S)
+        sizes = np.array([thumbs[i][1] for i in ok], dtype=np.float32)
+
+        # Sharpness: variance of the 4-neighbour Laplacian, per image
+        c = stack[:, 1:-1, 1:-1]
+        lap = stack[:, :-2, 1:-1] + stack[:, 2:, 1:-1] + stack[:, 1:-1, :-2] + stack[:, 1:-1, 2:] - 4 * c
+        sharpness = lap.reshape(len(ok), -1).var(axis=1)
+
+        # Exposure: distance of mean from mid-gray, minus clipped highlights/shadows
+        mean = stack.reshape(len(ok), -1).mean(axis=1)
+        clipped = ((stack < 8) | (stack > 247)).reshape(len(ok), -1).mean(axis=1)
+        exposure = np.clip(1.0 - np.abs(mean - 125.0) / 125.0 - clipped, 0.0, 1.0)
+
+        # Text overlay: hard horizontal steps concentrated in horizontal bands
+        edges = np.abs(np.diff(stack, axis=2)) > TEXT_EDGE_THRESHOLD  # (N, S, S-1)
+        bands = edges.reshape(len(ok), 16, -1).mean(axis=2)           # 16 bands of S/16 rows
+        text_density = np.sort(bands, axis=1)[:, -3:].mean(axis=1)    # densest three bands
+
+        resolution = np.clip(sizes.min(axis=1) / 1080.0, 0.0, 1.0)
+
+        norm_sharp = np.clip(np.log1p(sharpness) / np.log1p(2000.0), 0.0, 1.0)
+        score = (WEIGHTS['sharpness'] * norm_sharp + WEIGHTS['exposure'] * exposure
+                 + WEIGHTS['resolution'] * resolution
+                 - TEXT_PENALTY * np.clip((text_density - 0.15) / 0.25, 0.0, 1.0))
+
+        owner = cluster_by_hash([dhash(Image.fromarray(stack[k].astype(np.uint8))) for k in range(len(ok))],
+                                DUPLICATE_MAX_DISTANCE)
+        for k, i in enumerate(ok):
+            dup = owner[k] != k
+            results[i].update({
+                'score': float(score[k] - (DUPLICATE_PENALTY if dup else 0.0)),
+                'sharpness': round(float(sharpness[k]), 2),
+                'exposure': round(float(exposure[k]), 3),
+                'text_density': round(float(text_density[k]), 3),
+                'resolution': [int(sizes[k][0]), int(sizes[k][1])],
+                'duplicate_of': ok[owner[k]] if dup else None,
+            })
+        return results
+
+    def select(self, sources: List[str], n: int) -> List[str]:
+        """
+        Best `n` candidates, kept in their original (scraped) order so the hero
+        image stays first. Remote winners are returned as local paths, except
+        ones scored from a thumbnail variant (the renderer fetches those in full).
+        Unreadable candidates are dropped; if nothing is readable the input is
+        returned truncated unchanged.
+        """
+        if n <= 0 or not sources:
+            return []
+        ranked = self.score(sources)
+        readable = [i for i, r in enumerate(ranked) if r['path'] and r['score'] != float('-inf')]
+        if not readable:
+            return list(sources[:n])
+        best = sorted(sorted(readable, key=lambda i: ranked[i]['score'], reverse=True)[:n])
+        dropped = len(sources) - len(best)
+        if dropped:
+            logger.info(f"🏅 Image ranking: kept {len(best)}/{len(sources)} "
+                        f"({sum(1 for r in ranked if r['duplicate_of'] is not None)} duplicates, "
+                        f"{len(sources) - len(readable)} unreadable)")
+        return [ranked[i]['path'] if ranked[i]['path'] != self._thumbnail_path(ranked[i]['source'])
+                else ranked[i]['source'] for i in best]
+
+    @staticmethod
+    def _thumbnail_path(source: str) -> Optional[str]:
+        small = thumbnail_url(source) if source.startswith(("http://", "https://")) else None
+        return fetched_image_path(small) if small else None
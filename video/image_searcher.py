@@ -1,32 +1,224 @@
 """Image Searcher - Download relevant images for video content"""
 import os
 import re
+import html
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote_plus, urlparse
 import requests
-from typing import List
-from urllib.parse import quote_plus
+from requests.adapters import HTTPAdapter
+import numpy as np
+from PIL import Image
+from utils.image_hash import hamming_distance, phash
+from utils.image_ingest import INGEST_MAX_SIDE, normalize_image_bytes
 from utils.logger import get_logger
 
 logger = get_logger()
 
+BING_SEARCH_URL = "https://www.bing.com/images/async"
+MAX_DOWNLOAD_WORKERS = 8
+PER_HOST_LIMIT = 2        # Concurrent requests per image host (be polite, avoid 429s)
+CANDIDATE_FACTOR = 3      # Result URLs fetched per wanted image (many hotlinks are dead)
+MIN_CANDIDATES = 8        # ...but never fewer than this (unused ones are cancelled)
+MIN_IMAGE_SIDE = 200      # Search results smaller than this are icons/thumbnails
+JOB_DIR_MAX_AGE = 24 * 3600  # Job folders of earlier runs are removed after this
+IMAGE_OUTPUT_DIR = os.getenv("IMAGE_OUTPUT_DIR", "assets/temp/web_story_images")  # Job folders live here
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "assets/temp/image_cache")
+IMAGE_CACHE_TTL = 7 * 24 * 3600           # Seconds before a cached query is searched again
+IMAGE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Oldest queries evicted beyond this
+DUPLICATE_MAX_DISTANCE = 8  # pHash bits (of 64) for "same picture" (resized/recompressed)
+SCENE_DEADLINE = 12.0       # Seconds for a whole acquire_scene_images() call before placeholders
+HEDGE_DELAY = 2.0           # Start the next source if the previous one has not answered by then
+PLACEHOLDER_TIMEOUT = 5.0   # Budget for fetching Picsum placeholders after the deadline
+PLACEHOLDER_SIZE = (1080, 1920)
+
+
+class ImageQueryCache:
+    """
+    Persistent normalized-query → image set cache.
+    Layout: <cache_dir>/index.json + <cache_dir>/<key>/<n>.jpg; entries expire
+    after `ttl` seconds and the oldest are evicted once `max_bytes` is exceeded.
+    """
+
+    def __init__(self, cache_dir: str = None, ttl: float = IMAGE_CACHE_TTL,
+                 max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir or IMAGE_CACHE_DIR
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = None
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Case/punctuation/whitespace-insensitive form of a query"""
+        return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+    def _key(self, source: str, query: str) -> str:
+        return hashlib.sha1(f"{source}:{self.normalize(query)}".encode("utf-8")).hexdigest()[:16]
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _load(self) -> Dict:
+        if self._index is None:
+            try:
+                with open(self._index_path(), 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{self._index_path()}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f, ensure_ascii=False)
+            os.replace(tmp, self._index_path())
+        except OSError as e:
+            logger.warning(f"Image cache write failed: {e}")
+
+    def _drop(self, key: str):
+        self._index.pop(key, None)
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+    def get(self, source: str, query: str) -> Optional[List[Dict]]:
+        """Cached images ({'path', 'phash'}) for a query, or None on miss/expiry"""
+        key = self._key(source, query)
+        with self._lock:
+            entry = self._load().get(key)
+            if not entry:
+                return None
+            if time.time() - entry['created'] > self.ttl:
+                self._drop(key)
+                self._save()
+                return None
+            items = [{'path': os.path.join(self.cache_dir, key, f['name']), 'phash': f['phash']}
+                     for f in entry['files']]
+        items = [it for it in items if os.path.exists(it['path'])]
+        return items or None
+
+    def put(self, source: str, query: str, images: List[Tuple[bytes, int]]):
+        """Store encoded images (data, phash) for a query, replacing the previous set"""
+        if not images:
+            return
+        key = self._key(source, query)
+        with self._lock:
+            index = self._load()
+            self._drop(key)
+            entry_dir = os.path.join(self.cache_dir, key)
+            try:
+                os.makedirs(entry_dir, exist_ok=True)
+                files = []
+                for n, (data, hash_value) in enumerate(images):
+                    name = f"{n}.jpg"
+                    with open(os.path.join(entry_dir, name), 'wb') as f:
+                        f.write(data)
+                    files.append({'name': name, 'phash': hash_value, 'bytes': len(data)})
+            except OSError as e:
+                logger.warning(f"Image cache write failed: {e}")
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                return
+            index[key] = {'query': self.normalize(query), 'source': source,
+                          'created': time.time(), 'files': files}
+            # Expired first, then oldest, until under the byte quota
+            now = time.time()
+            for old in [k for k, e in index.items() if now - e['created'] > self.ttl]:
+                self._drop(old)
+            total = sum(f['bytes'] for e in index.values() for f in e['files'])
+            for old in sorted(index, key=lambda k: index[k]['created']):
+                if total <= self.max_bytes or old == key:
+                    break
+                total -= sum(f['bytes'] for f in index[old]['files'])
+                self._drop(old)
+            self._save()
+
 
 class ImageSearcher:
     """Search and download images from multiple sources: Bing, Pexels, Picsum"""
     
-    def __init__(self, pexels_api_key: str = None):
+    def __init__(self, pexels_api_key: str = None, job_id: str = None,
+                 max_workers: int = MAX_DOWNLOAD_WORKERS, per_host: int = PER_HOST_LIMIT,
+                 cache: ImageQueryCache = None, use_cache: bool = True, dedupe: bool = True,
+                 max_side: int = INGEST_MAX_SIDE):
+        """
+        Args:
+            job_id: subfolder of output_dir this searcher writes into, so parallel
+                renders never read each other's image_{n}.jpg (default: unique per instance)
+            max_workers / per_host: download concurrency overall / per image host
+            cache / use_cache: persistent query → image set cache (repeat renders skip search)
+            dedupe: skip results that look like (pHash) an image already used by this
+                searcher, i.e. in the current video - use one searcher per video
+            max_side: canonical longest side of stored images (JPEGs within it are
+                kept byte-for-byte, larger ones are downscaled at decode time)
+        """
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         # Pexels API (optional, 200 requests/hour free)
         self.pexels_api_key = pexels_api_key or os.getenv("PEXELS_API_KEY")
+        self.job_id = job_id or f"job_{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        self.max_workers = max(1, max_workers)
+        self.per_host = max(1, per_host)
+        # One pooled session for search + downloads (keep-alive across images of a host)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=self.max_workers * 2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._host_slots: Dict[str, threading.Semaphore] = {}
+        # Shared by every pool this searcher starts (concurrent scene races included)
+        self._download_slots = threading.Semaphore(self.max_workers)
+        self._host_lock = threading.Lock()
+        self._pruned = set()
+        self.cache = (cache or ImageQueryCache()) if use_cache else None
+        self.dedupe = dedupe
+        self.max_side = max_side
+        self._used_hashes: List[int] = []  # pHashes of images already used in this video
+        self._used_lock = threading.Lock()
+        # Scene slots that already got their final file (placeholder); late race results are dropped
+        self._finalized = set()
+        self._slot_lock = threading.Lock()
+
+    def job_dir(self, output_dir: str) -> str:
+        """Per-job folder inside output_dir where this searcher's images are written"""
+        path = os.path.normpath(os.path.join(output_dir, self.job_id))
+        if output_dir not in self._pruned:
+            self._pruned.add(output_dir)
+            self._prune_old_jobs(output_dir)
+        return path
+
+    @staticmethod
+    def _prune_old_jobs(output_dir: str, max_age: float = JOB_DIR_MAX_AGE):
+        """Remove job folders of earlier runs (older than max_age seconds)"""
+        try:
+            entries = os.listdir(output_dir)
+        except OSError:
+            return
+        cutoff = time.time() - max_age
+        for name in entries:
+            path = os.path.join(output_dir, name)
+            try:
+                if name.startswith("job_") and os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
     
     def search_and_download(self, 
                           keyword: str, 
                           num_images: int = 5,
-                          output_dir: str = "assets/temp/web_story_images",
+                          output_dir: str = None,
                           referer: str = None,
                           start_index: int = 1) -> List[str]:
         """Search and download images - tries Bing first, then Pexels, finally placeholders"""
-        os.makedirs(output_dir, exist_ok=True)
+        output_dir = output_dir or IMAGE_OUTPUT_DIR
         logger.info(f"🔍 Searching images for: {keyword}")
         
         # Try Bing Images (primary, no API key needed)
@@ -36,97 +228,210 @@ class ImageSearcher:
         
         # Try Pexels API if available
         if self.pexels_api_key:
-            image_urls = self._search_pexels(keyword, num_images)
-            if image_urls:
-                downloaded = self._download_batch(image_urls, output_dir, start_index, referer)
-                if downloaded:
-                    return downloaded
+            downloaded = self._take(self._pexels_candidates(keyword, num_images, referer=referer),
+                                    num_images, output_dir, start_index)
+            if downloaded:
+                return downloaded
         
         # Fallback: Picsum placeholders
         logger.warning("⚠️ All sources failed, using placeholders")
         image_urls = [f"https://picsum.photos/1080/1920?random={i}" for i in range(start_index, start_index + num_images)]
         return self._download_batch(image_urls, output_dir, start_index, referer)
     
-    def search_google_images(self, query: str, num_images: int = 1, output_dir: str = "assets/temp/web_story_images", index: int = 1) -> List[str]:
+    def search_google_images(self, query: str, num_images: int = 1, output_dir: str = None, index: int = 1) -> List[str]:
         """Alias for Bing image download"""
-        return self._try_bing(query, num_images, output_dir, index) or []
+        return self._try_bing(query, num_images, output_dir or IMAGE_OUTPUT_DIR, index) or []
+
+    def acquire_scene_images(self, scenes: List[Dict], output_dir: str = None,
+                             start_index: int = 1, deadline: float = SCENE_DEADLINE,
+                             hedge_delay: float = HEDGE_DELAY) -> List[str]:
+        """
+        One image per scene, all scenes in parallel, sources hedged per scene.
+        Each scene starts with Bing on its query; if that has not produced an image
+        after `hedge_delay` s (or failed), the next source (Bing on the fallback
+        query, then Pexels) joins the race. The first usable result wins and the
+        stragglers are cancelled. Scenes without an image when the shared
+        `deadline` expires get a placeholder, so the worst case for N scenes is
+        one deadline (+ PLACEHOLDER_TIMEOUT), not N × sources × timeouts.
+        Args:
+            scenes: [{'query': str, 'fallback_query': str (optional)}, ...]
+            start_index: scene i is saved as image_{start_index + i}.jpg
+        Returns: one path per scene (same order)
+        """
+        if not scenes:
+            return []
+        output_dir = output_dir or IMAGE_OUTPUT_DIR
+        deadline_at = time.monotonic() + deadline
+        results: List[Optional[str]] = [None] * len(scenes)
+        pool = ThreadPoolExecutor(max_workers=min(32, len(scenes) * 3), thread_name_prefix="imgsrc")
+        scene_pool = ThreadPoolExecutor(max_workers=min(16, len(scenes)), thread_name_prefix="imgscene")
+        try:
+            futures = {scene_pool.submit(self._race_scene, scene, output_dir, start_index + i,
+                                         deadline_at, hedge_delay, pool): i
+                       for i, scene in enumerate(scenes)}
+            done, _ = wait(futures, timeout=max(0.0, deadline_at - time.monotonic()) + 1.0)
+            for future in done:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ Scene image search failed: {e}")
+        finally:
+            # Stragglers may still be downloading; nobody waits for them
+            scene_pool.shutdown(wait=False, cancel_futures=True)
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        missing = [i for i, path in enumerate(results) if not path]
+        if missing:
+            logger.warning(f"⚠️ {len(missing)}/{len(scenes)} scenes without image by the deadline, using placeholders")
+            # Before any placeholder is written: a straggler finishing now must not overwrite it
+            with self._slot_lock:
+                self._finalized.update(self._slot(output_dir, start_index + i) for i in missing)
+            for i, path in zip(missing, self._placeholders([start_index + i for i in missing], output_dir)):
+                results[i] = path
+        found = len(scenes) - len(missing)
+        logger.info(f"✅ Scene images: {found}/{len(scenes)} found, {len(missing)} placeholders")
+        return results
+
+    def _race_scene(self, scene: Dict, output_dir: str, index: int, deadline_at: float,
+                    hedge_delay: float, pool: ThreadPoolExecutor) -> Optional[str]:
+        """Hedged race of this scene's sources; returns the winning image path or None"""
+        query = (scene.get('query') or '').strip()
+        fallback = (scene.get('fallback_query') or '').strip()
+        cancel = threading.Event()
+        sources = []
+        if query:
+            sources.append(lambda: self._bing_candidates(query, 1, cancel=cancel))
+        if fallback and fallback != query:
+            sources.append(lambda: self._bing_candidates(fallback, 1, cancel=cancel))
+        if self.pexels_api_key and (fallback or query):
+            sources.append(lambda: self._pexels_candidates(fallback or query, 1, cancel=cancel))
+
+        pending = set()
+        launched = 0
+        next_launch = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline_at:
+                    return None
+                # Launch the next source when its hedge time comes or nothing is in flight
+                if launched < len(sources) and (now >= next_launch or not pending):
+                    pending.add(pool.submit(sources[launched]))
+                    launched += 1
+                    next_launch = now + hedge_delay
+                if not pending:
+                    return None
+                wake = deadline_at if launched >= len(sources) else min(deadline_at, next_launch)
+                done, pending = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+                for future in done:
+                    candidates = future.result() if not future.exception() else []
+                    if time.monotonic() >= deadline_at:
+                        return None  # Too late: the slot is about to get a placeholder
+                    paths = self._take(candidates, 1, output_dir, index)
+                    if paths:
+                        return paths[0]
+        finally:
+            cancel.set()
+            for future in pending:
+                future.cancel()
+
+    def _placeholders(self, indices: List[int], output_dir: str) -> List[str]:
+        """Picsum placeholders within PLACEHOLDER_TIMEOUT, locally generated ones otherwise"""
+        paths: List[Optional[str]] = [None] * len(indices)
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(indices)))
+        try:
+            futures = [pool.submit(self._fetch_valid, f"https://picsum.photos/1080/1920?random={idx}",
+                                   None, 1, PLACEHOLDER_TIMEOUT) for idx in indices]
+            done, _ = wait(futures, timeout=PLACEHOLDER_TIMEOUT)
+            for n, future in enumerate(futures):
+                candidate = future.result() if future in done and not future.exception() else None
+                if candidate:
+                    self._claim(candidate[1], force=True)
+                    paths[n] = self._save_image(candidate[0], output_dir, indices[n])
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return [path or self._local_placeholder(output_dir, idx) for path, idx in zip(paths, indices)]
+
+    def _local_placeholder(self, output_dir: str, index: int) -> Optional[str]:
+        """Offline placeholder: dark vertical gradient, varied per index"""
+        w, h = PLACEHOLDER_SIZE
+        hue = np.array([(index * 67) % 256, (index * 131) % 256, (index * 197) % 256], dtype=np.float32)
+        ramp = np.linspace(0.15, 0.55, h, dtype=np.float32)[:, None, None]
+        pixels = np.broadcast_to(ramp * hue, (h, w, 3)).astype(np.uint8)
+        buf = BytesIO()
+        Image.fromarray(pixels).save(buf, 'JPEG', quality=85)
+        return self._save_image(buf.getvalue(), output_dir, index)
     
     def _try_bing(self, query: str, num_images: int, output_dir: str, start_index: int) -> List[str]:
-        """Download images using Bing Image Downloader"""
+        """Bing Images: scrape result URLs, download candidates concurrently, keep the first valid ones"""
+        downloaded = self._take(self._bing_candidates(query, num_images), num_images, output_dir, start_index)
+        for path in downloaded:
+            logger.info(f"✅ Bing: {os.path.basename(path)}")
+        return downloaded
+
+    def _bing_candidates(self, query: str, needed: int,
+                         cancel: threading.Event = None) -> List[Tuple[bytes, int]]:
+        """Valid, not-yet-used Bing images for a query (cache first; shorter query on failure)"""
         try:
-            from bing_image_downloader import downloader
-            import shutil
-            
-            # Sanitize query to avoid invalid Windows path characters and overly long names
             safe_query = self._sanitize_query(query)
             logger.info(f"📸 Bing Images: {query}")
             if safe_query != query:
-                logger.info(f"   ↳ Sanitized for filesystem: {safe_query}")
-
-            downloader.download(
-                safe_query,
-                limit=num_images,
-                output_dir="dataset",
-                adult_filter_off=True,
-                force_replace=True,
-                timeout=15,
-                verbose=False,
-                filter=''
-            )
-            
-            # Find downloaded images
-            dataset_path = os.path.join("dataset", safe_query.replace(" ", "_"))
-            if not os.path.exists(dataset_path):
-                # Try finding folder by first word of sanitized query
-                first_word = safe_query.split()[0].lower() if safe_query.split() else ""
-                for folder in os.listdir("dataset") if os.path.exists("dataset") else []:
-                    if folder.lower().startswith(first_word):
-                        dataset_path = os.path.join("dataset", folder)
-                        break
-                # Fallback: pick most recently modified folder
-                if not os.path.exists(dataset_path) and os.path.exists("dataset"):
-                    try:
-                        folders = [os.path.join("dataset", f) for f in os.listdir("dataset")]
-                        folders = [f for f in folders if os.path.isdir(f)]
-                        if folders:
-                            latest = max(folders, key=lambda p: os.path.getmtime(p))
-                            dataset_path = latest
-                            logger.info(f"   ↳ Using latest dataset folder: {os.path.basename(latest)}")
-                    except Exception:
-                        pass
-            
-            if os.path.exists(dataset_path):
-                images = [f for f in os.listdir(dataset_path) if f.endswith(('.jpg', '.png', '.jpeg'))][:num_images]
-                if images:
-                    os.makedirs(output_dir, exist_ok=True)
-                    downloaded = []
-                    for idx, img_name in enumerate(images, start_index):
-                        src = os.path.join(dataset_path, img_name)
-                        dest = os.path.normpath(os.path.join(output_dir, f"image_{idx}.jpg"))
-                        shutil.copy2(src, dest)
-                        downloaded.append(dest)
-                        logger.info(f"✅ Bing: {os.path.basename(dest)}")
-                    return downloaded
+                logger.info(f"   ↳ Sanitized query: {safe_query}")
+
+            candidates = self._candidates(
+                "bing", safe_query,
+                lambda: self._search_bing_urls(safe_query, max(needed * CANDIDATE_FACTOR, MIN_CANDIDATES)),
+                needed, cancel=cancel)
+            if candidates:
+                return candidates
             
             # Retry with shorter query
-            if len(safe_query.split()) > 3:
+            if len(safe_query.split()) > 3 and not (cancel and cancel.is_set()):
                 short_query = ' '.join(safe_query.split()[:3])
                 logger.info(f"🔄 Retry with: {short_query}")
-                return self._try_bing(short_query, num_images, output_dir, start_index)
+                return self._bing_candidates(short_query, needed, cancel)
                 
-        except ImportError as e:
-            logger.warning(f"⚠️ Bing import failed: {e}")
         except Exception as e:
             logger.error(f"❌ Bing failed: {type(e).__name__}: {e}")
         
         return []
 
+    def _pexels_candidates(self, keyword: str, needed: int, referer: str = None,
+                           cancel: threading.Event = None) -> List[Tuple[bytes, int]]:
+        return self._candidates("pexels", keyword,
+                                lambda: self._search_pexels(keyword, needed * CANDIDATE_FACTOR),
+                                needed, referer, cancel)
+
+    def _search_bing_urls(self, query: str, count: int) -> List[str]:
+        """Full-size image URLs ('murl') from Bing's async image results page"""
+        if not query:
+            return []
+        try:
+            resp = self.session.get(
+                BING_SEARCH_URL,
+                params={'q': query, 'first': 0, 'count': max(count, 10), 'adlt': 'off', 'qft': ''},
+                timeout=10,
+            )
+            resp.raise_for_status()
+        except Exception as e:
+            logger.warning(f"⚠️ Bing search request failed: {type(e).__name__}")
+            return []
+        page = resp.text
+        found = re.findall(r'murl&quot;:&quot;(.*?)&quot;', page) or re.findall(r'"murl":"(.*?)"', page)
+        urls, seen = [], set()
+        for raw in found:
+            url = html.unescape(raw).replace('\\/', '/')
+            if url.startswith(('http://', 'https://')) and url not in seen:
+                seen.add(url)
+                urls.append(url)
+        return urls[:count]
+
     def _sanitize_query(self, query: str) -> str:
-        """Make query safe for Windows filesystem and Bing downloader.
+        r"""Make query safe for search URLs and log output.
         - Remove invalid path chars: <>:"/\|?*
         - Trim punctuation at ends
         - Collapse whitespace
-        - Limit to first 6 words to avoid very long folder names
+        - Limit to first 6 words (long queries return few results)
         """
         # Remove invalid filesystem characters
         safe = re.sub(r'[<>:"/\\|?*]+', ' ', query)
@@ -150,7 +455,7 @@ class ImageSearcher:
             }
             
             url = f"https://api.pexels.com/v1/search?query={quote_plus(keyword)}&per_page={num_images}&orientation=portrait"
-            resp = requests.get(url, headers=headers, timeout=10)
+            resp = self.session.get(url, headers=headers, timeout=10)
             resp.raise_for_status()
             
             data = resp.json()
@@ -164,37 +469,158 @@ class ImageSearcher:
             logger.warning(f"⚠️ Pexels failed: {e}")
             return []
     
-    def _download_batch(self, urls: List[str], output_dir: str, start_index: int, referer: str = None) -> List[str]:
-        """Download multiple images from URLs"""
-        downloaded = []
-        for idx, url in enumerate(urls, start_index):
+    def _candidates(self, source: str, query: str, search, needed: int, referer: str = None,
+                    cancel: threading.Event = None) -> List[Tuple[bytes, int]]:
+        """
+        Up to `needed` valid images (data, phash) for a query that are new to this
+        video. Served from the persistent cache; searches only on miss/shortfall.
+        Nothing is written to the job folder or claimed here (see _take), so
+        several sources can race for the same scene.
+        Args:
+            search: callable returning candidate URLs (only called on miss/shortfall)
+        """
+        cached = self.cache.get(source, query) if self.cache else None
+        picked: List[Tuple[bytes, int]] = []
+        previous: List[Tuple[bytes, int]] = []
+        for item in cached or []:
             try:
-                path = self._download_image(url, output_dir, idx, referer)
-                if path:
-                    downloaded.append(path)
-            except Exception as e:
-                logger.warning(f"⚠️ Download failed ({idx}): {e}")
+                with open(item['path'], 'rb') as f:
+                    previous.append((f.read(), item['phash']))
+            except OSError:
+                continue
+            if len(picked) < needed and not self._is_used(item['phash'], picked):
+                picked.append(previous[-1])
+        if cached:
+            logger.info(f"💾 Image cache ({source}): {len(picked)}/{needed} for '{query[:40]}'")
+        if len(picked) >= needed or (cancel and cancel.is_set()):
+            return picked
+
+        fetched: List[Tuple[bytes, int]] = []
+        urls = search() or []
+        picked += self._fetch_candidates(urls, needed - len(picked), referer,
+                                         collect=fetched, cancel=cancel)
+        if self.cache and fetched:
+            known = {h for _, h in previous}
+            self.cache.put(source, query, previous + [c for c in fetched if c[1] not in known])
+        return picked
+
+    def _take(self, candidates: List[Tuple[bytes, int]], needed: int, output_dir: str,
+              start_index: int) -> List[str]:
+        """Claim + write candidates as image_{start_index}, ... (skipping ones claimed meanwhile)"""
+        saved: List[str] = []
+        for data, hash_value in candidates:
+            if len(saved) >= needed:
+                break
+            index = start_index + len(saved)
+            with self._slot_lock:
+                if self._slot(output_dir, index) in self._finalized:
+                    logger.info(f"   ↳ Late result for image_{index} dropped (placeholder already used)")
+                    break
+                if not self._claim(hash_value):
+                    continue
+                path = self._save_image(data, output_dir, index)
+            if path:
+                saved.append(path)
+        return saved
+
+    @staticmethod
+    def _slot(output_dir: str, index: int) -> Tuple[str, int]:
+        return os.path.normpath(output_dir), index
+
+    def _is_used(self, hash_value: int, picked: List[Tuple[bytes, int]] = ()) -> bool:
+        """Duplicate of an image used in this video (or of one already picked alongside)?"""
+        if not self.dedupe:
+            return False
+        with self._used_lock:
+            hashes = self._used_hashes + [h for _, h in picked]
+        return any(hamming_distance(hash_value, h) <= DUPLICATE_MAX_DISTANCE for h in hashes)
+
+    def _claim(self, hash_value: int, force: bool = False) -> bool:
+        """Register an image as used in this video; False if it duplicates one already used"""
+        with self._used_lock:
+            if self.dedupe and not force and any(
+                    hamming_distance(hash_value, h) <= DUPLICATE_MAX_DISTANCE for h in self._used_hashes):
+                return False
+            self._used_hashes.append(hash_value)
+            return True
+    
+    def _download_batch(self, urls: List[str], output_dir: str, start_index: int, referer: str = None) -> List[str]:
+        """Download multiple images concurrently; url i is saved as image_{start_index + i}"""
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as pool:
+            futures = [pool.submit(self._download_image, url, output_dir, idx, referer)
+                       for idx, url in enumerate(urls, start_index)]
+            downloaded = [p for p in (f.result() for f in futures) if p]
         
         logger.info(f"✅ Downloaded {len(downloaded)}/{len(urls)} images")
         return downloaded
-    
-    def _download_image(self, url: str, output_dir: str, index: int, referer: str = None) -> str:
-        """Download and convert single image to JPEG"""
+
+    def _fetch_candidates(self, urls: List[str], needed: int, referer: str = None,
+                          collect: List[Tuple[bytes, int]] = None,
+                          cancel: threading.Event = None) -> List[Tuple[bytes, int]]:
+        """
+        Fetch candidate URLs concurrently and return the first `needed` valid images
+        that are not duplicates of ones already used in this video, in result-rank
+        order. Candidates not yet started once enough are found (or `cancel` is
+        set) are cancelled; in-flight downloads are not waited for.
+        Args:
+            collect: receives every valid (data, phash) seen, duplicates included
+        """
+        if not urls or needed <= 0:
+            return []
+        picked: List[Tuple[bytes, int]] = []
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls)))
         try:
-            # Skip invalid URLs
-            if not url or url.startswith(('data:', 'javascript:', 'about:')):
-                return None
-            
-            # Quick domain typo fix for known source
-            if 'quantrimang.comm' in url:
-                url = url.replace('quantrimang.comm', 'quantrimang.com')
-            
-            # Fetch image
-            headers = dict(self.headers)
-            if referer:
-                headers['Referer'] = referer
-            
-            resp = requests.get(url, headers=headers, timeout=20, allow_redirects=True)
+            futures = [pool.submit(self._fetch_valid, url, referer, MIN_IMAGE_SIDE) for url in urls]
+            for future in futures:
+                if len(picked) >= needed:
+                    break
+                while not (cancel and cancel.is_set()):
+                    done, _ = wait([future], timeout=0.25)
+                    if done:
+                        break
+                if cancel and cancel.is_set():
+                    break
+                candidate = future.result()
+                if candidate is None:
+                    continue
+                if collect is not None:
+                    collect.append(candidate)
+                if self._is_used(candidate[1], picked):
+                    logger.info("   ↳ Skipping duplicate of an image already in this video")
+                    continue
+                picked.append(candidate)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return picked
+
+    def _host_slot(self, url: str) -> threading.Semaphore:
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.Semaphore(self.per_host)
+        return slot
+
+    def _fetch_valid(self, url: str, referer: str = None, min_side: int = 1,
+                     timeout: float = 20) -> Optional[Tuple[bytes, int]]:
+        """
+        Download one URL and validate it in memory (decodable raster image, min size)
+        Returns: (JPEG bytes ready to write, pHash) or None
+        """
+        # Skip invalid URLs
+        if not url or url.startswith(('data:', 'javascript:', 'about:')):
+            return None
+        
+        # Quick domain typo fix for known source
+        if 'quantrimang.comm' in url:
+            url = url.replace('quantrimang.comm', 'quantrimang.com')
+        
+        headers = {'Referer': referer} if referer else None
+        try:
+            with self._host_slot(url), self._download_slots:
+                resp = self.session.get(url, headers=headers, timeout=(min(5, timeout), timeout), allow_redirects=True)
             resp.raise_for_status()
             
             # Validate Content-Type
@@ -207,35 +633,46 @@ class ImageSearcher:
                 logger.warning("⚠️ Skipping SVG image (unsupported by Pillow)")
                 return None
             
-            # Convert to JPEG
-            from PIL import Image
-            from io import BytesIO
-            
-            img = Image.open(BytesIO(resp.content))
-            
-            # Handle transparency (WebP, PNG, etc.)
-            if img.mode in ('RGBA', 'LA', 'P'):
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Save as JPEG
-            filename = f"image_{index}.jpg"
-            filepath = os.path.normpath(os.path.join(output_dir, filename))
-            os.makedirs(output_dir, exist_ok=True)
-            
-            img.save(filepath, 'JPEG', quality=90, optimize=True)
-            logger.info(f"✅ {filename} ({os.path.getsize(filepath)} bytes)")
-            return filepath
-            
+            img = Image.open(BytesIO(resp.content))  # Header only: size check before any decode
+            if min(img.size) < min_side:
+                logger.info(f"   ↳ Skipping small image {img.size[0]}x{img.size[1]}")
+                return None
+            # Decode now (truncated/corrupt files fail here, not at render time):
+            # conforming JPEGs pass through, the rest are downscaled at decode time
+            data, preview = normalize_image_bytes(resp.content, self.max_side)
+            return data, phash(preview)
         except Exception as e:
             logger.warning(f"⚠️ Failed to download {url}: {type(e).__name__}")
             return None
 
+    def _save_image(self, data: bytes, output_dir: str, index: int) -> Optional[str]:
+        """Write encoded image bytes once into this job's folder (atomic rename)"""
+        filename = f"image_{index}.jpg"
+        try:
+            job_dir = self.job_dir(output_dir)
+            os.makedirs(job_dir, exist_ok=True)
+            filepath = os.path.join(job_dir, filename)
+            tmp_path = f"{filepath}.{threading.get_ident()}.part"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, filepath)
+            logger.info(f"✅ {filename} ({len(data)} bytes)")
+            return filepath
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to save {filename}: {e}")
+            return None
+    
+    def _download_image(self, url: str, output_dir: str, index: int, referer: str = None) -> str:
+        """Download and normalize single image to JPEG (job folder, image_{index}.jpg)"""
+        candidate = self._fetch_valid(url, referer)
+        if candidate is None:
+            return None
+        data, hash_value = candidate
+        # Explicit downloads (article images, placeholders) are always kept, but
+        # registered so later searches avoid repeating them
+        self._claim(hash_value, force=True)
+        return self._save_image(data, output_dir, index)
+
 
 def extract_keywords(title: str, description: str, content: str) -> List[str]:
     """Extract keywords for image search (Vietnamese → English concept mapping)"""
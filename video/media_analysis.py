@@ -0,0 +1,283 @@
+"""
+Media Analysis Pass - single-decode, multi-signal analysis
+One ffmpeg process decodes the file once and emits 16 kHz mono PCM plus
+tiny downscaled grayscale frames at a reduced rate. Both streams are fanned
+out concurrently to the consumers: audio RMS series, shot boundaries and
+(optionally) Whisper ASR.
+"""
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from utils.helpers import get_ffmpeg_exe
+from utils.logger import get_logger
+from video.scene_detector import SHOT_SAMPLE_FPS, SHOT_FRAME_SIZE, FrameDiffTracker
+
+logger = get_logger()
+
+AUDIO_RATE = 16000  # Whisper's native rate
+# How PCM leaves ffmpeg alongside the frames: an inherited pipe fd (POSIX) or a
+# loopback TCP connection (Windows cannot hand extra fds to a child process)
+AUDIO_TRANSPORT = "pipe" if os.name == "posix" else "tcp"
+AUDIO_CONNECT_TIMEOUT = 30.0
+
+
+def probe_media(media_path: str) -> Dict:
+    """Stream layout + duration from ffmpeg's input banner (no decoding)"""
+    proc = subprocess.run(
+        [get_ffmpeg_exe(), "-hide_banner", "-i", media_path],
+        capture_output=True, text=True, errors="ignore", timeout=60,
+    )
+    info = proc.stderr
+    duration = None
+    m = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", info)
+    if m:
+        duration = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+    # Cover art (MP3/M4A thumbnails) is a video stream with the attached_pic disposition
+    video_streams = re.findall(r"^\s*Stream #\S+.*: Video:.*$", info, re.MULTILINE)
+    return {
+        'has_video': any("(attached pic)" not in line for line in video_streams),
+        'has_audio': re.search(r"Stream #\S+.*: Audio:", info) is not None,
+        'duration': duration,
+    }
+
+
+class _RMSConsumer:
+    """Audio RMS per 1-second chunk, computed while PCM streams in"""
+
+    def __init__(self, rate: int = AUDIO_RATE):
+        self.rate = rate
+        self.values: List[float] = []
+        self._carry = np.zeros(0, dtype=np.float32)
+
+    def feed(self, samples: np.ndarray):
+        buf = np.concatenate([self._carry, samples]) if self._carry.size else samples
+        n = len(buf) // self.rate
+        if n:
+            chunks = buf[:n * self.rate].reshape(n, self.rate)
+            self.values.extend(np.sqrt(np.mean(chunks ** 2, axis=1)).tolist())
+        self._carry = buf[n * self.rate:].copy()
+
+    def result(self) -> np.ndarray:
+        # Trailing partial second is dropped (same as the 1-second chunking before)
+        return np.array(self.values, dtype=np.float32)
+
+
+class _ASRConsumer:
+    """Whisper transcription; the model loads while the file is still decoding"""
+
+    def __init__(self, model_name: str, language: str = "vi"):
+        self.model_name = model_name
+        self.language = language
+        self.segments: Optional[List[Dict]] = None
+        self._model = None
+        self._load_thread = threading.Thread(target=self._load, daemon=True)
+        self._load_thread.start()
+
+    def _load(self):
+        try:
+            import whisper  # Optional dependency
+            logger.info(f"🧠 Loading Whisper ({self.model_name})...")
+            self._model = whisper.load_model(self.model_name)
+        except ImportError:
+            logger.warning("whisper not installed; run: pip install openai-whisper")
+        except Exception as e:
+            logger.error(f"Whisper load failed: {e}")
+
+    def transcribe(self, pcm: np.ndarray):
+        self._load_thread.join()
+        if self._model is None or pcm.size == 0:
+            return
+        try:
+            logger.info("🧠 Running Whisper for transcript...")
+            result = self._model.transcribe(pcm, language=self.language, word_timestamps=False)
+            self.segments = result.get("segments", []) or []
+        except Exception as e:
+            logger.error(f"Transcription error: {e}")
+
+
+class MediaAnalysisPass:
+    """Decode once with ffmpeg, fan out PCM + small gray frames to consumers"""
+
+    def __init__(self, sample_fps: float = SHOT_SAMPLE_FPS,
+                 frame_size: Tuple[int, int] = SHOT_FRAME_SIZE, shot_threshold: float = 27.0):
+        self.sample_fps = sample_fps
+        self.frame_size = frame_size
+        self.shot_threshold = shot_threshold
+
+    def run(self, media_path: str, rms: bool = True, shots: bool = True,
+            transcribe_model: Optional[str] = None) -> Dict:
+        """
+        Args:
+            rms / shots: compute the audio RMS series / shot boundaries
+            transcribe_model: Whisper model name, or None to skip ASR
+        Returns: dict with 'duration' and the requested signals
+            ('rms', 'shots', 'transcript_segments'; transcript is None if ASR unavailable)
+        """
+        probe = probe_media(media_path)
+        want_audio = probe['has_audio'] and (rms or transcribe_model)
+        want_frames = probe['has_video'] and shots
+        result: Dict = {'duration': probe['duration']}
+        if rms:
+            result['rms'] = np.zeros(0, dtype=np.float32)
+        if shots:
+            result['shots'] = []
+        if transcribe_model:
+            result['transcript_segments'] = None
+        if not want_audio and not want_frames:
+            if not probe['has_audio']:
+                logger.warning("No audio track")
+            return result
+
+        rms_consumer = _RMSConsumer() if rms and want_audio else None
+        asr = _ASRConsumer(transcribe_model) if transcribe_model and want_audio else None
+        pcm_parts: List[np.ndarray] = []
+        tracker = FrameDiffTracker(self.shot_threshold)
+        cuts: List[float] = []
+        samples_read = [0]
+
+        def on_audio(raw: bytes):
+            samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+            samples_read[0] += len(samples)
+            if rms_consumer:
+                rms_consumer.feed(samples)
+            if asr:
+                pcm_parts.append(samples)
+
+        w, h = self.frame_size
+        frame_index = [0]
+
+        def on_frame(raw: bytes):
+            gray = np.frombuffer(raw, dtype=np.uint8).reshape(h, w)
+            if tracker.push(gray):
+                cuts.append(frame_index[0] / self.sample_fps)
+            frame_index[0] += 1
+
+        logger.info("🎛️ Single-pass analysis (audio"
+                    f"{' + frames' if want_frames else ''}{' + ASR' if asr else ''})...")
+        self._decode(media_path, want_audio, want_frames, on_audio, on_frame)
+
+        if rms_consumer:
+            result['rms'] = rms_consumer.result()
+        if shots:
+            result['shots'] = cuts
+        if asr:
+            pcm = np.concatenate(pcm_parts) if pcm_parts else np.zeros(0, dtype=np.float32)
+            pcm_parts.clear()
+            asr.transcribe(pcm)
+            result['transcript_segments'] = asr.segments
+        if result['duration'] is None:
+            result['duration'] = samples_read[0] / AUDIO_RATE if samples_read[0] \
+                else frame_index[0] / self.sample_fps
+        return result
+
+    def _decode(self, media_path: str, want_audio: bool, want_frames: bool, on_audio, on_frame):
+        """
+        Run one ffmpeg process. Frames go to stdout; PCM goes to a second
+        channel (see AUDIO_TRANSPORT). Both are drained by reader threads while
+        ffmpeg decodes, on every platform.
+        """
+        w, h = self.frame_size
+        cmd = [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-nostdin", "-i", media_path]
+        audio_fd_r = audio_fd_w = None
+        server = None
+        if want_audio:
+            if AUDIO_TRANSPORT == "pipe":
+                audio_fd_r, audio_fd_w = os.pipe()
+                audio_target = f"pipe:{audio_fd_w}"
+            else:
+                server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                server.bind(("127.0.0.1", 0))
+                server.listen(1)
+                audio_target = f"tcp://127.0.0.1:{server.getsockname()[1]}"
+            cmd += ["-map", "0:a:0", "-ac", "1", "-ar", str(AUDIO_RATE), "-f", "s16le", "-y", audio_target]
+        if want_frames:
+            cmd += ["-map", "0:v:0",
+                    "-vf", f"fps={self.sample_fps},scale={w}:{h}:flags=area,format=gray",
+                    "-f", "rawvideo", "pipe:1"]
+
+        popen_kwargs = {'stdout': subprocess.PIPE if want_frames else subprocess.DEVNULL,
+                        'stderr': subprocess.PIPE, 'stdin': subprocess.DEVNULL}
+        if audio_fd_w is not None:
+            popen_kwargs['pass_fds'] = (audio_fd_w,)
+        try:
+            proc = subprocess.Popen(cmd, **popen_kwargs)
+        except Exception:
+            if server is not None:
+                server.close()
+            raise
+        if audio_fd_w is not None:
+            os.close(audio_fd_w)
+
+        stderr_chunks: List[bytes] = []
+        threads = [threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)]
+        if audio_fd_r is not None:
+            threads.append(threading.Thread(
+                target=self._pump, args=(os.fdopen(audio_fd_r, "rb"), AUDIO_RATE * 2, on_audio), daemon=True))
+        if server is not None:
+            threads.append(threading.Thread(
+                target=self._pump_socket, args=(server, proc, AUDIO_RATE * 2, on_audio), daemon=True))
+        if want_frames:
+            threads.append(threading.Thread(
+                target=self._pump, args=(proc.stdout, w * h, on_frame, True), daemon=True))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        proc.wait()
+
+        if proc.returncode != 0:
+            err = b"".join(c for c in stderr_chunks if c).decode(errors="ignore").strip()
+            logger.warning(f"ffmpeg analysis exited with {proc.returncode}: {err[:300]}")
+
+    @classmethod
+    def _pump_socket(cls, server: socket.socket, proc: subprocess.Popen, chunk_bytes: int, callback):
+        """Accept ffmpeg's PCM connection and stream it like a pipe"""
+        conn = None
+        try:
+            server.settimeout(0.5)
+            deadline = time.monotonic() + AUDIO_CONNECT_TIMEOUT
+            while conn is None:
+                exited = proc.poll() is not None  # checked first: a finished ffmpeg's connection is already queued
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    # ffmpeg exited without connecting (or never did): nothing to read
+                    if exited or time.monotonic() > deadline:
+                        return
+            conn.settimeout(None)
+            cls._pump(conn.makefile("rb"), chunk_bytes, callback)
+        finally:
+            if conn is not None:
+                conn.close()
+            server.close()
+
+    @staticmethod
+    def _pump(stream, chunk_bytes: int, callback, exact: bool = False):
+        """Read fixed-size chunks until EOF; exact=True drops a trailing partial chunk"""
+        with stream:
+            while True:
+                data = stream.read(chunk_bytes)
+                if not data:
+                    break
+                if len(data) < chunk_bytes:
+                    # Pipes may return short reads; top up to a full chunk
+                    rest = [data]
+                    got = len(data)
+                    while got < chunk_bytes:
+                        more = stream.read(chunk_bytes - got)
+                        if not more:
+                            break
+                        rest.append(more)
+                        got += len(more)
+                    data = b"".join(rest)
+                    if len(data) < chunk_bytes and exact:
+                        break
+                if len(data) % 2 and not exact:
+                    data = data[:-1]
+                if data:
+                    callback(data)
@@ -1,7 +1,6 @@
 import os
 import tempfile
 import textwrap
-from io import BytesIO
 import random
 import math
 
@@ -16,6 +15,9 @@ from moviepy.editor import (
     vfx,
 )
 
+from utils.fetch_cache import fetched_image_path
+from utils.image_ingest import open_scaled
+from video.image_ranker import ImageQualityRanker
 from utils.logger import get_logger
 from video.ai_providers import (
     GTTSProvider,
@@ -158,8 +160,8 @@ class SmartVideoRenderer:
         
         # Use ALL available images (don't limit to 5)
         images = data.get("image_urls", [])
-        if max_images:
-            images = images[:max_images]
+        if max_images and len(images) > max_images:
+            images = self._rank_images(images, max_images)
 
         logger.info("🎤 Render video: %s", title)
         logger.info("📸 Images available: %d - %s", len(images), images[:3] if images else "no images")
@@ -192,30 +194,23 @@ class SmartVideoRenderer:
             # If GUI locked images, don't auto-augment (avoid mismatched re-downloads)
             images_locked = data.get("images_locked", False)
             if script and len(images) < len(script) and not images_locked:
-                from video.image_searcher import ImageSearcher, extract_keywords
+                from video.image_searcher import IMAGE_OUTPUT_DIR, ImageSearcher, extract_keywords
                 searcher = ImageSearcher()
                 needed = len(script) - len(images)
                 logger.info(f"🔍 Need {needed} more images to match scenes, auto-searching...")
+                # All missing scenes at once: Bing on scene text, hedged with concept
+                # keywords / Pexels, placeholder for whatever misses the deadline
+                scenes = []
                 for scene_idx in range(len(images) + 1, len(script) + 1):
                     text = script[scene_idx - 1]
-                    query = " ".join(text.split()[:15])
-                    # Try Google/Bing image for the scene
-                    paths = searcher.search_google_images(query, num_images=1, output_dir="assets/temp/web_story_images", index=scene_idx)
-                    if paths:
-                        images.extend(paths)
-                        continue
-                    # Fallback with concept keywords
                     keywords = extract_keywords(title, desc, text)
-                    keyword_str = " ".join(keywords[:2])
-                    paths = searcher.search_and_download(keyword_str, num_images=1, output_dir="assets/temp/web_story_images", start_index=scene_idx)
-                    if paths:
-                        images.extend(paths)
-                        continue
-                    # Final placeholder
-                    placeholder = [f"https://picsum.photos/1080/1920?random={scene_idx}"]
-                    paths = searcher._download_batch(placeholder, "assets/temp/web_story_images", scene_idx)
-                    if paths:
-                        images.extend(paths)
+                    scenes.append({
+                        'query': " ".join(text.split()[:15]),
+                        'fallback_query': " ".join(keywords[:2]),
+                    })
+                paths = searcher.acquire_scene_images(scenes, output_dir=IMAGE_OUTPUT_DIR,
+                                                      start_index=len(images) + 1)
+                images.extend(p for p in paths if p)
                 logger.info(f"✅ Images prepared: {len(images)} for {len(script)} scenes")
         except Exception as e:
             logger.warning(f"⚠️ Auto image augmentation failed: {e}")
@@ -228,7 +223,9 @@ class SmartVideoRenderer:
         total_duration = 0  # Track actual duration
 
         try:
-            # Ensure images align one-to-one with scenes
+            # Ensure images align one-to-one with scenes (best N by quality unless GUI locked them)
+            if images and len(images) > len(script) and not data.get("images_locked", False):
+                images = self._rank_images(images, len(script))
             if images and len(images) >= len(script):
                 images = images[:len(script)]
 
@@ -544,23 +541,38 @@ class SmartVideoRenderer:
             s = str(url).strip()
             # URL first: never treat as local path (tránh lỗi os.path.join(cwd, url) với ảnh Shopee)
             if s.startswith("http://") or s.startswith("https://"):
+                cached = fetched_image_path(s)
+                if os.path.exists(cached):  # Already downloaded by the ranker / scraper probe
+                    return open_scaled(cached, self._image_box())
                 logger.info(f"🌐 Downloading image: {s[:80]}...")
                 r = requests.get(s, timeout=15)
                 r.raise_for_status()
-                return Image.open(BytesIO(r.content)).convert("RGB")
+                return open_scaled(r.content, self._image_box())
             # Local path
             filepath = s
             if not os.path.isabs(filepath) and not os.path.exists(filepath):
                 filepath = os.path.join(os.getcwd(), s)
             if os.path.exists(filepath):
                 logger.info(f"📁 Loading local image: {os.path.basename(filepath)}")
-                return Image.open(filepath).convert("RGB")
+                return open_scaled(filepath, self._image_box())
             logger.warning(f"⚠️ Image file not found: {filepath}")
             return None
         except Exception as e:
             logger.warning(f"⚠️ Failed to load image: {e}")
             return None
 
+    def _rank_images(self, images, n):
+        """Best n images by quality (sharpness, exposure, text overlay, duplicates); order kept"""
+        try:
+            return ImageQualityRanker().select(images, n)
+        except Exception as e:
+            logger.warning(f"⚠️ Image ranking failed: {e}, using scraped order")
+            return images[:n]
+
+    def _image_box(self):
+        """Largest size a loaded image is ever shown at (JPEGs decode directly to it)"""
+        return self.template["width"], self.template["height"]
+
     def text_image(self, text):
         w, h = self.template["width"], self.template["height"]
         img = Image.new("RGB", (w, h), (30, 30, 30))
@@ -1,25 +1,103 @@
 """Scene Analysis - Analyze scene content using AI Vision"""
 import os
+import io
 import json
+import time
+import random
 import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict
+import numpy as np
+from PIL import Image
+from utils.image_hash import cluster_by_hash, dhash
 from utils.logger import get_logger
+from video.scene_scoring import LocalSceneScorer
 
 logger = get_logger()
 
+VISION_MAX_SIDE = 1024   # Beyond this the vision model downsamples anyway
+VISION_JPEG_QUALITY = 85
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+VISION_CACHE_PATH = os.getenv("VISION_CACHE_PATH", "assets/temp/vision_cache.json")
+VISION_CACHE_MAX_ENTRIES = 5000
+DUPLICATE_MAX_DISTANCE = 6  # dHash bits (of 64) for "same shot" frames
+
+
+class VisionCache:
+    """Persistent frame-hash → analysis cache (JSON file, oldest entries evicted first)"""
+
+    def __init__(self, path: str = None, max_entries: int = VISION_CACHE_MAX_ENTRIES):
+        self.path = path or VISION_CACHE_PATH
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self) -> Dict:
+        if self._data is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._load().get(key)
+        return dict(value) if value else None
+
+    def put_many(self, items: Dict[str, Dict]):
+        if not items:
+            return
+        with self._lock:
+            data = self._load()
+            data.update(items)
+            while len(data) > self.max_entries:
+                data.pop(next(iter(data)))
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp = self.path + ".tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logger.warning(f"Vision cache write failed: {e}")
+
 
 class SceneAnalyzer:
     """Analyze scenes using Vision AI (OpenAI GPT-4V)"""
     
-    def __init__(self, api_key: str = None, model: str = "gpt-4-vision-preview"):
+    def __init__(self, api_key: str = None, model: str = "gpt-4-vision-preview",
+                 max_concurrency: int = 4, max_retries: int = 4, max_image_side: int = VISION_MAX_SIDE,
+                 dedupe: bool = True, cache: VisionCache = None,
+                 batch_size: int = 0, batch_layout: str = "images"):
         """
         Initialize scene analyzer
         Args:
             api_key: OpenAI API key
             model: Vision model to use
+            max_concurrency: vision requests in flight at once
+            max_retries: retries on rate limit / transient errors (exponential backoff)
+            max_image_side: frames are downscaled to this before base64 encoding
+            dedupe: analyze one frame per near-duplicate (dHash) cluster and reuse
+                    results from the persistent hash → analysis cache
+            batch_size: >1 analyzes up to this many frames per request and asks for a
+                        JSON array (tiles that fail validation fall back to single calls)
+            batch_layout: "images" (several labeled image blocks in one message) or
+                          "collage" (one labeled grid image)
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.max_image_side = max_image_side
+        self.dedupe = dedupe
+        self.batch_size = batch_size
+        self.batch_layout = batch_layout
+        self.local_scorer = LocalSceneScorer()
+        self.cache = cache or (VisionCache() if dedupe else None)
         self.client = None
         
         if self.api_key:
@@ -30,24 +108,25 @@ class SceneAnalyzer:
             except ImportError:
                 logger.warning("OpenAI package not installed. Install with: pip install openai")
     
-    def analyze_scene(self, frame_path: str, scene_num: int, context: str = "") -> Dict:
+    def analyze_scene(self, frame_path: str, scene_num: int, context: str = "",
+                      scene: Dict = None) -> Dict:
         """
         Analyze single scene frame using AI Vision
         Args:
             frame_path: Path to frame image
             scene_num: Scene number
             context: Additional context (movie title, plot summary)
+            scene: detector record (motion_energy...) for the local fallback scorer
         Returns:
             Dict with analysis results
         """
         if not self.client:
             logger.warning("OpenAI client not available. Using fallback.")
-            return self._fallback_analysis(frame_path, scene_num)
+            return self._fallback_analysis(frame_path, scene_num, scene)
         
         try:
-            # Encode image to base64
-            with open(frame_path, "rb") as f:
-                image_data = base64.standard_b64encode(f.read()).decode("utf-8")
+            # Encode (downscaled) image to base64
+            image_data = self._encode_frame(frame_path)
             
             # Create prompt
             prompt = f"""Analyze this movie scene frame #{scene_num}.
@@ -68,34 +147,12 @@ Format as JSON:
     "relevance_score": 0.0-1.0
 }}"""
             
-            # Call API
-            response = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",  # Using Claude instead for better vision
-                max_tokens=500,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": image_data,
-                                },
-                            },
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ],
-                    }
-                ],
+            # Call API (retries rate limits / transient errors with backoff)
+            result_text = self._vision_request(
+                [self._image_block(image_data), {"type": "text", "text": prompt}],
+                max_tokens=500, label=f"Scene {scene_num}",
             )
             
-            # Parse response
-            result_text = response.content[0].text
-            
             # Extract JSON from response
             import json
             try:
@@ -117,7 +174,7 @@ Format as JSON:
         
         except Exception as e:
             logger.warning(f"Vision API error: {e}. Using fallback.")
-            return self._fallback_analysis(frame_path, scene_num)
+            return self._fallback_analysis(frame_path, scene_num, scene)
     
     def analyze_scenes(self, scenes: List[Dict], movie_title: str = "", 
                       movie_plot: str = "") -> List[Dict]:
@@ -134,22 +191,285 @@ Format as JSON:
         if movie_plot:
             context += f"\nPlot: {movie_plot[:200]}..."
         
+        todo = []
         for i, scene in enumerate(scenes):
             if 'frame_path' not in scene or not os.path.exists(scene['frame_path']):
                 logger.warning(f"Scene {i} frame not found, skipping")
                 continue
-            
-            logger.info(f"🔍 Analyzing scene {i+1}/{len(scenes)}...")
-            
-            analysis = self.analyze_scene(scene['frame_path'], i, context)
-            scene['analysis'] = analysis
-            scene['analyzed'] = True
+            todo.append(i)
+        if not todo:
+            return scenes
+        
+        owner = {i: i for i in todo}
+        keys: Dict[int, str] = {}
+        results: Dict[int, Dict] = {}
+        if self.dedupe:
+            owner, keys = self._dedupe(scenes, todo, context)
+            for i in set(owner.values()):
+                cached = self.cache.get(keys[i]) if self.cache and i in keys else None
+                if cached:
+                    results[i] = cached
+        pending = [i for i in sorted(set(owner.values())) if i not in results]
+        if pending and not self.client:
+            # Offline: local CV scoring (milliseconds per scene, no network)
+            logger.info(f"🖥️ No vision API - local scoring for {len(pending)} scenes")
+            for i in pending:
+                results[i] = self._fallback_analysis(scenes[i]['frame_path'], i, scenes[i])
+            pending = []
+        if self.dedupe:
+            logger.info(f"🧬 {len(todo)} frames → {len(set(owner.values()))} unique, "
+                        f"{len(set(owner.values())) - len(pending)} cached, {len(pending)} to analyze")
+        
+        # Requests run concurrently (bounded); results are merged back in scene order
+        if pending:
+            logger.info(f"🔍 Analyzing {len(pending)} scenes ({min(self.max_concurrency, len(pending))} at a time)...")
+            if self.batch_size > 1 and self.client:
+                # Several frames per round trip; each job returns {scene idx: analysis}
+                jobs = [pending[k:k + self.batch_size] for k in range(0, len(pending), self.batch_size)]
+                work = lambda group: self._analyze_batch(scenes, group, context)
+            else:
+                jobs = [[i] for i in pending]
+                work = lambda group: {group[0]: self.analyze_scene(
+                    scenes[group[0]]['frame_path'], group[0], context, scenes[group[0]])}
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(jobs))) as pool:
+                futures = {pool.submit(work, group): group for group in jobs}
+                done = 0
+                for future in as_completed(futures):
+                    group = futures[future]
+                    try:
+                        results.update(future.result())
+                    except Exception as e:
+                        logger.warning(f"Scenes {group} analysis failed: {e}")
+                        for i in group:
+                            results[i] = self._fallback_analysis(scenes[i]['frame_path'], i, scenes[i])
+                    done += len(group)
+                    logger.info(f"  {done}/{len(pending)} scenes analyzed")
+            if self.cache and keys:
+                # Only real model output is cached, never fallbacks
+                self.cache.put_many({keys[i]: results[i] for i in pending
+                                     if i in keys and not results[i].get('fallback')})
+        
+        for i in todo:
+            scenes[i]['analysis'] = dict(results[owner[i]])
+            scenes[i]['analyzed'] = True
+            if owner[i] != i:
+                scenes[i]['duplicate_of'] = owner[i]
         
         return scenes
+
+    def _dedupe(self, scenes: List[Dict], todo: List[int], context: str):
+        """
+        dHash every frame, cluster near-duplicates.
+        Returns: (owner: scene idx → representative idx, keys: idx → cache key)
+        """
+        hashes = {}
+        for i in todo:
+            try:
+                hashes[i] = dhash(scenes[i]['frame_path'])
+            except Exception as e:
+                logger.warning(f"Cannot hash scene {i} frame: {e}")
+        hashed = [i for i in todo if i in hashes]
+        clusters = cluster_by_hash([hashes[i] for i in hashed], DUPLICATE_MAX_DISTANCE)
+        owner = {i: i for i in todo}
+        for pos, i in enumerate(hashed):
+            owner[i] = hashed[clusters[pos]]
+        # Analysis text depends on the prompt context, so it is part of the key
+        ctx = hashlib.sha1(f"{context}|{self.max_image_side}".encode("utf-8")).hexdigest()[:10]
+        keys = {i: f"{hashes[i]:016x}:{ctx}" for i in hashed}
+        return owner, keys
+
+    def _analyze_batch(self, scenes: List[Dict], group: List[int], context: str) -> Dict[int, Dict]:
+        """
+        One vision request for several scenes, answered as a JSON array.
+        Tiles missing or invalid in the response are retried as single-frame calls.
+        """
+        labels = list(range(1, len(group) + 1))
+        if self.batch_layout == "collage":
+            content = [
+                self._image_block(self._encode_collage([scenes[i]['frame_path'] for i in group], labels)),
+                {"type": "text", "text": f"The image is a grid of {len(group)} movie frames; "
+                                         f"each tile is labeled with its number (1-{len(group)})."},
+            ]
+        else:
+            content = []
+            for label, i in zip(labels, group):
+                content.append({"type": "text", "text": f"Frame {label}:"})
+                content.append(self._image_block(self._encode_frame(scenes[i]['frame_path'])))
+        content.append({"type": "text", "text": f"""For EACH numbered frame, write a brief movie review analysis.
+Review script (~30-50 words): describe what's happening visually, highlight the key action/emotion, keep it engaging.
+
+Context: {context}
+
+Return ONLY a JSON array with exactly {len(group)} objects, one per frame:
+[
+  {{
+    "frame": 1,
+    "scene_description": "What is happening visually",
+    "key_elements": ["element1", "element2", "element3"],
+    "emotional_tone": "tone description",
+    "review_script": "Engaging narration for this scene (30-50 words)",
+    "relevance_score": 0.0-1.0
+  }}
+]"""})
+
+        parsed: Dict[int, Dict] = {}
+        try:
+            text = self._vision_request(content, max_tokens=350 * len(group) + 100,
+                                        label=f"Scenes {group[0]}-{group[-1]}")
+            parsed = self._parse_batch(text, len(group))
+        except Exception as e:
+            logger.warning(f"Batch vision request failed: {e}")
+
+        results: Dict[int, Dict] = {}
+        for label, i in zip(labels, group):
+            if label in parsed:
+                results[i] = parsed[label]
+            else:
+                logger.info(f"  ↩️ Scene {i}: no valid batch result, single-frame call")
+                results[i] = self.analyze_scene(scenes[i]['frame_path'], i, context, scenes[i])
+        logger.info(f"  ✅ Batch of {len(group)} scenes: {len(parsed)} from one request")
+        return results
+
+    @staticmethod
+    def _parse_batch(text: str, count: int) -> Dict[int, Dict]:
+        """JSON array → {frame label: validated analysis}; invalid items are dropped"""
+        start, end = text.find('['), text.rfind(']') + 1
+        if start < 0 or end <= start:
+            return {}
+        try:
+            items = json.loads(text[start:end])
+        except ValueError:
+            return {}
+        if not isinstance(items, list):
+            return {}
+        parsed: Dict[int, Dict] = {}
+        for pos, item in enumerate(items, 1):
+            if not isinstance(item, dict):
+                continue
+            try:
+                label = int(item.get("frame", pos))
+            except (TypeError, ValueError):
+                continue
+            script = item.get("review_script")
+            if not (1 <= label <= count) or not isinstance(script, str) or not script.strip():
+                continue
+            try:
+                score = min(1.0, max(0.0, float(item.get("relevance_score", 0.5))))
+            except (TypeError, ValueError):
+                score = 0.5
+            parsed[label] = {
+                "scene_description": str(item.get("scene_description", ""))[:500],
+                "key_elements": [str(x) for x in item.get("key_elements", []) if isinstance(x, (str, int, float))],
+                "emotional_tone": str(item.get("emotional_tone", "unknown")),
+                "review_script": script.strip(),
+                "relevance_score": score,
+            }
+        return parsed
+
+    def _encode_collage(self, frame_paths: List[str], labels: List[int], tile_width: int = 512) -> str:
+        """Labeled grid of downscaled frames as base64 JPEG (fits max_image_side-ish per tile)"""
+        from PIL import ImageDraw, ImageFont
+        cols = int(np.ceil(np.sqrt(len(frame_paths))))
+        rows = int(np.ceil(len(frame_paths) / cols))
+        tile_w = min(tile_width, max(64, (self.max_image_side * 3 // 2) // cols))
+        tile_h = tile_w * 9 // 16
+        sheet = Image.new("RGB", (cols * tile_w, rows * tile_h), (0, 0, 0))
+        draw = ImageDraw.Draw(sheet)
+        try:
+            font = ImageFont.load_default(size=max(14, tile_h // 6))
+        except TypeError:
+            font = ImageFont.load_default()
+        for n, (path, label) in enumerate(zip(frame_paths, labels)):
+            x, y = (n % cols) * tile_w, (n // cols) * tile_h
+            with Image.open(path) as img:
+                img.draft("RGB", (tile_w, tile_h))
+                img = img.convert("RGB")
+                img.thumbnail((tile_w, tile_h), Image.LANCZOS)
+                sheet.paste(img, (x + (tile_w - img.width) // 2, y + (tile_h - img.height) // 2))
+            box = draw.textbbox((x + 6, y + 4), str(label), font=font)
+            draw.rectangle((box[0] - 4, box[1] - 3, box[2] + 4, box[3] + 3), fill=(255, 215, 0))
+            draw.text((x + 6, y + 4), str(label), fill=(0, 0, 0), font=font)
+        buf = io.BytesIO()
+        sheet.save(buf, format="JPEG", quality=VISION_JPEG_QUALITY)
+        return base64.standard_b64encode(buf.getvalue()).decode("utf-8")
+
+    @staticmethod
+    def _image_block(image_data: str) -> Dict:
+        return {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": "image/jpeg",
+                "data": image_data,
+            },
+        }
+
+    def _vision_request(self, content: List[Dict], max_tokens: int, label: str) -> str:
+        """Send one vision message (with retries) and return the response text"""
+        response = self._with_retries(lambda: self.client.messages.create(
+            model="claude-3-5-sonnet-20241022",  # Using Claude instead for better vision
+            max_tokens=max_tokens,
+            messages=[
+                {
+                    "role": "user",
+                    "content": content,
+                }
+            ],
+        ), label)
+        return response.content[0].text
+
+    def _encode_frame(self, frame_path: str) -> str:
+        """Base64 JPEG of the frame, downscaled to max_image_side (decode-time reduction for JPEGs)"""
+        with Image.open(frame_path) as img:
+            if img.format == "JPEG" and max(img.size) <= self.max_image_side:
+                # Already small enough: send the original bytes
+                with open(frame_path, "rb") as f:
+                    return base64.standard_b64encode(f.read()).decode("utf-8")
+            target = (self.max_image_side, self.max_image_side)
+            if img.format == "JPEG":
+                img.draft("RGB", target)
+            img = img.convert("RGB")
+            img.thumbnail(target, Image.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, format="JPEG", quality=VISION_JPEG_QUALITY)
+        return base64.standard_b64encode(buf.getvalue()).decode("utf-8")
+
+    def _with_retries(self, call, label: str):
+        """Run call(); retry rate-limit / transient errors with exponential backoff + jitter"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call()
+            except Exception as e:
+                status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+                retryable = status in RETRYABLE_STATUS or "RateLimit" in type(e).__name__ \
+                    or "Timeout" in type(e).__name__ or "Connection" in type(e).__name__
+                if not retryable or attempt == self.max_retries:
+                    raise
+                delay = self._retry_after(e) or min(30.0, 2 ** attempt) + random.uniform(0, 0.5)
+                logger.warning(f"  ⏳ {label}: {type(e).__name__} ({status}), retry in {delay:.1f}s")
+                time.sleep(delay)
+
+    @staticmethod
+    def _retry_after(error: Exception):
+        """Server-suggested wait (Retry-After header), if any"""
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        try:
+            return float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
     
-    def _fallback_analysis(self, frame_path: str, scene_num: int) -> Dict:
-        """Fallback analysis when API unavailable"""
+    def _fallback_analysis(self, frame_path: str, scene_num: int, scene: Dict = None) -> Dict:
+        """Fallback analysis when API unavailable: local CV scoring, constant text as last resort"""
+        try:
+            local = self.local_scorer.analyze(frame_path, scene_num, scene)
+        except Exception as e:
+            logger.warning(f"Local scoring failed for scene {scene_num}: {e}")
+            local = None
+        if local:
+            local["fallback"] = True
+            return local
         return {
+            "fallback": True,
             "scene_description": f"Scene {scene_num} from the movie",
             "review_script": f"This pivotal moment shows the progression of the story.",
             "key_elements": ["action", "character", "emotion"],
@@ -157,6 +477,24 @@ Format as JSON:
             "relevance_score": 0.7
         }
     
+    @staticmethod
+    def select_best_scenes(scenes: List[Dict], count: int) -> List[Dict]:
+        """
+        Keep the `count` analyzed scenes with the highest relevance_score
+        (near-duplicates of another scene rank last), restored to time order
+        """
+        if len(scenes) <= count:
+            return scenes
+        ranked = sorted(
+            range(len(scenes)),
+            key=lambda i: (scenes[i].get('duplicate_of') is None,
+                           float(scenes[i].get('analysis', {}).get('relevance_score', 0.0) or 0.0)),
+            reverse=True,
+        )
+        keep = sorted(ranked[:count], key=lambda i: (scenes[i].get('start', 0.0), i))
+        logger.info(f"🏅 Kept {count}/{len(scenes)} scenes by relevance")
+        return [scenes[i] for i in keep]
+
     def generate_review_script(self, scenes: List[Dict], movie_title: str = "") -> str:
         """
         Generate complete review script from analyzed scenes
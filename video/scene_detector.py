@@ -1,25 +1,422 @@
 """Scene Detection - Automatically detect scene boundaries in video"""
 import os
+import re
 import json
+import hashlib
+import shutil
+import subprocess
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Tuple
 import cv2
 import numpy as np
+from utils.disk_cache import prune_cache_dir_once, touch
+from utils.helpers import file_content_hash, get_ffmpeg_exe
 from utils.logger import get_logger
 
 logger = get_logger()
 
+SHOT_SAMPLE_FPS = 4.0
+SHOT_FRAME_SIZE = (64, 36)
+
+
+class FrameDiffTracker:
+    """
+    Streaming cut detector over same-size uint8 grayscale frames:
+    mean absolute difference (cv2.absdiff, no float conversion) vs. previous frame.
+    """
+
+    def __init__(self, threshold: float = 27.0):
+        self.threshold = threshold
+        self._prev = None
+        self._diff = None
+        self.last_diff = None  # Mean abs diff of the last pair (None after the first frame)
+
+    def push(self, gray: np.ndarray) -> bool:
+        """Feed next frame; True if it starts a new shot. The frame is copied."""
+        if self._prev is None:
+            self._prev = gray.copy()
+            self._diff = np.empty_like(gray)
+            return False
+        cv2.absdiff(gray, self._prev, dst=self._diff)
+        np.copyto(self._prev, gray)
+        self.last_diff = cv2.mean(self._diff)[0]
+        return self.last_diff > self.threshold
+
+    @property
+    def last(self):
+        """Most recent frame fed (None before the first push)"""
+        return self._prev
+
+
+SCENE_SAMPLE_FPS = 4.0
+SCENE_FRAME_SIZE = (160, 90)
+MIN_SHARD_SECONDS = 120  # Shorter shards don't pay for process startup
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_QUALITY = 80
+REPRESENTATIVE_WIDTH = 1280  # Representative frames feed vision analysis + rendering
+REPRESENTATIVE_QUALITY = 90
+SCENE_CACHE_DIR = os.getenv("SCENE_CACHE_DIR", "assets/temp/scene_cache")
+SCENE_CACHE_VERSION = 2
+SCENE_CACHE_TTL = 14 * 24 * 3600            # Entries unused for this long are removed
+SCENE_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # ...and the oldest ones beyond this total
+
+
+def encode_thumbnail(frame: np.ndarray, width: int = THUMBNAIL_WIDTH, quality: int = THUMBNAIL_QUALITY) -> bytes:
+    """Downscaled JPEG bytes (~10 KB) instead of holding the full BGR frame"""
+    h, w = frame.shape[:2]
+    if w > width:
+        frame = cv2.resize(frame, (width, max(1, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buf.tobytes() if ok else None
+
+
+def decode_thumbnail(data: bytes) -> np.ndarray:
+    """JPEG thumbnail bytes → BGR frame (None if missing/corrupt)"""
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def scan_frame_cuts(cap: cv2.VideoCapture, step: int, size: Tuple[int, int], threshold: float,
+                    keep_thumbnails: bool = False, progress_every: int = 0,
+                    start_frame: int = 0, end_frame: int = None,
+                    keep_representatives: bool = False) -> Dict:
+    """
+    Sampled cut scan over an open capture: every `step`-th frame is decoded
+    (grab() advances past the others without retrieve/convert), shrunk into
+    preallocated uint8 buffers and compared with the previous sample.
+    Sampling is on the global grid (frame_idx % step == 0), so a scan of
+    [start_frame, end_frame) sees the same samples as a full scan.
+    Args:
+        keep_thumbnails: also return a small JPEG of the frame at each cut (and at the first sample)
+        progress_every: log progress every N frames (0 = silent)
+        start_frame / end_frame: the capture must already be positioned at start_frame
+        keep_representatives: track the sharpest sample (Laplacian variance) of every
+            segment between cuts - index only, so memory stays flat however many cuts
+    Returns:
+        {'cuts': [frame_idx of first sample of each new shot],
+         'thumbnails': {frame_idx: JPEG bytes} (keep_thumbnails only),
+         'frame_count': index after the last frame walked,
+         'first_idx' / 'first_gray' / 'first_thumbnail': first sample (for seam stitching),
+         'last_gray': last sample,
+         'representatives': {segment start idx: (sharpness, frame_idx)},
+         'motion': {segment start idx: [sum of sample diffs, count]} (motion energy),
+         'open_segment': start idx of the segment still open at the end}
+    """
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or 1
+    small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    gray = np.empty((size[1], size[0]), dtype=np.uint8)
+    frame = None
+    tracker = FrameDiffTracker(threshold)
+    cuts: List[int] = []
+    thumbnails: Dict[int, bytes] = {}
+    first_idx = first_gray = first_thumbnail = None
+    representatives: Dict[int, Tuple[float, int]] = {}
+    motion: Dict[int, List[float]] = {}
+    lap = np.empty((size[1], size[0]), dtype=np.int16)
+    best_sharpness, best_idx, segment_start = -1.0, None, None
+
+    def flush_segment():
+        if best_idx is not None:
+            representatives[segment_start] = (best_sharpness, best_idx)
+
+    frame_idx = start_frame
+    while end_frame is None or frame_idx < end_frame:
+        if frame_idx % step:
+            if not cap.grab():
+                break
+        else:
+            ret, frame = cap.read(frame)
+            if not ret:
+                break
+            cv2.resize(frame, size, dst=small, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=gray)
+            is_cut = tracker.push(gray)
+            if is_cut:
+                cuts.append(frame_idx)
+                if keep_thumbnails:
+                    thumbnails[frame_idx] = encode_thumbnail(frame)
+            if is_cut or segment_start is None:
+                if is_cut and keep_representatives:
+                    flush_segment()
+                best_sharpness, best_idx, segment_start = -1.0, None, frame_idx
+                motion[segment_start] = [0.0, 0]
+            elif tracker.last_diff is not None:
+                motion[segment_start][0] += tracker.last_diff
+                motion[segment_start][1] += 1
+            if keep_representatives:
+                cv2.Laplacian(gray, cv2.CV_16S, dst=lap)
+                sharpness = float(cv2.meanStdDev(lap)[1][0, 0]) ** 2
+                if sharpness > best_sharpness:
+                    best_sharpness, best_idx = sharpness, frame_idx
+            if first_idx is None:
+                first_idx, first_gray = frame_idx, gray.copy()
+                if keep_thumbnails:
+                    first_thumbnail = thumbnails.get(frame_idx) or encode_thumbnail(frame)
+        frame_idx += 1
+        if progress_every and frame_idx % progress_every == 0:
+            logger.info(f"  Processing: {frame_idx / total * 100:.1f}%")
+    if keep_representatives:
+        flush_segment()
+    return {
+        'cuts': cuts, 'thumbnails': thumbnails, 'frame_count': frame_idx,
+        'first_idx': first_idx, 'first_gray': first_gray, 'first_thumbnail': first_thumbnail,
+        'last_gray': tracker.last,
+        'representatives': representatives, 'motion': motion, 'open_segment': segment_start,
+    }
+
+
+def seek_exact(cap: cv2.VideoCapture, video_path: str, frame_idx: int) -> cv2.VideoCapture:
+    """
+    Position a capture at frame_idx. The seek is verified by decoding the
+    landing frame and comparing its timestamp with frame_idx / fps
+    (CAP_PROP_POS_FRAMES only echoes the requested value); if the backend
+    landed elsewhere, the file is reopened and walked there with grab().
+    Returns: the capture to read from (may be a new one)
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+    if fps > 0 and cap.grab():
+        landed_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if abs(landed_ms - frame_idx * 1000.0 / fps) <= 500.0 / fps:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)  # Rewind onto the verified frame
+            return cap
+        logger.debug(f"Inexact seek to frame {frame_idx} ({landed_ms:.0f} ms), walking sequentially")
+    cap.release()
+    cap = cv2.VideoCapture(video_path)
+    for _ in range(frame_idx):
+        if not cap.grab():
+            break
+    return cap
+
+
+def _scan_shard(video_path: str, start_frame: int, end_frame: int, step: int,
+                size: Tuple[int, int], threshold: float, keep_thumbnails: bool,
+                keep_representatives: bool = False) -> Dict:
+    """Worker-process entry: scan one frame range with its own VideoCapture"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if start_frame:
+            cap = seek_exact(cap, video_path, start_frame)
+        return scan_frame_cuts(cap, step, size, threshold, keep_thumbnails=keep_thumbnails,
+                               start_frame=start_frame, end_frame=end_frame,
+                               keep_representatives=keep_representatives)
+    finally:
+        cap.release()
+
+
+def shard_bounds(total_frames: int, keyframes: List[int], shards: int) -> List[int]:
+    """
+    Split [0, total_frames) into up to `shards` ranges whose starts are keyframes
+    (seeking there is exact and cheap). Returns the start frame of every shard.
+    """
+    starts = [0]
+    candidates = sorted(k for k in set(keyframes) if 0 < k < total_frames)
+    for i in range(1, shards):
+        if not candidates:
+            break
+        target = total_frames * i / shards
+        best = min(candidates, key=lambda k: abs(k - target))
+        if best > starts[-1]:
+            starts.append(best)
+    return starts
+
+
+def stitch_shards(results: List[Dict], threshold: float) -> Dict:
+    """
+    Merge ordered shard scans into one scan result. The sample pair that
+    straddles each seam (last sample of shard i vs first of shard i+1)
+    is re-judged here, so a cut exactly on a shard edge is kept. Without a
+    seam cut, a shard's first segment continues the previous shard's open
+    segment and their representative candidates are merged.
+    """
+    cuts: List[int] = []
+    thumbnails: Dict[int, bytes] = {}
+    representatives: Dict[int, Tuple[float, int]] = {}
+    motion: Dict[int, List[float]] = {}
+    prev_last = prev_open = None
+    frame_count = 0
+    for r in results:
+        shard_reps = dict(r.get('representatives') or {})
+        shard_motion = {k: list(v) for k, v in (r.get('motion') or {}).items()}
+        open_segment = r.get('open_segment')
+        if prev_last is not None and r['first_gray'] is not None:
+            seam = FrameDiffTracker(threshold)
+            seam.push(prev_last)
+            if seam.push(r['first_gray']):
+                cuts.append(r['first_idx'])
+                if r['first_thumbnail'] is not None:
+                    thumbnails[r['first_idx']] = r['first_thumbnail']
+            elif prev_open is not None:
+                # Same segment across the seam: keep the sharper candidate (earlier wins ties)
+                if r['first_idx'] in shard_reps:
+                    candidate = shard_reps.pop(r['first_idx'])
+                    if prev_open not in representatives or candidate[0] > representatives[prev_open][0]:
+                        representatives[prev_open] = candidate
+                # ...and its motion continues the open segment's (seam pair included)
+                total = motion.setdefault(prev_open, [0.0, 0])
+                total[0] += seam.last_diff
+                total[1] += 1
+                if r['first_idx'] in shard_motion:
+                    extra = shard_motion.pop(r['first_idx'])
+                    total[0] += extra[0]
+                    total[1] += extra[1]
+                if open_segment == r['first_idx']:
+                    open_segment = prev_open
+        cuts.extend(r['cuts'])
+        thumbnails.update(r['thumbnails'])
+        representatives.update(shard_reps)
+        motion.update(shard_motion)
+        if r['last_gray'] is not None:
+            prev_last = r['last_gray']
+        if open_segment is not None:
+            prev_open = open_segment
+        frame_count = max(frame_count, r['frame_count'])
+    return {'cuts': cuts, 'thumbnails': thumbnails, 'frame_count': frame_count,
+            'representatives': representatives, 'motion': motion}
+
+
+_PTS_TIME = re.compile(r"pts_time:\s*(-?[0-9.]+)")
+
+
+def probe_video_start(video_path: str) -> float:
+    """
+    Timestamp (s) ffmpeg gives the first video frame. Non-zero for many MP4/TS
+    files and yt-dlp section downloads (edit lists, audio-first muxing);
+    subtracting it aligns ffmpeg times with OpenCV frame indices (idx / fps).
+    """
+    cmd = [
+        get_ffmpeg_exe(), "-hide_banner", "-nostats", "-i", video_path,
+        "-map", "0:v:0", "-frames:v", "1", "-vf", "showinfo", "-f", "null", "-",
+    ]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, errors="ignore", timeout=60)
+    except Exception as e:
+        logger.warning(f"Video start probe failed: {e}")
+        return 0.0
+    m = _PTS_TIME.search(proc.stderr)
+    return float(m.group(1)) if m else 0.0
+
+
+def list_keyframe_times(video_path: str) -> List[float]:
+    """
+    Keyframe timestamps (s) from the first video frame, decoding keyframes
+    only (ffmpeg -skip_frame nokey)
+    """
+    cmd = [
+        get_ffmpeg_exe(), "-hide_banner", "-nostats", "-skip_frame", "nokey",
+        "-i", video_path, "-map", "0:v:0", "-vf", "showinfo", "-f", "null", "-",
+    ]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, errors="ignore", timeout=600)
+    except Exception as e:
+        logger.warning(f"Keyframe listing failed: {e}")
+        return []
+    start = probe_video_start(video_path)
+    return [max(0.0, float(t) - start) for t in _PTS_TIME.findall(proc.stderr)]
+
+
+def coarse_cut_windows(video_path: str, fps: float, score_threshold: float,
+                       keyframes_only: bool = True, size: Tuple[int, int] = SCENE_FRAME_SIZE) -> List[Tuple[int, int]]:
+    """
+    Coarse pass with ffmpeg's scene score at low resolution.
+    keyframes_only: decode keyframes only (-skip_frame nokey); a high score between
+        two keyframes marks the GOP between them as a candidate window.
+        Otherwise every frame is decoded (still tiny) and windows are 2 frames wide.
+    Returns: sorted, merged [first_frame, last_frame] windows that may contain a cut
+    """
+    cmd = [get_ffmpeg_exe(), "-hide_banner", "-nostats"]
+    if keyframes_only:
+        cmd += ["-skip_frame", "nokey"]
+    cmd += [
+        "-i", video_path, "-map", "0:v:0", "-an",
+        # showinfo before select lists every decoded frame, the one after lists candidates
+        "-vf", f"scale={size[0]}:{size[1]},showinfo,select='gt(scene,{score_threshold:.4f})',showinfo",
+        "-f", "null", "-",
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True, errors="ignore", timeout=3600)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip()[-300:])
+    start = probe_video_start(video_path)
+    decoded: List[int] = []
+    windows: List[Tuple[int, int]] = []
+    for m in re.finditer(r"Parsed_showinfo_(\d+).*?pts_time:\s*(-?[0-9.]+)", proc.stderr):
+        frame = max(0, int(round((float(m.group(2)) - start) * fps)))
+        if m.group(1) == "1":
+            decoded.append(frame)
+        elif len(decoded) >= 2:
+            # Cut lies after the previously decoded frame, up to this one
+            windows.append((decoded[-2], frame))
+    windows.sort()
+    merged: List[Tuple[int, int]] = []
+    for a, b in windows:
+        if merged and a <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(b, merged[-1][1]))
+        else:
+            merged.append((a, b))
+    return merged
+
+
+def refine_cut_windows(video_path: str, windows: List[Tuple[int, int]], size: Tuple[int, int],
+                       threshold: float) -> Dict:
+    """
+    Full-rate refinement inside coarse windows only: every frame of each window
+    is compared with its predecessor (first frame = window start, which is
+    the frame before the candidate region).
+    Returns: {'cuts', 'thumbnails', 'frames_decoded'}
+    """
+    cuts: List[int] = []
+    thumbnails: Dict[int, bytes] = {}
+    decoded = 0
+    cap = cv2.VideoCapture(video_path)
+    try:
+        for a, b in windows:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, a)
+            scan = scan_frame_cuts(cap, 1, size, threshold, keep_thumbnails=True,
+                                   start_frame=a, end_frame=b + 1)
+            cuts.extend(scan['cuts'])
+            thumbnails.update(scan['thumbnails'])
+            decoded += scan['frame_count'] - a
+    finally:
+        cap.release()
+    return {'cuts': sorted(set(cuts)), 'thumbnails': thumbnails, 'frames_decoded': decoded}
+
 
 class SceneDetector:
     """Detect scene boundaries using visual analysis"""
     
-    def __init__(self, threshold: float = 27.0):
+    def __init__(self, threshold: float = 27.0, fast: bool = False,
+                 sample_fps: float = SCENE_SAMPLE_FPS, analysis_size: Tuple[int, int] = SCENE_FRAME_SIZE,
+                 workers: int = 1, capture_frames: bool = True, backend: str = "diff",
+                 use_cache: bool = True, cache_dir: str = None):
         """
         Initialize scene detector
         Args:
             threshold: Brightness change threshold for scene detection (0-100)
+            fast: sample sample_fps frames/s at analysis_size with uint8 diffs
+                  instead of diffing every frame at 640x360 in float
+            workers: fast mode only - scan keyframe-aligned time ranges in this
+                     many processes (results identical to a serial scan)
+            capture_frames: fast mode only - track each scene's sharpest sampled frame
+                            during the scan (index only); extract_scene_frames decodes
+                            just those frames, for the scenes actually kept
+            backend: "diff" (brightness-diff scan) or "coarse" (ffmpeg scene score over
+                     keyframes, then full-rate refinement inside candidate windows only)
+            use_cache: reuse results (all scenes + extracted frames) for the same video
+                       content and detection settings; max_scenes is applied after the cache.
+                       Entries are pruned by age / total size (SCENE_CACHE_TTL, SCENE_CACHE_MAX_BYTES)
         """
         self.threshold = threshold
+        self.fast = fast
+        self.sample_fps = sample_fps
+        self.analysis_size = analysis_size
+        self.workers = max(1, workers)
+        self.capture_frames = capture_frames
+        self.backend = backend
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir or SCENE_CACHE_DIR
+        self._cache_entry = None
         self.scenes = []
         self.temp_frames = []
     
@@ -30,8 +427,18 @@ class SceneDetector:
             video_path: Path to video file
             max_scenes: Maximum number of scenes to extract
         Returns:
-            List of scene dicts with start, end, duration, and frame
+            List of scene dicts with start, end, duration, frame_idx and
+            'thumbnail' (small JPEG bytes, see decode_thumbnail; None for the last scene);
+            fast mode with capture_frames adds 'representative_idx' (frame index of
+            the sharpest sampled frame); fast mode also adds
+            'motion_energy' (mean sample-to-sample diff inside the scene)
         """
+        self._cache_entry = self._cache_entry_for(video_path) if self.use_cache else None
+        if self._cache_entry:
+            cached = self._load_cached(self._cache_entry)
+            if cached is not None:
+                return self._finalize(cached, max_scenes)
+        
         try:
             cap = cv2.VideoCapture(video_path)
             if not cap.isOpened():
@@ -43,6 +450,32 @@ class SceneDetector:
             
             logger.info(f"📹 Video: {fps}fps, {total_frames} frames")
             
+            if self.backend == "coarse":
+                cap.release()
+                scan = self._scan_coarse_to_fine(video_path, fps, total_frames)
+                if scan is not None:
+                    scenes = self._build_scenes(scan['cuts'], total_frames, fps, scan['thumbnails'])
+                    return self._finalize(scenes, max_scenes)
+                cap = cv2.VideoCapture(video_path)
+            
+            if self.fast:
+                step = max(1, int(round(fps / self.sample_fps)))
+                logger.info(f"⚡ Fast mode: every {step} frame(s) at {self.analysis_size[0]}x{self.analysis_size[1]}")
+                scan = None
+                if self.workers > 1 and total_frames >= 2 * MIN_SHARD_SECONDS * fps:
+                    cap.release()
+                    scan = self._scan_sharded(video_path, fps, total_frames, step)
+                if scan is None:
+                    if not cap.isOpened():
+                        cap = cv2.VideoCapture(video_path)
+                    scan = scan_frame_cuts(cap, step, self.analysis_size, self.threshold,
+                                           keep_thumbnails=True, progress_every=int(fps * 60) or 1500,
+                                           keep_representatives=self.capture_frames)
+                cap.release()
+                scenes = self._build_scenes(scan['cuts'], scan['frame_count'], fps, scan['thumbnails'],
+                                            scan.get('representatives'), scan.get('motion'))
+                return self._finalize(scenes, max_scenes)
+            
             scenes = []
             prev_frame = None
             scene_start = 0
@@ -72,7 +505,7 @@ class SceneDetector:
                                 'end': scene_end / fps,
                                 'duration': duration,
                                 'frame_idx': scene_start,
-                                'thumbnail': frame.copy()
+                                'thumbnail': encode_thumbnail(frame)
                             })
                             logger.info(f"  Scene {len(scenes)}: {duration:.1f}s ({scene_start}-{scene_end} frames)")
                         
@@ -98,25 +531,168 @@ class SceneDetector:
                 })
             
             cap.release()
-            
-            # Limit to max_scenes
-            if len(scenes) > max_scenes:
-                # Distribute evenly
-                step = len(scenes) // max_scenes
-                scenes = scenes[::step][:max_scenes]
-            
-            logger.info(f"✅ Detected {len(scenes)} scenes")
-            self.scenes = scenes
-            return scenes
+            return self._finalize(scenes, max_scenes)
         
         except Exception as e:
             logger.exception("Scene detection failed")
             return []
+
+    def _scan_sharded(self, video_path: str, fps: float, total_frames: int, step: int):
+        """Scan keyframe-aligned shards in parallel processes; None → caller scans serially"""
+        shards = min(self.workers, int(total_frames / (MIN_SHARD_SECONDS * fps)))
+        keyframes = [int(round(t * fps)) for t in list_keyframe_times(video_path)]
+        starts = shard_bounds(total_frames, keyframes, shards)
+        if len(starts) < 2:
+            return None
+        ends = starts[1:] + [None]
+        logger.info(f"🧩 Scanning {len(starts)} shards in parallel")
+        try:
+            with ProcessPoolExecutor(max_workers=len(starts)) as pool:
+                futures = [
+                    pool.submit(_scan_shard, video_path, a, b, step,
+                                self.analysis_size, self.threshold, True, self.capture_frames)
+                    for a, b in zip(starts, ends)
+                ]
+                results = [f.result() for f in futures]
+        except Exception as e:
+            logger.warning(f"Sharded scan failed ({e}), falling back to serial")
+            return None
+        return stitch_shards(results, self.threshold)
+
+    def _scan_coarse_to_fine(self, video_path: str, fps: float, total_frames: int):
+        """Coarse ffmpeg pass + windowed refinement; None → caller uses the diff scan"""
+        # ffmpeg's scene score is ~ mean abs diff / 255; stay inclusive, refinement decides
+        score_threshold = min(0.3, self.threshold / 255.0 * 0.5)
+        try:
+            windows = coarse_cut_windows(video_path, fps, score_threshold, size=self.analysis_size)
+        except Exception as e:
+            logger.warning(f"Coarse pass failed ({e}), using diff scan")
+            return None
+        scan = refine_cut_windows(video_path, windows, self.analysis_size, self.threshold)
+        share = scan['frames_decoded'] / max(1, total_frames) * 100
+        logger.info(f"🎯 Coarse-to-fine: {len(windows)} windows, {scan['frames_decoded']} frames refined ({share:.1f}%)")
+        return scan
+
+    def _build_scenes(self, cuts: List[int], frame_count: int, fps: float,
+                      thumbnails: Dict[int, bytes],
+                      representatives: Dict[int, Tuple[float, int]] = None,
+                      motion: Dict[int, List[float]] = None) -> List[Dict]:
+        """Turn cut frame indices into scene records (same rules as the per-frame loop)"""
+        representatives = representatives or {}
+        motion = motion or {}
+
+        def attach_representative(scene: Dict):
+            if scene['frame_idx'] in representatives:
+                scene['representative_idx'] = representatives[scene['frame_idx']][1]
+            if scene['frame_idx'] in motion:
+                # Mean gray-level change between samples inside the scene (0-255)
+                total, count = motion[scene['frame_idx']]
+                scene['motion_energy'] = round(total / count, 3) if count else 0.0
+            return scene
+
+        scenes = []
+        scene_start = 0
+        for scene_end in cuts:
+            duration = (scene_end - scene_start) / fps
+            if duration > 1.0:  # Minimum 1 second per scene
+                scenes.append(attach_representative({
+                    'start': scene_start / fps,
+                    'end': scene_end / fps,
+                    'duration': duration,
+                    'frame_idx': scene_start,
+                    'thumbnail': thumbnails.get(scene_end)
+                }))
+                logger.info(f"  Scene {len(scenes)}: {duration:.1f}s ({scene_start}-{scene_end} frames)")
+            scene_start = scene_end
+        
+        # Add final scene
+        if frame_count - scene_start > fps:
+            scenes.append(attach_representative({
+                'start': scene_start / fps,
+                'end': frame_count / fps,
+                'duration': (frame_count - scene_start) / fps,
+                'frame_idx': scene_start,
+                'thumbnail': None
+            }))
+        return scenes
+
+    def _finalize(self, scenes: List[Dict], max_scenes: int) -> List[Dict]:
+        if self._cache_entry and not os.path.exists(os.path.join(self._cache_entry, "scenes.json")):
+            self._store_cached(self._cache_entry, scenes)
+        
+        # Limit to max_scenes
+        if len(scenes) > max_scenes:
+            # Distribute evenly
+            step = len(scenes) // max_scenes
+            scenes = scenes[::step][:max_scenes]
+        
+        logger.info(f"✅ Detected {len(scenes)} scenes")
+        self.scenes = scenes
+        return scenes
     
+    def _cache_entry_for(self, video_path: str):
+        """Cache folder for this video content + detection settings (None if unhashable)"""
+        try:
+            content = file_content_hash(video_path)
+        except OSError as e:
+            logger.warning(f"Cannot hash video for scene cache: {e}")
+            return None
+        settings = json.dumps({
+            'v': SCENE_CACHE_VERSION, 'threshold': self.threshold, 'backend': self.backend,
+            'fast': self.fast, 'sample_fps': self.sample_fps, 'size': list(self.analysis_size),
+            'capture_frames': self.capture_frames,
+        }, sort_keys=True)
+        settings_key = hashlib.sha1(settings.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{content}_{settings_key}")
+
+    def _load_cached(self, entry: str):
+        """All detected scenes from the cache, with thumbnails re-attached (None on miss)"""
+        path = os.path.join(entry, "scenes.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            scenes = self.load_scenes(path)
+        except Exception as e:
+            logger.warning(f"Scene cache unreadable, re-detecting: {e}")
+            return None
+        for scene in scenes:
+            thumb = os.path.join(entry, "thumbs", f"{scene['frame_idx']}.jpg")
+            if os.path.exists(thumb):
+                with open(thumb, 'rb') as f:
+                    scene['thumbnail'] = f.read()
+            else:
+                scene['thumbnail'] = None
+        touch(entry)  # Vừa dùng → được dọn sau cùng
+        logger.info("♻️ Scene cache hit - skipping video decode")
+        return scenes
+
+    def _store_cached(self, entry: str, scenes: List[Dict]):
+        """Write thumbnails first, scenes.json last (its presence marks a complete entry)"""
+        # Lần ghi đầu tiên trong process dọn các entry cũ / vượt dung lượng
+        prune_cache_dir_once(self.cache_dir, SCENE_CACHE_TTL, SCENE_CACHE_MAX_BYTES)
+        try:
+            os.makedirs(os.path.join(entry, "thumbs"), exist_ok=True)
+            os.makedirs(os.path.join(entry, "frames"), exist_ok=True)
+            for scene in scenes:
+                if scene.get('thumbnail'):
+                    with open(os.path.join(entry, "thumbs", f"{scene['frame_idx']}.jpg"), 'wb') as f:
+                        f.write(scene['thumbnail'])
+            tmp = os.path.join(entry, "scenes.json.tmp")
+            self.save_scenes(tmp, scenes)
+            os.replace(tmp, os.path.join(entry, "scenes.json"))
+        except Exception as e:
+            logger.warning(f"Scene cache write failed: {e}")
+
+    @staticmethod
+    def _cached_frame_path(entry: str, scene: Dict) -> str:
+        return os.path.join(entry, "frames", f"rep_{scene['frame_idx']}.jpg")
+
     def extract_scene_frames(self, video_path: str, scenes: List[Dict], 
                            output_dir: str = "assets/temp/scene_frames") -> List[Dict]:
         """
-        Extract representative frame from each scene
+        Extract representative frame from each scene.
+        Cached frames are copied; the rest are decoded in one forward pass,
+        at the sharpest sample tracked during detection (scene middle otherwise).
         Args:
             video_path: Path to video
             scenes: List of detected scenes
@@ -126,27 +702,54 @@ class SceneDetector:
         """
         os.makedirs(output_dir, exist_ok=True)
         
+        entry = self._cache_entry
+        pending = []
+        for i, scene in enumerate(scenes):
+            output_path = os.path.join(output_dir, f"scene_{i:03d}.jpg")
+            cached = self._cached_frame_path(entry, scene) if entry else None
+            if cached and os.path.exists(cached):
+                shutil.copyfile(cached, output_path)
+                scene['frame_path'] = output_path
+            else:
+                pending.append(i)
+        if len(pending) < len(scenes):
+            logger.info(f"  Copied {len(scenes) - len(pending)} cached frames")
+        if not pending:
+            return scenes
+        
         cap = cv2.VideoCapture(video_path)
         fps = cap.get(cv2.CAP_PROP_FPS)
-        
-        for i, scene in enumerate(scenes):
-            # Extract middle frame of scene
-            mid_frame_idx = int((scene['start'] + scene['end']) / 2 * fps)
-            cap.set(cv2.CAP_PROP_POS_FRAMES, mid_frame_idx)
-            
+
+        def target_frame(i):
+            scene = scenes[i]
+            if 'representative_idx' in scene:
+                return scene['representative_idx']
+            # Middle frame of scene
+            return int((scene['start'] + scene['end']) / 2 * fps)
+
+        # Tăng dần để seek luôn tiến về phía trước
+        for i in sorted(pending, key=target_frame):
+            scene = scenes[i]
+            cap = seek_exact(cap, video_path, target_frame(i))
             ret, frame = cap.read()
-            if ret:
+            data = encode_thumbnail(frame, REPRESENTATIVE_WIDTH, REPRESENTATIVE_QUALITY) if ret else None
+            if data:
                 output_path = os.path.join(output_dir, f"scene_{i:03d}.jpg")
-                cv2.imwrite(output_path, frame)
+                with open(output_path, 'wb') as f:
+                    f.write(data)
                 scene['frame_path'] = output_path
+                if entry and os.path.isdir(os.path.join(entry, "frames")):
+                    # Extracted frames join the cache so the next run skips this decode too
+                    shutil.copyfile(output_path, self._cached_frame_path(entry, scene))
                 logger.info(f"  Extracted frame: {output_path}")
         
         cap.release()
         return scenes
     
-    def save_scenes(self, output_path: str):
-        """Save scene data to JSON"""
-        data = [{k: v for k, v in s.items() if k != 'thumbnail'} for s in self.scenes]
+    def save_scenes(self, output_path: str, scenes: List[Dict] = None):
+        """Save scene data to JSON (default: the last detected/loaded scenes)"""
+        scenes = self.scenes if scenes is None else scenes
+        data = [{k: v for k, v in s.items() if k != 'thumbnail'} for s in scenes]
         
         with open(output_path, 'w') as f:
             json.dump(data, f, indent=2)
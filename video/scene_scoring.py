@@ -0,0 +1,162 @@
+"""
+Local Scene Scoring - offline scene analysis with cheap OpenCV signals
+Used by SceneAnalyzer when no vision API is available (or a request fails):
+colorfulness, sharpness, exposure, motion energy (from the detector pass)
+and face presence (bundled Haar cascade) → relevance score + tags.
+"""
+import threading
+from typing import Dict, List, Optional
+import cv2
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger()
+
+ANALYSIS_WIDTH = 320  # All signals are computed on a downscaled frame
+FACE_CASCADE = "haarcascade_frontalface_default.xml"
+
+# Weights of the normalized signals in the relevance score
+WEIGHTS = {
+    'sharpness': 0.25,
+    'colorfulness': 0.20,
+    'exposure': 0.20,
+    'motion': 0.15,
+    'faces': 0.20,
+}
+
+
+class LocalSceneScorer:
+    """Vectorized per-frame signals (milliseconds per scene, no network)"""
+
+    _local = threading.local()  # CascadeClassifier is not safe to share across threads
+
+    def _face_detector(self):
+        """Per-thread Haar face cascade (None if this OpenCV build has no cascades)"""
+        detector = getattr(self._local, "faces", None)
+        if detector is None:
+            detector = False
+            cascade_cls = getattr(cv2, "CascadeClassifier", None)  # Moved out of core in OpenCV 5
+            cascade_dir = getattr(getattr(cv2, "data", None), "haarcascades", "")
+            if cascade_cls is not None:
+                try:
+                    detector = cascade_cls(cascade_dir + FACE_CASCADE)
+                    if detector.empty():
+                        detector = False
+                except Exception as e:
+                    logger.warning(f"Face cascade unavailable: {e}")
+                    detector = False
+            self._local.faces = detector
+        return detector or None
+
+    def signals(self, frame: np.ndarray, motion_energy: float = None) -> Dict:
+        """
+        Raw + normalized signals for one BGR frame
+        Args:
+            motion_energy: mean sample-to-sample diff of the scene (SceneDetector fast mode)
+        """
+        h, w = frame.shape[:2]
+        if w > ANALYSIS_WIDTH:
+            frame = cv2.resize(frame, (ANALYSIS_WIDTH, max(1, round(h * ANALYSIS_WIDTH / w))),
+                               interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # Colorfulness (Hasler & Süsstrunk): opponent channel spread
+        b, g, r = cv2.split(frame.astype(np.float32))
+        rg = r - g
+        yb = 0.5 * (r + g) - b
+        colorfulness = float(np.sqrt(rg.std() ** 2 + yb.std() ** 2) + 0.3 * np.sqrt(rg.mean() ** 2 + yb.mean() ** 2))
+
+        sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+        brightness = float(gray.mean())
+
+        faces: List = []
+        detector = self._face_detector()
+        if detector is not None:
+            min_side = max(20, gray.shape[0] // 10)
+            faces = detector.detectMultiScale(cv2.equalizeHist(gray), scaleFactor=1.15,
+                                              minNeighbors=5, minSize=(min_side, min_side))
+        face_area = sum(fw * fh for _, _, fw, fh in faces) / float(gray.size) if len(faces) else 0.0
+
+        return {
+            'colorfulness': colorfulness,
+            'sharpness': sharpness,
+            'brightness': brightness,
+            'motion_energy': motion_energy,
+            'faces': int(len(faces)) if detector is not None else None,
+            'face_area': face_area,
+            'norm': {
+                'colorfulness': min(1.0, colorfulness / 80.0),
+                'sharpness': min(1.0, np.log1p(sharpness) / np.log1p(1500.0)),
+                'exposure': 1.0 - min(1.0, abs(brightness - 125.0) / 125.0),
+                # Unknown motion counts as neutral
+                'motion': 0.5 if motion_energy is None else min(1.0, motion_energy / 25.0),
+                # None → no face detector available; its weight is redistributed
+                'faces': (1.0 if len(faces) else 0.0) if detector is not None else None,
+            },
+        }
+
+    def analyze(self, frame_path: str, scene_num: int, scene: Dict = None) -> Optional[Dict]:
+        """Analysis dict in SceneAnalyzer's format (None if the frame cannot be read)"""
+        frame = cv2.imread(frame_path) if frame_path else None
+        if frame is None:
+            return None
+        sig = self.signals(frame, (scene or {}).get('motion_energy'))
+        norm = sig['norm']
+        used = {k: w for k, w in WEIGHTS.items() if norm[k] is not None}
+        score = sum(w * norm[k] for k, w in used.items()) / sum(used.values())
+        tags = self._tags(sig)
+        return {
+            "scene_description": f"Scene {scene_num}: " + ", ".join(tags) if tags else f"Scene {scene_num} from the movie",
+            "review_script": self._script(tags),
+            "key_elements": tags,
+            "emotional_tone": self._tone(sig),
+            "relevance_score": round(float(min(1.0, max(0.05, score))), 3),
+            "signals": {k: (round(v, 3) if isinstance(v, float) else v)
+                        for k, v in sig.items() if k != 'norm'},
+        }
+
+    @staticmethod
+    def _tags(sig: Dict) -> List[str]:
+        tags = []
+        if (sig['faces'] or 0) >= 3:
+            tags.append("group")
+        elif sig['faces']:
+            tags.append("close-up" if sig['face_area'] > 0.08 else "character")
+        if sig['motion_energy'] is not None:
+            if sig['motion_energy'] > 15:
+                tags.append("action")
+            elif sig['motion_energy'] < 2:
+                tags.append("still")
+        if sig['colorfulness'] > 60:
+            tags.append("colorful")
+        if sig['brightness'] < 50:
+            tags.append("dark")
+        elif sig['brightness'] > 200:
+            tags.append("bright")
+        if sig['norm']['sharpness'] < 0.35:
+            tags.append("soft focus")
+        return tags
+
+    @staticmethod
+    def _tone(sig: Dict) -> str:
+        if sig['brightness'] < 50:
+            return "dark, tense"
+        if sig['motion_energy'] is not None and sig['motion_energy'] > 15:
+            return "energetic"
+        if sig['colorfulness'] > 60:
+            return "vivid"
+        return "intimate" if sig['faces'] else "calm"
+
+    @staticmethod
+    def _script(tags: List[str]) -> str:
+        if "action" in tags:
+            return "The pace picks up as the action explodes on screen, pulling us right into the chaos."
+        if "group" in tags:
+            return "The characters come together in a moment that shifts the dynamics of the whole story."
+        if "close-up" in tags or "character" in tags:
+            return "A close look at the character reveals what is really at stake in this moment."
+        if "dark" in tags:
+            return "Shadows take over as the story slips into its darkest, most suspenseful stretch."
+        if "colorful" in tags:
+            return "A burst of color sets the mood, turning this scene into a visual highlight."
+        return "This pivotal moment shows the progression of the story."
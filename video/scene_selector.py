@@ -1,59 +1,118 @@
 import re
+import math
 import logging
-from typing import List, Tuple, Optional
+import unicodedata
+from typing import Dict, List, Tuple, Optional
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+REUSE_PENALTY = 0.5     # Score cost per extra use of the same asset
+ORDER_BONUS = 1e-3      # Tie-break toward round-robin order when scores are equal
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def _fold(text: str) -> str:
+    """Lowercase, strip Vietnamese diacritics ("Áo đỏ" → "ao do") so text matches URLs/filenames"""
+    text = unicodedata.normalize("NFKD", text.lower().replace("đ", "d"))
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(_fold(text or ""))
+
+
 class SceneSelector:
     """Map sentences to image/video assets using keywords and optional LLM scoring."""
 
-    def __init__(self, llm_client=None):
+    def __init__(self, llm_client=None, reuse_penalty: float = REUSE_PENALTY):
         self.llm_client = llm_client
+        self.reuse_penalty = reuse_penalty
 
     def _keyword_score(self, sentence: str, asset_desc: str) -> int:
         """Score asset by number of keyword matches with sentence."""
-        words = set(re.findall(r"\w+", sentence.lower()))
-        asset_words = set(re.findall(r"\w+", asset_desc.lower()))
-        return len(words & asset_words)
+        return len(set(_tokens(sentence)) & set(_tokens(asset_desc)))
+
+    @staticmethod
+    def _build_index(assets: List[str]) -> Tuple[Dict[str, int], np.ndarray]:
+        """
+        Tokenize assets once.
+        Returns: (inverted index token → column, assets × vocabulary TF-IDF matrix,
+                  rows L2-normalized)
+        """
+        vocab: Dict[str, int] = {}
+        rows: List[Dict[int, int]] = []
+        for asset in assets:
+            counts: Dict[int, int] = {}
+            for tok in _tokens(asset):
+                col = vocab.setdefault(tok, len(vocab))
+                counts[col] = counts.get(col, 0) + 1
+            rows.append(counts)
+        tf = np.zeros((len(assets), max(1, len(vocab))), dtype=np.float32)
+        for i, counts in enumerate(rows):
+            for col, n in counts.items():
+                tf[i, col] = n
+        df = np.count_nonzero(tf, axis=0)
+        idf = np.log((1.0 + len(assets)) / (1.0 + df)) + 1.0  # Smoothed: tokens in every asset still count a little
+        weights = tf * idf
+        norms = np.linalg.norm(weights, axis=1, keepdims=True)
+        return vocab, weights / np.where(norms > 0, norms, 1.0)
+
+    def score_matrix(self, assets: List[str], sentences: List[str]) -> np.ndarray:
+        """Sentence × asset relevance (TF-IDF cosine) in one vectorized product"""
+        vocab, asset_matrix = self._build_index(assets)
+        sent = np.zeros((len(sentences), asset_matrix.shape[1]), dtype=np.float32)
+        for i, sentence in enumerate(sentences):
+            cols = [vocab[t] for t in set(_tokens(sentence)) if t in vocab]
+            sent[i, cols] = 1.0
+        return sent @ asset_matrix.T
 
     def match(self, assets: List[str], sentences: List[str]) -> List[Tuple[str, str]]:
-        """Return (sentence, asset) pairs using keyword scoring + round-robin fallback."""
+        """
+        Return (sentence, asset) pairs: globally optimal assignment (Hungarian) of
+        sentences to assets maximizing keyword relevance. When there are more
+        sentences than assets, each asset gets ceil(S/A) slots and the k-th extra
+        use costs k × reuse_penalty, so every asset is used before any repeats
+        unless a repeat is clearly more relevant. Equal scores fall back to
+        round-robin order.
+        """
         if not assets:
             return [(s, None) for s in sentences]
-
-        pairs = []
-        used_assets = set()
-        n_assets = len(assets)
-
-        for i, s in enumerate(sentences):
-            # Score all assets
-            scored = sorted(
-                [(self._keyword_score(s, a), a) for a in assets],
-                key=lambda x: x[0],
-                reverse=True
-            )
-
-            # Pick top unused asset if score >0
-            selected = None
-            for score, asset in scored:
-                if score > 0 and asset not in used_assets:
-                    selected = asset
-                    break
-
-            # fallback: top asset or round-robin
-            if not selected:
-                selected = scored[0][1] if scored else assets[i % n_assets]
-                if selected in used_assets:
-                    selected = assets[i % n_assets]
-
-            pairs.append((s, selected))
-            used_assets.add(selected)
-
-            # allow reuse if all used
-            if len(used_assets) >= n_assets:
-                used_assets.clear()
-
-        return pairs
+        if not sentences:
+            return []
+
+        n_sent, n_assets = len(sentences), len(assets)
+        scores = self.score_matrix(assets, sentences)
+        copies = math.ceil(n_sent / n_assets)
+        # Columns: asset a, use k → index k * n_assets + a
+        benefit = np.tile(scores, (1, copies))
+        benefit -= np.repeat(np.arange(copies, dtype=np.float32) * self.reuse_penalty, n_assets)[None, :]
+        rr = np.arange(n_sent) % n_assets
+        for k in range(copies):
+            benefit[np.arange(n_sent), k * n_assets + rr] += ORDER_BONUS
+
+        cols = self._assign(benefit)
+        return [(s, assets[int(c) % n_assets]) for s, c in zip(sentences, cols)]
+
+    @staticmethod
+    def _assign(benefit: np.ndarray) -> np.ndarray:
+        """Column per row maximizing total benefit (rows ≤ columns)"""
+        try:
+            from scipy.optimize import linear_sum_assignment
+            rows, cols = linear_sum_assignment(benefit, maximize=True)
+            out = np.empty(benefit.shape[0], dtype=np.int64)
+            out[rows] = cols
+            return out
+        except ImportError:
+            # Greedy on the global benefit ordering (no scipy)
+            out = np.full(benefit.shape[0], -1, dtype=np.int64)
+            taken = np.zeros(benefit.shape[1], dtype=bool)
+            for flat in np.argsort(-benefit, axis=None, kind="stable"):
+                r, c = divmod(int(flat), benefit.shape[1])
+                if out[r] < 0 and not taken[c]:
+                    out[r] = c
+                    taken[c] = True
+            return out
 
     def llm_match(self, assets: List[str], sentences: List[str]) -> List[Tuple[str, str]]:
         """Use LLM to assign assets; fallback to heuristic if fails."""